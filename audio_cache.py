@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+提取音频缓存模块
+按源文件指纹缓存已提取的PCM WAV，重复运行、重试和切换模型时不再重新提取
+"""
+
+import os
+import hashlib
+import tempfile
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from scratch_space import ScratchSpace
+
+
+# 指纹读取的头尾字节数
+FINGERPRINT_BYTES = 64 * 1024
+
+
+def fingerprint(media_path: str, sample_rate: int, channels: int = 1, codec: str = 'pcm_s16le') -> str:
+    """
+    计算源文件指纹
+
+    只读取文件大小、修改时间和头尾各64KB，不读全文件；提取参数不同时指纹不同。
+
+    Args:
+        media_path: 源文件路径
+        sample_rate: 提取采样率
+        channels: 提取声道数
+        codec: 提取编码
+
+    Returns:
+        十六进制指纹
+    """
+    path = Path(media_path)
+    stat = path.stat()
+    digest = hashlib.sha1()
+    digest.update(f"{stat.st_size}:{stat.st_mtime_ns}:{sample_rate}:{channels}:{codec}".encode())
+    with open(path, 'rb') as f:
+        digest.update(f.read(FINGERPRINT_BYTES))
+        if stat.st_size > FINGERPRINT_BYTES:
+            f.seek(max(stat.st_size - FINGERPRINT_BYTES, FINGERPRINT_BYTES))
+            digest.update(f.read(FINGERPRINT_BYTES))
+    return digest.hexdigest()
+
+
+class AudioCache:
+    """
+    磁盘上的提取音频缓存
+
+    条目以指纹命名（<指纹>.wav），写入时先写临时文件再原子重命名，多个进程可共享
+    同一缓存目录。每次命中时更新文件修改时间，超出容量时按修改时间淘汰最久未用的条目。
+    关联临时空间时，写入前通过临时空间配额预留空间，已缓存的条目也计入配额，
+    配额不足时优先淘汰最久未用的条目。
+    """
+
+    def __init__(self, cache_dir: str, max_size_mb: float = 2048, scratch: ScratchSpace = None):
+        """
+        Args:
+            cache_dir: 缓存目录
+            max_size_mb: 缓存容量上限（MB）
+            scratch: 临时空间，写入缓存时按其配额预留空间
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.scratch = scratch
+        if scratch is not None:
+            scratch.quota.add_persistent(self.size_bytes, self.reclaim)
+
+    @classmethod
+    def from_config(cls, audio_config: Dict[str, Any], base_dir: str = None,
+                    scratch: ScratchSpace = None) -> Optional['AudioCache']:
+        """
+        按音频配置创建缓存
+
+        cache_dir为空时放在临时目录（scratch_dir，未配置时为系统临时目录）下的audio_cache中；
+        相对路径相对于配置文件所在目录，而不是当前工作目录，从哪里启动都使用同一个缓存。
+
+        Args:
+            audio_config: 音频配置字典（cache_dir、cache_max_mb、scratch_dir）
+            base_dir: 配置文件所在目录
+            scratch: 临时空间，缓存写入经其配额准入，已缓存的条目计入配额
+
+        Returns:
+            AudioCache实例，cache_max_mb为0（默认）时返回None（不缓存）
+        """
+        max_size_mb = float(audio_config.get('cache_max_mb', 0))
+        if max_size_mb <= 0:
+            return None
+        cache_dir = audio_config.get('cache_dir')
+        if not cache_dir:
+            scratch_dir = scratch.scratch_dir if scratch is not None else (
+                audio_config.get('scratch_dir') or tempfile.gettempdir())
+            cache_dir = Path(scratch_dir) / 'audio_cache'
+        elif not Path(cache_dir).is_absolute() and base_dir is not None:
+            cache_dir = Path(base_dir) / cache_dir
+        return cls(cache_dir, max_size_mb, scratch)
+
+    def path_for(self, key: str) -> Path:
+        """指纹对应的缓存文件路径"""
+        return self.cache_dir / f"{key}.wav"
+
+    def owns(self, path: str) -> bool:
+        """路径是否为缓存中的条目（调用方不应删除）"""
+        return path is not None and Path(path).resolve().parent == self.cache_dir.resolve()
+
+    def lookup(self, media_path: str, sample_rate: int, channels: int = 1,
+               codec: str = 'pcm_s16le') -> Optional[str]:
+        """
+        查找缓存
+
+        Returns:
+            命中时返回缓存文件路径，否则返回None
+        """
+        path = self.path_for(fingerprint(media_path, sample_rate, channels, codec))
+        try:
+            # 更新修改时间作为最近使用时间
+            os.utime(path)
+        except OSError:
+            return None
+        return str(path)
+
+    def get_or_create(self, media_path: str, sample_rate: int, channels: int,
+                      codec: str, create: Callable[[Path], Optional[str]],
+                      expected_bytes: int = 0) -> Optional[str]:
+        """
+        查找缓存，未命中时调用create写出临时文件并加入缓存
+
+        写入期间按expected_bytes通过临时空间配额预留空间，空间不足时排队等待。
+
+        Args:
+            media_path: 源文件路径
+            sample_rate: 提取采样率
+            channels: 提取声道数
+            codec: 提取编码
+            create: 提取函数，接收输出路径，成功返回该路径，失败返回None
+            expected_bytes: 预计写入的字节数，0为不预留
+
+        Returns:
+            缓存文件路径，提取失败返回None
+
+        Raises:
+            ScratchQuotaError: 预计大小超过临时空间配额
+            TimeoutError: 等待临时空间超时
+        """
+        cached = self.lookup(media_path, sample_rate, channels, codec)
+        if cached:
+            print(f"音频缓存命中: {cached}")
+            return cached
+
+        key = fingerprint(media_path, sample_rate, channels, codec)
+        path = self.path_for(key)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_dir / f"{key}.{os.getpid()}.tmp.wav"
+        reservation = (self.scratch.reserve(expected_bytes, self.cache_dir)
+                       if self.scratch is not None else nullcontext())
+        try:
+            # 重命名后预留释放，条目改为按实际大小计入配额
+            with reservation:
+                if not create(tmp_path):
+                    return None
+                os.replace(tmp_path, path)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+        self.evict(keep=path)
+        return str(path)
+
+    def _entries(self) -> list:
+        """[(修改时间, 大小, 路径)]，不含写入中的临时文件"""
+        entries = []
+        for path in self.cache_dir.glob('*.wav'):
+            if path.name.endswith('.tmp.wav'):
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def size_bytes(self) -> int:
+        """缓存条目的总大小"""
+        return sum(size for _, size, _ in self._entries()) if self.cache_dir.exists() else 0
+
+    def reclaim(self, nbytes: int) -> int:
+        """
+        淘汰最久未用的条目以腾出至少nbytes字节（临时空间配额不足时调用）
+
+        Returns:
+            实际腾出的字节数
+        """
+        total = self.size_bytes()
+        self.evict(max_bytes=max(total - nbytes, 0))
+        return total - self.size_bytes()
+
+    def evict(self, keep: Path = None, max_bytes: int = None) -> int:
+        """
+        按最近使用时间淘汰条目直到不超过容量上限
+
+        Args:
+            keep: 不淘汰的条目（刚写入或正在使用的）
+            max_bytes: 淘汰后的总大小上限，为None时为缓存容量上限
+
+        Returns:
+            淘汰的条目数
+        """
+        if max_bytes is None:
+            max_bytes = self.max_bytes
+        entries = self._entries() if self.cache_dir.exists() else []
+        total = sum(size for _, size, _ in entries)
+
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= max_bytes:
+                break
+            if keep is not None and path == keep:
+                continue
+            try:
+                # 其他进程正在读取的文件在POSIX上删除后仍可继续读
+                path.unlink()
+                total -= size
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        """缓存统计"""
+        sizes = [size for _, size, _ in self._entries()] if self.cache_dir.exists() else []
+        return {
+            "cache_dir": str(self.cache_dir),
+            "entries": len(sizes),
+            "size_mb": sum(sizes) / (1024 * 1024),
+            "max_size_mb": self.max_bytes / (1024 * 1024),
+        }
+
+    def clear(self):
+        """清空缓存"""
+        if self.cache_dir.exists():
+            for path in self.cache_dir.glob('*.wav'):
+                path.unlink()
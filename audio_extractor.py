@@ -1,24 +1,45 @@
 #!/usr/bin/env python3
 """
 音频提取工具
-将视频中的音频提取为WAV文件
+将视频中的音频提取为WAV文件，支持目录和通配符批量并行提取
 """
 
 import os
+import sys
+import glob
+import json
+import time
+import shutil
 import argparse
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-try:
-    from moviepy import VideoFileClip
-except ImportError:
-    print("Installing moviepy...")
-    import subprocess
-    subprocess.run(["pip", "install", "moviepy"], check=True)
-    from moviepy import VideoFileClip
+from audio_source import (WavPcmReader, probe_media, extract_audio_stream, available_cpus,
+                          VIDEO_EXTENSIONS)
+from audio_cache import AudioCache
+from scratch_space import ScratchSpace
+from media_scanner import iter_media_files
 
-def extract_audio(video_path, output_path=None):
-    """从视频中提取音频"""
+def load_audio_config(config_file='config.json'):
+    """读取配置文件中的音频设置（与主程序共享缓存目录和提取参数），不存在时使用默认值"""
+    if not Path(config_file).exists():
+        return {}
+    with open(config_file, 'r', encoding='utf-8') as f:
+        return json.load(f).get('audio', {})
+
+def extract_audio(video_path, output_path=None, audio_config=None, cache=None, max_ranges=None):
+    """
+    从视频中提取音频
+
+    max_ranges为长视频分段并行提取的最大段数，为None时使用配置（extract_ranges）
+    """
     video_path = Path(video_path)
+    audio_config = audio_config or {}
+    sample_rate = audio_config.get('sample_rate', 16000)
+    channels = audio_config.get('channels', 1)
+    codec = audio_config.get('codec', 'pcm_s16le')
+    if max_ranges is None:
+        max_ranges = int(audio_config.get('extract_ranges', 4))
     
     if not video_path.exists():
         print(f"视频文件不存在: {video_path}")
@@ -30,17 +51,32 @@ def extract_audio(video_path, output_path=None):
     print(f"正在提取音频: {video_path} -> {output_path}")
     
     try:
-        video = VideoFileClip(str(video_path))
-        audio = video.audio
-        
-        if audio is None:
+        # 只读取容器头判断是否有音频轨道，不打开视频读取器
+        media_info = probe_media(video_path)
+        if not media_info["audio_streams"]:
             print("视频中没有音频轨道")
-            video.close()
             return False
         
-        # 提取音频为WAV格式
-        audio.write_audiofile(str(output_path), codec='pcm_s16le', fps=16000)
-        video.close()
+        # 只解码音频流，提取为WAV格式（长视频分段并行解码）；启用缓存时先查缓存
+        def extract(path):
+            return extract_audio_stream(video_path, path, sample_rate, channels, codec, max_ranges,
+                                        float(audio_config.get('extract_range_min_seconds', 600)),
+                                        media_info["duration"],
+                                        bool(audio_config.get('extract_range_verify', False)))
+        
+        if cache is not None:
+            # 缓存写入按预计大小通过临时空间配额准入
+            expected_bytes = int((media_info["duration"] or 0) * sample_rate * channels * 2)
+            cached_path = cache.get_or_create(video_path, sample_rate, channels, codec, extract,
+                                              expected_bytes)
+            if not cached_path:
+                return False
+            link_or_copy(cached_path, output_path)
+        else:
+            # 输出可能是之前链接到缓存条目的硬链接，先删除再写，不就地覆盖
+            if Path(output_path).exists():
+                Path(output_path).unlink()
+            extract(output_path)
         
         print(f"音频提取完成: {output_path}")
         return True
@@ -49,14 +85,186 @@ def extract_audio(video_path, output_path=None):
         print(f"音频提取失败: {e}")
         return False
 
+def link_or_copy(cached_path, output_path):
+    """
+    把缓存条目硬链接到输出路径，不在同一文件系统时复制
+
+    先删除已有的输出文件再链接，不会就地覆盖写入而破坏共享同一inode的缓存条目。
+    """
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    if output_path.exists() or output_path.is_symlink():
+        output_path.unlink()
+    try:
+        os.link(cached_path, output_path)
+    except OSError:
+        shutil.copyfile(cached_path, output_path)
+
+def expand_inputs(inputs, recursive=False):
+    """
+    展开输入参数为源文件列表
+
+    文件原样加入；目录按视频扩展名查找（recursive时包含子目录）；其余参数按通配符展开。
+
+    Returns:
+        [(源文件路径, 相对路径)]列表，相对路径用于在输出目录中保持目录结构
+    """
+    results = []
+    seen = set()
+
+    def add(path, relative):
+        key = path.resolve()
+        if key not in seen:
+            seen.add(key)
+            results.append((path, relative))
+
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            for candidate in iter_media_files(path, VIDEO_EXTENSIONS, max_depth=None if recursive else 0):
+                add(candidate, candidate.relative_to(path))
+        elif path.is_file():
+            add(path, Path(path.name))
+        else:
+            matches = sorted(glob.glob(item, recursive=True))
+            if not matches:
+                print(f"没有匹配的文件: {item}")
+            for match in matches:
+                match = Path(match)
+                if match.is_file():
+                    add(match, Path(match.name))
+    return results
+
+def is_up_to_date(video_path, output_path):
+    """输出文件存在、非空且不早于源文件时视为最新"""
+    try:
+        output_stat = Path(output_path).stat()
+    except OSError:
+        return False
+    return output_stat.st_size > 44 and output_stat.st_mtime >= Path(video_path).stat().st_mtime
+
+def _extract_job(video_path, output_path, audio_config, cache, max_ranges=None):
+    """进程池中执行的提取任务，返回吞吐统计"""
+    start = time.perf_counter()
+    success = extract_audio(video_path, output_path, audio_config, cache, max_ranges)
+    elapsed = time.perf_counter() - start
+    audio_seconds = 0.0
+    if success:
+        with WavPcmReader(output_path) as reader:
+            audio_seconds = reader.duration
+    return {
+        "video_path": str(video_path),
+        "output_path": str(output_path),
+        "success": success,
+        "source_mb": Path(video_path).stat().st_size / (1024 * 1024),
+        "elapsed": elapsed,
+        "audio_seconds": audio_seconds,
+    }
+
+def extract_many(sources, output_dir=None, audio_config=None, cache=None, jobs=None, force=False):
+    """
+    并行提取多个文件
+
+    Args:
+        sources: expand_inputs返回的[(源文件, 相对路径)]列表
+        output_dir: 输出目录，为空时输出到源文件旁边
+        audio_config: 音频配置字典
+        cache: AudioCache实例，None为不使用缓存
+        jobs: 并行进程数，默认为可用CPU核数
+        force: 即使输出已是最新也重新提取
+
+    Returns:
+        (结果列表, 跳过的文件列表, 总耗时)
+    """
+    jobs = max(1, jobs or available_cpus())
+    tasks = []
+    skipped = []
+    for video_path, relative in sources:
+        if output_dir:
+            output_path = Path(output_dir) / relative.with_suffix('.wav')
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+        else:
+            output_path = video_path.with_suffix('.wav')
+        if not force and is_up_to_date(video_path, output_path):
+            skipped.append(str(video_path))
+        else:
+            tasks.append((video_path, output_path))
+
+    print(f"共 {len(sources)} 个文件，跳过已是最新的 {len(skipped)} 个，"
+          f"待提取 {len(tasks)} 个，并行进程数: {min(jobs, max(1, len(tasks)))}")
+
+    results = []
+    start = time.perf_counter()
+    if len(tasks) == 1 or jobs == 1:
+        for video_path, output_path in tasks:
+            results.append(_extract_job(video_path, output_path, audio_config, cache))
+    elif tasks:
+        # 多个文件已经占满进程池，单个文件不再分段并行
+        with ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as executor:
+            futures = [executor.submit(_extract_job, video_path, output_path, audio_config, cache, 1)
+                       for video_path, output_path in tasks]
+            for future in as_completed(futures):
+                results.append(future.result())
+    return results, skipped, time.perf_counter() - start
+
+def print_summary(results, skipped, wall_time):
+    """打印每个文件的吞吐（MB/s、音频秒/秒）和总计"""
+    if results:
+        print(f"\n{'文件':<40}{'源大小(MB)':>12}{'耗时(秒)':>10}{'MB/s':>10}{'音频秒/秒':>12}")
+    for row in sorted(results, key=lambda row: row["video_path"]):
+        name = Path(row["video_path"]).name
+        if not row["success"]:
+            print(f"{name:<40}{row['source_mb']:>12.1f}{row['elapsed']:>10.2f}{'失败':>10}")
+            continue
+        elapsed = max(row["elapsed"], 1e-9)
+        print(f"{name:<40}{row['source_mb']:>12.1f}{elapsed:>10.2f}"
+              f"{row['source_mb'] / elapsed:>10.1f}{row['audio_seconds'] / elapsed:>12.1f}")
+
+    succeeded = [row for row in results if row["success"]]
+    total_mb = sum(row["source_mb"] for row in succeeded)
+    total_audio = sum(row["audio_seconds"] for row in succeeded)
+    wall_time = max(wall_time, 1e-9)
+    print(f"\n成功: {len(succeeded)}，失败: {len(results) - len(succeeded)}，跳过: {len(skipped)}")
+    if succeeded:
+        print(f"总计: {total_mb:.1f}MB，音频 {total_audio:.1f}秒，耗时 {wall_time:.2f}秒，"
+              f"{total_mb / wall_time:.1f}MB/s，{total_audio / wall_time:.1f}音频秒/秒")
+
 def main():
     parser = argparse.ArgumentParser(description='视频音频提取工具')
-    parser.add_argument('video_path', help='视频文件路径')
-    parser.add_argument('-o', '--output', help='输出音频文件路径')
+    parser.add_argument('inputs', nargs='+', help='视频文件、目录或通配符（如 "videos/*.mp4"）')
+    parser.add_argument('-o', '--output', help='输出音频文件路径（单个文件）或输出目录（多个文件）')
+    parser.add_argument('-c', '--config', default='config.json', help='配置文件路径（音频参数和缓存设置）')
+    parser.add_argument('--no-cache', action='store_true', help='不使用提取音频缓存')
+    parser.add_argument('-r', '--recursive', action='store_true', help='目录输入时包含子目录')
+    parser.add_argument('-j', '--jobs', type=int, help='并行进程数（默认为可用CPU核数）')
+    parser.add_argument('--force', action='store_true', help='输出已是最新时也重新提取')
+    parser.add_argument('--ranges', type=int, help='长视频分段并行提取的最大段数（默认使用配置，1为不分段）')
+    parser.add_argument('--verify-ranges', action='store_true',
+                        help='分段提取后与单次解码对比段边界，报告偏移')
     
     args = parser.parse_args()
     
-    success = extract_audio(args.video_path, args.output)
+    audio_config = load_audio_config(args.config)
+    if args.ranges is not None:
+        audio_config['extract_ranges'] = args.ranges
+    if args.verify_ranges:
+        audio_config['extract_range_verify'] = True
+    cache = None if args.no_cache else AudioCache.from_config(audio_config,
+                                                               Path(args.config).resolve().parent,
+                                                               ScratchSpace.from_config(audio_config))
+    
+    # 单个文件参数保持原有行为：-o为输出文件路径
+    if len(args.inputs) == 1 and Path(args.inputs[0]).is_file():
+        success = extract_audio(args.inputs[0], args.output, audio_config, cache)
+    else:
+        sources = expand_inputs(args.inputs, args.recursive)
+        if not sources:
+            print("没有找到要提取的文件")
+            sys.exit(1)
+        results, skipped, wall_time = extract_many(sources, args.output, audio_config, cache,
+                                                   args.jobs, args.force)
+        print_summary(results, skipped, wall_time)
+        success = all(row["success"] for row in results)
     
     if success:
         print("\n音频文件已准备就绪！")
@@ -65,7 +273,7 @@ def main():
         print("2. 离线识别工具")
         print("3. 其他语音识别软件")
     else:
-        exit(1)
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
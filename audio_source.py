@@ -0,0 +1,1137 @@
+#!/usr/bin/env python3
+"""
+音频数据源模块
+为识别器提供顺序、低分配的PCM读取（WAV内存映射或ffmpeg管道流式解码）
+"""
+
+import os
+import re
+import math
+import time
+import mmap
+import wave
+import queue
+import shutil
+import struct
+import threading
+import subprocess
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    # 在模块加载时导入：工作进程中的探测线程不再需要import锁
+    import imageio_ffmpeg
+except ImportError:
+    # 未安装时使用PATH中的ffmpeg
+    imageio_ffmpeg = None
+
+
+# WAV格式标识
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# int16 -> float32 归一化系数
+INT16_SCALE = np.float32(1.0 / 32768.0)
+
+# 按扩展名区分的输入类型（小写）
+VIDEO_EXTENSIONS = frozenset({'.mp4', '.avi', '.mov', '.wmv', '.flv', '.mkv', '.webm'})
+AUDIO_EXTENSIONS = frozenset({'.wav', '.mp3', '.flac', '.m4a', '.aac', '.ogg', '.opus', '.wma'})
+# 无文件头的16位小端单声道PCM，按模型采样率解释
+RAW_PCM_EXTENSIONS = frozenset({'.pcm', '.raw'})
+MEDIA_EXTENSIONS = VIDEO_EXTENSIONS | AUDIO_EXTENSIONS | RAW_PCM_EXTENSIONS
+
+# detect_input_type的返回值
+INPUT_PCM = 'pcm'      # 可直接读取的PCM（16位WAV或裸PCM），不经ffmpeg
+INPUT_AUDIO = 'audio'  # 压缩音频或其他格式的WAV，只解码音频流
+INPUT_VIDEO = 'video'  # 视频容器，只解码其中的音频流
+
+
+class WavPcmReader:
+    """
+    基于内存映射的WAV顺序读取器
+
+    只解析一次RIFF头并映射data块，整个文件的采样以零拷贝的int16视图暴露，
+    分块转换时写入预分配的float32缓冲区，避免逐块seek和临时数组分配。
+    """
+
+    def __init__(self, audio_path: str):
+        """
+        打开WAV文件
+
+        Args:
+            audio_path: WAV文件路径（16位PCM）
+        """
+        self.audio_path = Path(audio_path)
+        self._file = open(self.audio_path, 'rb')
+        self._mmap = None
+        self.samples = None
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._parse_header()
+        except Exception:
+            self.close()
+            raise
+
+    def _parse_header(self):
+        """解析RIFF头，定位fmt和data块"""
+        buf = self._mmap
+        if len(buf) < 12 or buf[0:4] != b'RIFF' or buf[8:12] != b'WAVE':
+            raise ValueError(f"不是有效的WAV文件: {self.audio_path}")
+
+        fmt = None
+        offset = 12
+        while offset + 8 <= len(buf):
+            chunk_id = buf[offset:offset + 4]
+            chunk_size = struct.unpack_from('<I', buf, offset + 4)[0]
+            body = offset + 8
+
+            if chunk_id == b'fmt ':
+                fmt = struct.unpack_from('<HHIIHH', buf, body)
+            elif chunk_id == b'data':
+                if fmt is None:
+                    raise ValueError("WAV文件缺少fmt块")
+                # 流式写出的WAV可能把data长度写成占位值，以实际文件长度为准
+                data_size = min(chunk_size, len(buf) - body)
+                self._setup_samples(fmt, body, data_size)
+                return
+
+            # RIFF块按偶数字节对齐
+            offset = body + chunk_size + (chunk_size & 1)
+
+        raise ValueError("WAV文件缺少data块")
+
+    def _setup_samples(self, fmt: tuple, data_offset: int, data_size: int):
+        """根据fmt块建立int16采样视图"""
+        audio_format, channels, sample_rate, _, block_align, bits = fmt
+
+        if audio_format not in (WAVE_FORMAT_PCM, WAVE_FORMAT_EXTENSIBLE) or bits != 16:
+            raise ValueError(f"仅支持16位PCM WAV，当前格式={audio_format:#x}，位深={bits}")
+
+        self.num_channels = channels
+        self.sample_rate = sample_rate
+        self.num_frames = data_size // block_align
+
+        # 零拷贝视图：(帧数, 声道数)
+        self.samples = np.frombuffer(
+            self._mmap, dtype='<i2', count=self.num_frames * channels, offset=data_offset
+        ).reshape(-1, channels)
+
+    @property
+    def duration(self) -> float:
+        """音频时长（秒）"""
+        return self.num_frames / self.sample_rate if self.sample_rate else 0.0
+
+    def iter_chunks(self, chunk_frames: int, start_frame: int = 0) -> Iterator[Tuple[int, np.ndarray]]:
+        """
+        顺序产出float32音频块
+
+        返回的数组是复用的预分配缓冲区，调用方必须在取下一块之前消费完毕
+        （accept_waveform会复制数据，可以直接传入）。多声道时取各声道的平均值。
+
+        Args:
+            chunk_frames: 每块的帧数
+            start_frame: 起始帧
+
+        Yields:
+            (块起始帧, float32采样)
+        """
+        if chunk_frames <= 0:
+            raise ValueError(f"chunk_frames必须为正数: {chunk_frames}")
+
+        buffer = np.empty(chunk_frames, dtype=np.float32)
+        channel = np.empty(chunk_frames, dtype=np.float32) if self.num_channels > 1 else None
+
+        for start in range(start_frame, self.num_frames, chunk_frames):
+            end = min(start + chunk_frames, self.num_frames)
+            out = buffer[:end - start]
+            self._mix(start, end, out, channel)
+            yield start, out
+
+    def _mix(self, start: int, end: int, out: np.ndarray, channel: np.ndarray = None):
+        """
+        把[start, end)帧转换为float32单声道写入out（多声道取平均）
+
+        int16用copyto直接转换写入float32缓冲区再原地缩放，不产生块大小的临时数组。
+        channel为多声道累加用的缓冲区（长度不小于out），为None时临时分配。
+        """
+        frames = self.samples[start:end]
+        np.copyto(out, frames[:, 0], casting='unsafe')
+        if self.num_channels == 1:
+            out *= INT16_SCALE
+            return
+        if channel is None:
+            channel = np.empty(len(out), dtype=np.float32)
+        channel = channel[:len(out)]
+        for index in range(1, self.num_channels):
+            np.copyto(channel, frames[:, index], casting='unsafe')
+            out += channel
+        out *= np.float32(INT16_SCALE / self.num_channels)
+
+    def get_range(self, start: int, end: int) -> np.ndarray:
+        """
+        读取一段单声道采样，用于出错后回退重新送入
+
+        Args:
+            start: 起始帧
+            end: 结束帧（不含）
+
+        Returns:
+            float32采样
+        """
+        start = max(start, 0)
+        end = min(end, self.num_frames)
+        out = np.empty(max(end - start, 0), dtype=np.float32)
+        self._mix(start, end, out)
+        return out
+
+    def close(self):
+        """释放内存映射和文件句柄"""
+        self.samples = None
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # 仍有外部视图引用映射区，交给垃圾回收释放
+                pass
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class RawPcmReader(WavPcmReader):
+    """
+    无文件头的PCM读取器
+
+    整个文件按16位小端单声道解释，采样率由调用方指定（通常为模型采样率）。
+    """
+
+    def __init__(self, audio_path: str, sample_rate: int = 16000):
+        """
+        Args:
+            audio_path: 裸PCM文件路径
+            sample_rate: 采样率
+        """
+        self._raw_sample_rate = sample_rate
+        super().__init__(audio_path)
+
+    def _parse_header(self):
+        """没有文件头，整个文件都是采样数据"""
+        size = len(self._mmap) & ~1
+        self._setup_samples((WAVE_FORMAT_PCM, 1, self._raw_sample_rate, 0, 2, 16), 0, size)
+
+
+def get_ffmpeg_exe() -> str:
+    """
+    获取ffmpeg可执行文件路径
+
+    优先使用moviepy依赖的imageio-ffmpeg自带的二进制，其次使用PATH中的ffmpeg。
+    """
+    if imageio_ffmpeg is not None:
+        try:
+            return imageio_ffmpeg.get_ffmpeg_exe()
+        except Exception:
+            pass
+    exe = shutil.which('ffmpeg')
+    if exe:
+        return exe
+    raise RuntimeError("未找到ffmpeg，请运行: pip install imageio-ffmpeg")
+
+
+def probe_media(media_path: str) -> Dict[str, Any]:
+    """
+    只读取容器头，获取时长和音视频流信息（不解码、不打开视频读取器）
+
+    Args:
+        media_path: 媒体文件路径
+
+    Returns:
+        {"duration": 秒或None, "has_video": bool,
+         "audio_streams": [{"index", "codec", "sample_rate", "channels"}, ...]}
+    """
+    result = subprocess.run([get_ffmpeg_exe(), '-hide_banner', '-nostdin', '-i', str(media_path)],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    header = result.stderr.decode('utf-8', 'replace')
+
+    info = {"duration": None, "has_video": False, "audio_streams": []}
+    match = re.search(r'Duration: (\d+):(\d+):(\d+(?:\.\d+)?)', header)
+    if match:
+        hours, minutes, seconds = match.groups()
+        info["duration"] = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+    for match in re.finditer(r'Stream #\d+:(\d+)\S*: (Audio|Video): (.*)', header):
+        index, kind, detail = match.groups()
+        if kind == 'Video':
+            info["has_video"] = True
+            continue
+        fields = [field.strip() for field in detail.split(',')]
+        rate = re.search(r'(\d+) Hz', detail)
+        info["audio_streams"].append({
+            "index": int(index),
+            "codec": fields[0].split(' ')[0],
+            "sample_rate": int(rate.group(1)) if rate else None,
+            "channels": fields[2] if len(fields) > 2 else None,
+        })
+    return info
+
+
+def extract_audio_stream(media_path: str, output_path: str, sample_rate: int = 16000,
+                         channels: int = 1, codec: str = 'pcm_s16le', max_ranges: int = 1,
+                         min_range_seconds: float = 600.0, duration: float = None,
+                         verify: bool = False) -> str:
+    """
+    只解码第一条音频流并写出WAV（视频流不解码）
+
+    较长的文件在max_ranges > 1时按时间范围分段并行解码（见extract_audio_ranges），
+    仅支持pcm_s16le输出。
+
+    Args:
+        media_path: 音视频文件路径
+        output_path: 输出WAV路径
+        sample_rate: 输出采样率
+        channels: 输出声道数
+        codec: 输出编码
+        max_ranges: 最大分段数，1为单进程提取
+        min_range_seconds: 每段的最短时长（秒）
+        duration: 容器时长（秒），分段时为None则探测
+        verify: 分段提取后与单次顺序解码对比段边界（需要再完整解码一遍）
+
+    Returns:
+        输出文件路径
+    """
+    if max_ranges > 1 and codec == 'pcm_s16le':
+        if duration is None:
+            duration = probe_media(media_path)["duration"]
+        num_ranges = plan_extract_ranges(duration, max_ranges, min_range_seconds)
+        if num_ranges > 1:
+            print(f"分段并行提取: {num_ranges}段，每段约{duration / num_ranges:.0f}秒")
+            boundaries = extract_audio_ranges(media_path, output_path, num_ranges,
+                                              sample_rate, channels, duration)
+            if verify:
+                report_range_drift(check_range_drift(media_path, output_path, boundaries, sample_rate))
+            return str(output_path)
+
+    command = [get_ffmpeg_exe(), '-nostdin', '-v', 'error', '-y', '-i', str(media_path),
+               '-map', '0:a:0', '-vn', '-sn', '-dn',
+               '-ac', str(channels), '-ar', str(sample_rate), '-acodec', codec,
+               '-f', 'wav', str(output_path)]
+    result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        detail = result.stderr.decode('utf-8', 'replace').strip() or f"返回码 {result.returncode}"
+        raise RuntimeError(f"ffmpeg提取音频失败: {detail}")
+    return str(output_path)
+
+
+def available_cpus() -> int:
+    """当前进程可用的CPU核数（考虑CPU亲和性限制）"""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def plan_extract_ranges(duration: Optional[float], max_ranges: int, min_range_seconds: float) -> int:
+    """
+    按时长决定分段提取的段数
+
+    每段不短于min_range_seconds，段数不超过max_ranges和可用CPU核数；
+    时长未知或较短时为1（单进程提取）。
+    """
+    if not duration or max_ranges <= 1 or min_range_seconds <= 0:
+        return 1
+    return max(1, min(max_ranges, available_cpus(), int(duration // min_range_seconds)))
+
+
+def extract_audio_ranges(media_path: str, output_path: str, num_ranges: int,
+                         sample_rate: int = 16000, channels: int = 1,
+                         duration: float = None, preroll_seconds: float = 0.5) -> List[int]:
+    """
+    按时间范围分段并行提取音频，按采样精确拼接为一个WAV
+
+    总帧数按容器时长计算后均分为num_ranges段，每段由一个ffmpeg进程从段起点之前
+    preroll_seconds处输入端seek后解码为s16le裸PCM（末尾多解码1秒余量），拼接时丢弃
+    预热部分并截取到精确的帧数，因此段边界与单次解码的采样位置对齐；
+    最后一段读到流结束为止。
+
+    Args:
+        media_path: 音视频文件路径
+        output_path: 输出WAV路径
+        num_ranges: 分段数
+        sample_rate: 输出采样率
+        channels: 输出声道数
+        duration: 容器时长（秒），为None时探测
+        preroll_seconds: 每段起点之前多解码并丢弃的时长（秒）
+
+    Returns:
+        各段在输出中的起始帧，最后一项为总帧数
+    """
+    if duration is None:
+        duration = probe_media(media_path)["duration"]
+    if not duration:
+        raise RuntimeError(f"无法获取时长，不能分段提取: {media_path}")
+
+    # 段起点取在输入和输出采样网格重合的位置，重采样相位与单次解码一致
+    input_rate = next((stream["sample_rate"] for stream in probe_media(media_path)["audio_streams"]
+                       if stream["sample_rate"]), sample_rate)
+    grid = sample_rate // math.gcd(sample_rate, input_rate)
+    total_frames = int(round(duration * sample_rate))
+    boundaries = [total_frames * i // num_ranges // grid * grid for i in range(num_ranges)]
+    boundaries.append(total_frames)
+    # 每段从起点之前preroll处开始解码，丢弃解码器和重采样器的预热输出
+    preroll = int(preroll_seconds * sample_rate) // grid * grid
+    output_path = Path(output_path)
+    parts = [output_path.with_name(f"{output_path.name}.part{i}.raw") for i in range(num_ranges)]
+    ffmpeg = get_ffmpeg_exe()
+
+    def decode_range(index: int):
+        start, end = max(boundaries[index] - preroll, 0), boundaries[index + 1]
+        command = [ffmpeg, '-nostdin', '-v', 'error', '-y']
+        if start:
+            command += ['-ss', f"{start / sample_rate:.6f}"]
+        command += ['-i', str(media_path), '-map', '0:a:0', '-vn', '-sn', '-dn',
+                    '-ac', str(channels), '-ar', str(sample_rate), '-f', 's16le']
+        if index < num_ranges - 1:
+            command += ['-t', f"{(end - start) / sample_rate + 1.0:.6f}"]
+        command.append(str(parts[index]))
+        result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        if result.returncode != 0:
+            detail = result.stderr.decode('utf-8', 'replace').strip() or f"返回码 {result.returncode}"
+            raise RuntimeError(f"ffmpeg分段提取失败（第{index + 1}段）: {detail}")
+
+    frame_bytes = 2 * channels
+    block_bytes = frame_bytes * sample_rate * 10
+    try:
+        # 解码在子进程中进行，线程只负责等待
+        with ThreadPoolExecutor(max_workers=num_ranges) as executor:
+            list(executor.map(decode_range, range(num_ranges)))
+
+        offsets = []
+        written = 0
+        with wave.open(str(output_path), 'wb') as wf:
+            wf.setnchannels(channels)
+            wf.setsampwidth(2)
+            wf.setframerate(sample_rate)
+            for index, part in enumerate(parts):
+                offsets.append(written)
+                skip = min(preroll, boundaries[index])
+                available = max(part.stat().st_size // frame_bytes - skip, 0)
+                if index < num_ranges - 1:
+                    wanted = boundaries[index + 1] - boundaries[index]
+                else:
+                    wanted = available
+                remaining = min(available, wanted) * frame_bytes
+                with open(part, 'rb') as f:
+                    f.seek(skip * frame_bytes)
+                    while remaining > 0:
+                        data = f.read(min(block_bytes, remaining))
+                        if not data:
+                            break
+                        wf.writeframesraw(data)
+                        remaining -= len(data)
+                # 中间段不足时补零，保持后续段的采样位置
+                if available < wanted:
+                    wf.writeframesraw(bytes((wanted - available) * frame_bytes))
+                written += wanted
+        offsets.append(written)
+        return offsets
+    finally:
+        for part in parts:
+            if part.exists():
+                part.unlink()
+
+
+def check_range_drift(media_path: str, wav_path: str, boundaries: List[int],
+                      sample_rate: int = 16000, window: int = 4096,
+                      max_lag: int = 400) -> List[Dict[str, Any]]:
+    """
+    与单次顺序解码对比分段提取结果在各段边界处的偏移
+
+    顺序解码整个文件（只保留各边界附近的采样），对每个边界在±max_lag帧内搜索
+    使边界后window帧差异最小的偏移。偏移为0且差异接近0说明拼接是采样精确的。
+
+    Args:
+        media_path: 源文件路径
+        wav_path: 分段提取得到的WAV
+        boundaries: extract_audio_ranges返回的段起始帧（首尾两项不检查）
+        sample_rate: 采样率
+        window: 比较的帧数
+        max_lag: 搜索的最大偏移（帧）
+
+    Returns:
+        每个边界一项：{"frame", "seconds", "lag", "max_diff", "silent"}
+    """
+    inner = boundaries[1:-1]
+    references = {b: np.zeros(window + 2 * max_lag, dtype=np.float32) for b in inner}
+    with FfmpegPcmStream(media_path, sample_rate) as stream:
+        for start, chunk in stream.iter_chunks(sample_rate):
+            end = start + len(chunk)
+            for b, ref in references.items():
+                lo, hi = max(start, b - max_lag), min(end, b + window + max_lag)
+                if lo < hi:
+                    ref[lo - (b - max_lag):hi - (b - max_lag)] = chunk[lo - start:hi - start]
+
+    report = []
+    with WavPcmReader(wav_path) as reader:
+        for b in inner:
+            ref = references[b]
+            out = reader.get_range(b, b + window)
+            if len(out) < window:
+                out = np.pad(out, (0, window - len(out)))
+            silent = float(np.max(np.abs(out))) < 1e-3
+            diffs = [float(np.mean(np.abs(out - ref[lag:lag + window])))
+                     for lag in range(2 * max_lag + 1)]
+            best = 0 if silent else int(np.argmin(diffs)) - max_lag
+            report.append({
+                "frame": b,
+                "seconds": b / sample_rate,
+                "lag": best,
+                "max_diff": float(np.max(np.abs(out - ref[max_lag:max_lag + window]))),
+                "silent": silent,
+            })
+    return report
+
+
+def report_range_drift(report: List[Dict[str, Any]], tolerance: float = 1e-3) -> bool:
+    """
+    打印段边界检查结果
+
+    Returns:
+        所有边界都没有偏移且差异不超过tolerance时返回True
+    """
+    exact = True
+    for item in report:
+        ok = item["lag"] == 0 and item["max_diff"] <= tolerance
+        exact = exact and ok
+        note = "（静音，偏移无法判断）" if item["silent"] else ""
+        print(f"  段边界 {item['seconds']:.2f}秒: 偏移 {item['lag']}帧，"
+              f"最大差异 {item['max_diff']:.5f} {'✓' if ok else '✗'}{note}")
+    if exact:
+        print("分段提取与单次解码在所有段边界处一致")
+    else:
+        print("警告: 分段提取在段边界处与单次解码不一致")
+    return exact
+
+
+class FfmpegPcmStream:
+    """
+    ffmpeg管道音频流
+
+    由ffmpeg子进程把任意音视频文件解码为单声道s16le，从标准输出按固定块大小
+    读入预分配缓冲区后直接交给识别器，不写临时WAV文件。接口与WavPcmReader一致；
+    不支持随机访问，只保留最近history_seconds秒的采样供出错回退使用。
+    """
+
+    def __init__(self, media_path: str, sample_rate: int = 16000, history_seconds: float = 10.0):
+        """
+        Args:
+            media_path: 音视频文件路径
+            sample_rate: 输出采样率
+            history_seconds: 保留用于回退的最近采样时长（秒）
+        """
+        self.media_path = Path(media_path)
+        if not self.media_path.exists():
+            raise FileNotFoundError(f"文件不存在: {self.media_path}")
+
+        self.sample_rate = sample_rate
+        self.num_channels = 1
+        # 管道读完之前只能按容器时长估算总帧数，读完后更新为实际值
+        duration = probe_media(self.media_path)["duration"]
+        self.num_frames = int(round(duration * sample_rate)) if duration else 0
+
+        self._history = np.zeros(max(1, int(history_seconds * sample_rate)), dtype=np.int16)
+        self._history_end = 0
+        self._process = None
+        self._stderr_tail = deque(maxlen=20)
+        self._stderr_thread = None
+
+    @property
+    def duration(self) -> float:
+        """音频时长（秒）"""
+        return self.num_frames / self.sample_rate if self.sample_rate else 0.0
+
+    def _start(self, start_frame: int):
+        """启动ffmpeg解码进程"""
+        command = [get_ffmpeg_exe(), '-nostdin', '-v', 'error']
+        if start_frame > 0:
+            command += ['-ss', f"{start_frame / self.sample_rate:.6f}"]
+        command += ['-i', str(self.media_path), '-vn', '-sn', '-dn',
+                    '-ac', '1', '-ar', str(self.sample_rate),
+                    '-acodec', 'pcm_s16le', '-f', 's16le', '-']
+
+        self._stderr_tail.clear()
+        self._process = subprocess.Popen(command, stdin=subprocess.DEVNULL,
+                                         stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        # 单独线程读取错误输出，避免管道写满阻塞ffmpeg
+        self._stderr_thread = threading.Thread(target=self._drain_stderr, args=(self._process.stderr,),
+                                               daemon=True)
+        self._stderr_thread.start()
+
+    def _drain_stderr(self, stream):
+        for line in stream:
+            self._stderr_tail.append(line.decode('utf-8', 'replace').rstrip())
+
+    def _read_full(self, view: memoryview) -> int:
+        """读满缓冲区，返回实际读入的字节数（文件结束时可能不足）"""
+        filled = 0
+        while filled < len(view):
+            n = self._process.stdout.readinto(view[filled:])
+            if not n:
+                break
+            filled += n
+        return filled
+
+    def _remember(self, end: int, chunk: np.ndarray):
+        """把刚读入的块写入回退环形缓冲区"""
+        size = len(self._history)
+        if len(chunk) > size:
+            chunk = chunk[-size:]
+        begin = (end - len(chunk)) % size
+        first = min(len(chunk), size - begin)
+        self._history[begin:begin + first] = chunk[:first]
+        self._history[:len(chunk) - first] = chunk[first:]
+        self._history_end = end
+
+    def iter_chunks(self, chunk_frames: int, start_frame: int = 0) -> Iterator[Tuple[int, np.ndarray]]:
+        """
+        顺序产出float32音频块
+
+        返回的数组是复用的预分配缓冲区，调用方必须在取下一块之前消费完毕。
+
+        Args:
+            chunk_frames: 每块的帧数
+            start_frame: 起始帧（通过ffmpeg的-ss定位）
+
+        Yields:
+            (块起始帧, float32采样)
+        """
+        if chunk_frames <= 0:
+            raise ValueError(f"chunk_frames必须为正数: {chunk_frames}")
+
+        raw = np.empty(chunk_frames, dtype='<i2')
+        view = memoryview(raw).cast('B')
+        buffer = np.empty(chunk_frames, dtype=np.float32)
+        position = start_frame
+        self._history_end = start_frame
+
+        self._start(start_frame)
+        try:
+            while True:
+                filled = self._read_full(view)
+                frames = filled // 2
+                if frames:
+                    chunk = raw[:frames]
+                    self._remember(position + frames, chunk)
+                    out = buffer[:frames]
+                    np.copyto(out, chunk, casting='unsafe')
+                    out *= INT16_SCALE
+                    yield position, out
+                    position += frames
+                if filled < len(view):
+                    break
+
+            return_code = self._process.wait()
+            self._stderr_thread.join()
+            if return_code != 0:
+                detail = '; '.join(self._stderr_tail) or f"返回码 {return_code}"
+                raise RuntimeError(f"ffmpeg解码失败: {detail}")
+            self.num_frames = position
+        finally:
+            self._stop()
+
+    def get_range(self, start: int, end: int) -> np.ndarray:
+        """
+        读取最近的一段采样，超出回退缓冲区的部分被截掉
+
+        Args:
+            start: 起始帧
+            end: 结束帧（不含）
+
+        Returns:
+            float32采样
+        """
+        size = len(self._history)
+        end = min(end, self._history_end)
+        start = max(start, self._history_end - size, 0)
+        if end <= start:
+            return np.zeros(0, dtype=np.float32)
+        return self._history[np.arange(start, end) % size].astype(np.float32) * INT16_SCALE
+
+    def _stop(self):
+        """结束ffmpeg进程（提前停止读取时终止解码）"""
+        process, self._process = self._process, None
+        if process is None:
+            return
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        process.stdout.close()
+
+    def close(self):
+        """结束解码进程"""
+        self._stop()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class PolyphaseResampler:
+    """
+    流式多相FIR重采样器
+
+    采样率比化为最简分数 L/M（上采样L、下采样M），Kaiser窗sinc低通滤波器按相位
+    拆成L组短滤波器；相位相同的输出在输入上按步长M等距排列，每组用一次矩阵-向量乘积
+    算出，不逐个样本循环。块之间保留滤波器长度的历史采样，分块结果与整段一次处理一致，
+    并已补偿滤波器的群延迟。
+    """
+
+    def __init__(self, in_rate: int, out_rate: int, start_frame: int = 0,
+                 zero_crossings: int = 16, beta: float = 6.0, rolloff: float = 0.9):
+        """
+        Args:
+            in_rate: 输入采样率
+            out_rate: 输出采样率
+            start_frame: 第一个输出样本在输出时间轴上的序号（断点续传时非0）
+            zero_crossings: 低通滤波器单侧的过零点数（越大过渡带越窄、计算量越大）
+            beta: Kaiser窗参数
+            rolloff: 截止频率相对于较低奈奎斯特频率的比例
+        """
+        g = math.gcd(in_rate, out_rate)
+        self.up = out_rate // g
+        self.down = in_rate // g
+        up, down = self.up, self.down
+
+        # 在上采样后的时间轴上设计低通滤波器，截止在两个奈奎斯特频率中较低者
+        ratio = max(up, down)
+        half_width = int(math.ceil(zero_crossings * ratio / rolloff))
+        self.taps = -(-(2 * half_width + 1) // up)
+        length = self.taps * up
+        # 中心取down的整数倍，群延迟正好是整数个输出样本
+        center = int(round((length - 1) / 2 / down)) * down
+        cutoff = rolloff / (2 * ratio)
+        t = np.arange(length) - center
+        span = max(center, length - 1 - center) + 1
+        window = np.i0(beta * np.sqrt(1 - (t / span) ** 2)) / np.i0(beta)
+        h = 2 * cutoff * np.sinc(2 * cutoff * t) * window * up
+
+        # filters[p] 为相位p的滤波器，倒序后可直接与升序的输入窗口做点积
+        self.filters = np.ascontiguousarray(h.reshape(self.taps, up).T[:, ::-1], dtype=np.float32)
+
+        # 以群延迟为偏移，输出样本m对应滤波器中心对齐后的原始输出 m + delay
+        self.delay = center // down
+        self.start_frame = start_frame
+        self._next = start_frame + self.delay
+        first_base = self._next * down // up
+        # 调用方应从该输入帧开始送入数据
+        self.input_start = max(0, first_base - self.taps)
+        self._in_total = self.input_start
+        self._history = np.zeros(self.taps - 1, dtype=np.float32)
+
+    def output_frames(self, input_frames: int) -> int:
+        """输入帧数对应的输出帧数"""
+        return -(-input_frames * self.up // self.down)
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """
+        送入一块输入，返回已能计算的输出
+
+        Args:
+            samples: float32单声道输入
+
+        Returns:
+            float32输出（新分配的数组）
+        """
+        up, down, taps = self.up, self.down, self.taps
+        buffer = np.concatenate((self._history, samples.astype(np.float32, copy=False)))
+        buffer_start = self._in_total - (taps - 1)
+        self._in_total += len(samples)
+
+        # 输出n需要的最新输入为 n*down//up，不能超过已送入的最后一帧
+        end = (self._in_total * up - 1) // down + 1
+        count = max(end - self._next, 0)
+        out = np.empty(count, dtype=np.float32)
+        if count:
+            windows = np.lib.stride_tricks.sliding_window_view(buffer, taps)
+            for r in range(min(up, count)):
+                n = self._next + r
+                base, phase = divmod(n * down, up)
+                first = base - buffer_start - (taps - 1)
+                rows = (count - r + up - 1) // up
+                out[r::up] = windows[first:first + (rows - 1) * down + 1:down] @ self.filters[phase]
+            self._next = end
+        self._history = buffer[len(buffer) - (taps - 1):].copy()
+        return out
+
+    def flush(self) -> np.ndarray:
+        """输入结束：补零算出剩余的输出，总长度与输入时长对应"""
+        end = self.output_frames(self._in_total) + self.delay
+        remaining = end - self._next
+        out = self.process(np.zeros(self.taps, dtype=np.float32))
+        return out[:max(remaining, 0)]
+
+
+class ResamplingSource:
+    """
+    重采样数据源
+
+    从底层数据源按较大的块（block_seconds）读取单声道采样，重采样到模型采样率后
+    再按调用方的块大小切分产出，识别器收到的始终是模型采样率的单声道float32。
+    """
+
+    def __init__(self, source, sample_rate: int, block_seconds: float = 1.0):
+        """
+        Args:
+            source: 底层数据源（WavPcmReader等）
+            sample_rate: 目标采样率
+            block_seconds: 从底层数据源读取的块时长（秒）
+        """
+        self.source = source
+        self.sample_rate = sample_rate
+        self.num_channels = 1
+        self.block_seconds = block_seconds
+
+    @property
+    def num_frames(self) -> int:
+        return -(-self.source.num_frames * self.sample_rate // self.source.sample_rate)
+
+    @property
+    def duration(self) -> float:
+        return self.source.duration
+
+    def iter_chunks(self, chunk_frames: int, start_frame: int = 0) -> Iterator[Tuple[int, np.ndarray]]:
+        """
+        顺序产出目标采样率的float32音频块
+
+        Args:
+            chunk_frames: 每块的帧数（目标采样率）
+            start_frame: 起始帧（目标采样率）
+
+        Yields:
+            (块起始帧, float32采样)
+        """
+        if chunk_frames <= 0:
+            raise ValueError(f"chunk_frames必须为正数: {chunk_frames}")
+
+        resampler = PolyphaseResampler(self.source.sample_rate, self.sample_rate, start_frame)
+        block_frames = max(1, int(self.block_seconds * self.source.sample_rate))
+        pending = np.zeros(0, dtype=np.float32)
+        position = start_frame
+
+        def blocks():
+            for _, samples in self.source.iter_chunks(block_frames, resampler.input_start):
+                yield resampler.process(samples)
+            yield resampler.flush()
+
+        for out in blocks():
+            pending = np.concatenate((pending, out)) if len(pending) else out
+            offset = 0
+            while len(pending) - offset >= chunk_frames:
+                yield position, pending[offset:offset + chunk_frames]
+                position += chunk_frames
+                offset += chunk_frames
+            pending = pending[offset:]
+
+        if len(pending):
+            yield position, pending
+
+    def get_range(self, start: int, end: int) -> np.ndarray:
+        """读取一段目标采样率的采样（单独重采样，用于出错回退）"""
+        resampler = PolyphaseResampler(self.source.sample_rate, self.sample_rate, start)
+        input_end = -(-end * resampler.down // resampler.up) + resampler.taps
+        samples = self.source.get_range(resampler.input_start, input_end)
+        out = np.concatenate((resampler.process(samples), resampler.flush()))
+        return out[:max(end - start, 0)]
+
+    def close(self):
+        self.source.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def detect_input_type(media_path: str) -> str:
+    """
+    判断输入文件类型
+
+    16位PCM WAV和裸PCM可以直接读取（采样率不同时在进程内重采样），不需要提取；
+    其他音频和视频都只解码音频流。只读取扩展名和WAV头，不启动ffmpeg。
+
+    Args:
+        media_path: 输入文件路径
+
+    Returns:
+        INPUT_PCM、INPUT_AUDIO或INPUT_VIDEO
+    """
+    suffix = Path(media_path).suffix.lower()
+    if suffix in RAW_PCM_EXTENSIONS:
+        return INPUT_PCM
+    if suffix == '.wav':
+        try:
+            with WavPcmReader(media_path):
+                return INPUT_PCM
+        except (OSError, ValueError):
+            return INPUT_AUDIO
+    if suffix in AUDIO_EXTENSIONS:
+        return INPUT_AUDIO
+    return INPUT_VIDEO
+
+
+def open_audio_source(audio_path: str, sample_rate: int = 16000,
+                      history_seconds: float = 10.0):
+    """
+    打开音频数据源，产出sample_rate单声道float32
+
+    16位PCM WAV直接内存映射读取，多声道取平均，采样率不同时在进程内重采样；
+    裸PCM按sample_rate单声道读取；其他文件（视频、压缩音频、其他位深的WAV）
+    通过ffmpeg管道流式解码。
+
+    Args:
+        audio_path: 音视频文件路径
+        sample_rate: 需要解码时的目标采样率
+        history_seconds: 管道流保留用于回退的采样时长（秒）
+
+    Returns:
+        WavPcmReader、RawPcmReader、ResamplingSource或FfmpegPcmStream
+    """
+    suffix = Path(audio_path).suffix.lower()
+    if suffix in RAW_PCM_EXTENSIONS:
+        return RawPcmReader(audio_path, sample_rate)
+    if suffix == '.wav':
+        try:
+            reader = WavPcmReader(audio_path)
+        except ValueError:
+            pass
+        else:
+            if reader.sample_rate != sample_rate:
+                return ResamplingSource(reader, sample_rate)
+            return reader
+    return FfmpegPcmStream(audio_path, sample_rate, history_seconds)
+
+
+class PrefetchingSource:
+    """
+    解码与识别流水线
+
+    后台线程从底层数据源读取并解码音频块，放入有界队列；识别线程从队列取块。
+    队列满时解码线程阻塞（背压），内存占用上限为 (queue_blocks + 2) 个块。
+    块缓冲区预先分配并循环使用，不逐块分配。
+    """
+
+    def __init__(self, source, queue_blocks: int = 64):
+        """
+        Args:
+            source: 底层数据源（WavPcmReader或FfmpegPcmStream）
+            queue_blocks: 队列中最多缓存的块数
+        """
+        self.source = source
+        self.queue_blocks = max(1, queue_blocks)
+        self.stats = {}
+
+    @property
+    def sample_rate(self) -> int:
+        return self.source.sample_rate
+
+    @property
+    def num_channels(self) -> int:
+        return self.source.num_channels
+
+    @property
+    def num_frames(self) -> int:
+        return self.source.num_frames
+
+    @property
+    def duration(self) -> float:
+        return self.source.duration
+
+    def get_range(self, start: int, end: int) -> np.ndarray:
+        return self.source.get_range(start, end)
+
+    def _produce(self, chunk_frames: int, start_frame: int, free: queue.Queue,
+                 filled: queue.Queue, stop: threading.Event):
+        """解码线程：读取块、复制到空闲缓冲区后入队"""
+        chunks = self.source.iter_chunks(chunk_frames, start_frame)
+        try:
+            t0 = time.perf_counter()
+            for start, block in chunks:
+                t1 = time.perf_counter()
+                buffer = free.get()
+                t2 = time.perf_counter()
+                buffer[:len(block)] = block
+                t3 = time.perf_counter()
+                filled.put((start, buffer, len(block)))
+                t0_next = time.perf_counter()
+
+                # 解码耗时含复制；阻塞耗时为等待空闲缓冲区和等待队列空位
+                self.stats['decode_seconds'] += (t1 - t0) + (t3 - t2)
+                self.stats['producer_blocked_seconds'] += (t2 - t1) + (t0_next - t3)
+                t0 = t0_next
+                self.stats['max_queue_depth'] = max(self.stats['max_queue_depth'], filled.qsize())
+                if stop.is_set():
+                    break
+            filled.put(None)
+        except BaseException as e:
+            filled.put(e)
+        finally:
+            chunks.close()
+
+    def iter_chunks(self, chunk_frames: int, start_frame: int = 0) -> Iterator[Tuple[int, np.ndarray]]:
+        """
+        顺序产出float32音频块（解码在后台线程中提前进行）
+
+        返回的数组在取下一块之前有效。
+
+        Args:
+            chunk_frames: 每块的帧数
+            start_frame: 起始帧
+
+        Yields:
+            (块起始帧, float32采样)
+        """
+        self.stats = {
+            'decode_seconds': 0.0,
+            'producer_blocked_seconds': 0.0,
+            'consumer_wait_seconds': 0.0,
+            'max_queue_depth': 0,
+            'queue_blocks': self.queue_blocks,
+        }
+        free = queue.Queue()
+        for _ in range(self.queue_blocks + 2):
+            free.put(np.empty(chunk_frames, dtype=np.float32))
+        filled = queue.Queue(maxsize=self.queue_blocks)
+        stop = threading.Event()
+
+        producer = threading.Thread(target=self._produce, name="audio-decoder", daemon=True,
+                                    args=(chunk_frames, start_frame, free, filled, stop))
+        wall_start = time.perf_counter()
+        producer.start()
+        try:
+            while True:
+                t0 = time.perf_counter()
+                item = filled.get()
+                self.stats['consumer_wait_seconds'] += time.perf_counter() - t0
+                if item is None:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                start, buffer, frames = item
+                yield start, buffer[:frames]
+                free.put(buffer)
+        finally:
+            # 提前结束时让解码线程退出：置停止标志并归还缓冲区解除其阻塞
+            stop.set()
+            while producer.is_alive():
+                try:
+                    item = filled.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if isinstance(item, tuple):
+                    free.put(item[1])
+            producer.join()
+            self._finish_stats(time.perf_counter() - wall_start)
+
+    def _finish_stats(self, wall_seconds: float):
+        """计算各阶段耗时和重叠时间"""
+        stats = self.stats
+        stats['wall_seconds'] = wall_seconds
+        stats['recognize_seconds'] = max(wall_seconds - stats['consumer_wait_seconds'], 0.0)
+        stats['overlap_seconds'] = max(stats['decode_seconds'] + stats['recognize_seconds'] - wall_seconds, 0.0)
+
+    def format_stats(self) -> str:
+        """阶段耗时摘要"""
+        stats = self.stats
+        if 'wall_seconds' not in stats:
+            return ''
+        return (f"流水线: 解码 {stats['decode_seconds']:.1f}秒, 识别 {stats['recognize_seconds']:.1f}秒, "
+                f"墙钟 {stats['wall_seconds']:.1f}秒, 重叠 {stats['overlap_seconds']:.1f}秒, "
+                f"队列峰值 {stats['max_queue_depth']}/{stats['queue_blocks']}")
+
+    def close(self):
+        self.source.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def find_silence_boundaries(samples: np.ndarray, sample_rate: int, num_segments: int,
+                            frame_duration: float = 0.03, silence_duration: float = 0.3,
+                            search_window: float = 30.0, block_seconds: float = 60.0,
+                            min_gap: float = 0.0) -> List[int]:
+    """
+    在静音处切分音频
+
+    先按帧向量化计算短时能量，再用滑动平均找出持续静音区；每个等分点附近
+    search_window秒内能量最低的位置作为切分点。能量按block_seconds分块计算，
+    长音频也不会一次性转换出整段float数组。
+    每个切分点只在距上一个切分点和音频末尾都不少于min_gap秒的范围内搜索，
+    范围为空时放弃该切分点，静音集中在某处时也不会切出过短的段。
+
+    Args:
+        samples: 单声道int16采样（可为WavPcmReader.samples[:, 0]视图）
+        sample_rate: 采样率
+        num_segments: 期望的段数
+        frame_duration: 能量帧长（秒）
+        silence_duration: 静音判定的平滑窗口（秒）
+        search_window: 等分点两侧的搜索范围（秒）
+        block_seconds: 能量计算的分块时长（秒）
+        min_gap: 相邻切分点（包括首尾）之间的最短间隔（秒）
+
+    Returns:
+        递增的切分点采样偏移，首尾为0和总采样数
+    """
+    total = len(samples)
+    frame_len = max(1, int(sample_rate * frame_duration))
+    num_frames = total // frame_len
+
+    if num_segments <= 1 or num_frames < num_segments * 2:
+        return [0, total]
+
+    # 分块计算每帧能量
+    energy = np.empty(num_frames, dtype=np.float32)
+    frames_per_block = max(1, int(block_seconds / frame_duration))
+    for begin in range(0, num_frames, frames_per_block):
+        end = min(begin + frames_per_block, num_frames)
+        block = samples[begin * frame_len:end * frame_len].reshape(end - begin, frame_len)
+        block = block.astype(np.float32)
+        energy[begin:end] = np.einsum('ij,ij->i', block, block) / frame_len
+
+    # 滑动平均，低值表示一段持续的静音而非单帧的瞬时低谷
+    width = max(1, min(int(silence_duration / frame_duration), num_frames))
+    cumsum = np.concatenate(([0.0], np.cumsum(energy, dtype=np.float64)))
+    smoothed = (cumsum[width:] - cumsum[:-width]) / width
+
+    window = max(1, int(search_window / frame_duration))
+    gap = int(math.ceil(min_gap / frame_duration))
+    # 切分点取静音窗口的中心帧：smoothed[k]对应帧k + half
+    half = width // 2
+    boundaries = [0]
+    previous = 0
+    for i in range(1, num_segments):
+        target = i * num_frames // num_segments
+        lo = max(target - window, previous + gap - half, 0)
+        hi = min(target + window, len(smoothed), num_frames - gap - half + 1)
+        if hi <= lo:
+            continue
+        frame = lo + int(np.argmin(smoothed[lo:hi])) + half
+        sample = frame * frame_len
+        if boundaries[-1] < sample < total:
+            boundaries.append(sample)
+            previous = frame
+    boundaries.append(total)
+    return boundaries
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+批量处理清单模块
+在输出目录中记录已处理文件的状态、模型和解码配置，重新运行时跳过未变化的文件
+"""
+
+import os
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+
+# 清单文件名（位于输出目录中）
+MANIFEST_NAME = '.batch_manifest.json'
+
+# 影响识别结果的识别配置项（线程数、节奏、流水线深度等只影响速度，不计入）
+DECODING_KEYS = (
+    'decoding_method', 'enable_endpoint_detection', 'endpoint_rules',
+    'hotwords_file', 'hotwords_score',
+)
+
+
+def decoding_signature(recognition_config: Dict[str, Any], output_config: Dict[str, Any],
+                       chunk_size: float, output_format: str) -> Dict[str, Any]:
+    """
+    生成解码配置签名，其中任一项变化时已有结果失效
+
+    Args:
+        recognition_config: 识别配置
+        output_config: 输出配置
+        chunk_size: 实际使用的块大小（秒）
+        output_format: 实际使用的输出格式
+    """
+    signature = {key: recognition_config.get(key) for key in DECODING_KEYS}
+    signature.update({
+        "chunk_size": chunk_size,
+        "output_format": output_format,
+        "save_timestamps": bool(output_config.get('save_timestamps', False)),
+        "encoding": output_config.get('encoding', 'utf-8'),
+    })
+    return signature
+
+
+class BatchManifest:
+    """
+    输出目录中的已处理文件清单（.batch_manifest.json）
+
+    以源文件绝对路径为键，记录源文件大小、修改时间、状态变更时间、模型ID、解码配置签名和输出路径。
+    判断是否需要处理时只做一次字典查找和一次stat，不读取文件内容；状态变更时间（ctime）
+    无法由用户设置，改写后恢复了大小和修改时间的文件也能识别出来。
+    模型或解码配置变化、源文件变化、输出文件缺失时条目失效。
+    """
+
+    def __init__(self, output_dir: str, flush_interval: float = 5.0):
+        """
+        Args:
+            output_dir: 批量输出目录
+            flush_interval: 写回清单的最短间隔（秒），结束时调用save写回剩余记录
+        """
+        self.path = Path(output_dir) / MANIFEST_NAME
+        self.flush_interval = flush_interval
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._dirty = False
+        self._last_save = time.monotonic()
+
+    def load(self) -> int:
+        """
+        读取清单
+
+        Returns:
+            条目数
+        """
+        if not self.path.exists():
+            return 0
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f).get("files", {})
+        except Exception as e:
+            print(f"批量清单读取失败，忽略: {e}")
+            self.entries = {}
+        return len(self.entries)
+
+    @staticmethod
+    def _key(source_path: Path) -> str:
+        return str(Path(source_path).resolve())
+
+    def is_current(self, source_path: Path, output_path: Path, model_id: str,
+                   decoding: Dict[str, Any]) -> bool:
+        """
+        源文件是否已用相同模型和解码配置处理过且输出仍然存在
+
+        Args:
+            source_path: 源文件路径
+            output_path: 本次的输出路径
+            model_id: 本次使用的模型ID
+            decoding: 本次的解码配置签名
+        """
+        entry = self.entries.get(self._key(source_path))
+        if entry is None:
+            return False
+        if entry.get("model_id") != model_id or entry.get("decoding") != decoding:
+            return False
+        if entry.get("output_path") != str(output_path):
+            return False
+        try:
+            stat = Path(source_path).stat()
+        except OSError:
+            return False
+        if (entry.get("size") != stat.st_size or entry.get("mtime_ns") != stat.st_mtime_ns
+                or entry.get("ctime_ns") != stat.st_ctime_ns):
+            return False
+        return Path(output_path).exists()
+
+    def record(self, source_path: Path, output_path: Path, model_id: str,
+               decoding: Dict[str, Any]):
+        """
+        记录处理成功的文件
+
+        Args:
+            source_path: 源文件路径
+            output_path: 输出路径
+            model_id: 使用的模型ID
+            decoding: 解码配置签名
+        """
+        stat = Path(source_path).stat()
+        self.entries[self._key(source_path)] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "ctime_ns": stat.st_ctime_ns,
+            "model_id": model_id,
+            "decoding": decoding,
+            "output_path": str(output_path),
+            "processed_at": time.strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        self._dirty = True
+        if time.monotonic() - self._last_save >= self.flush_interval:
+            self.save()
+
+    def remove(self, source_path: Path):
+        """删除条目（处理失败时，避免保留过期的记录）"""
+        if self.entries.pop(self._key(source_path), None) is not None:
+            self._dirty = True
+
+    def save(self):
+        """原子写回清单"""
+        if not self._dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": 1, "files": self.entries}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+        self._last_save = time.monotonic()
+
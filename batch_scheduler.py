@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+批量调度模块
+边扫描边探测音视频时长，在有限的预读窗口内按时长最长优先派发多进程批量任务，
+超长文件在静音处切分到多个进程，并预测完工时间（makespan）
+"""
+
+import os
+import json
+import heapq
+import math
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from audio_source import (WavPcmReader, probe_media, RAW_PCM_EXTENSIONS, available_cpus)
+
+
+# 时长缓存文件名（位于批量输出目录中）
+DURATION_CACHE_NAME = '.batch_durations.json'
+
+# 切分后每段的最短时长（秒），与单文件并行识别一致
+MIN_PART_SECONDS = 60.0
+
+
+def probe_duration(media_path: Path, sample_rate: int = 16000) -> Optional[float]:
+    """
+    获取音视频时长（秒）
+
+    16位PCM WAV只读文件头，裸PCM按文件大小计算，其他格式读取容器头；失败返回None。
+    """
+    path = Path(media_path)
+    suffix = path.suffix.lower()
+    try:
+        if suffix in RAW_PCM_EXTENSIONS:
+            return path.stat().st_size / 2 / sample_rate
+        if suffix == '.wav':
+            try:
+                with WavPcmReader(path) as reader:
+                    return reader.duration
+            except ValueError:
+                pass
+        return probe_media(path)["duration"]
+    except (OSError, RuntimeError):
+        return None
+
+
+class DurationCache:
+    """
+    源文件时长缓存（.batch_durations.json）
+
+    以源文件绝对路径为键记录大小、修改时间和时长，文件未变化时不再探测。
+    可在多个探测线程中同时使用。
+    """
+
+    def __init__(self, cache_dir: str):
+        """
+        Args:
+            cache_dir: 缓存文件所在目录（通常为批量输出目录）
+        """
+        self.path = Path(cache_dir) / DURATION_CACHE_NAME
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def load(self):
+        """读取缓存，文件不存在或损坏时为空"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f).get("files", {})
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def save(self):
+        """原子写回缓存"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        with self._lock:
+            data = json.dumps({"version": 1, "files": self.entries}, ensure_ascii=False)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+
+    def get_duration(self, media_path: Path, sample_rate: int = 16000) -> float:
+        """
+        获取文件时长，未缓存或已变化时探测并记入缓存
+
+        Returns:
+            时长（秒），无法探测时为0
+        """
+        key = str(Path(media_path).resolve())
+        try:
+            stat = Path(media_path).stat()
+        except OSError:
+            return 0.0
+        with self._lock:
+            entry = self.entries.get(key)
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return entry["duration"]
+
+        duration = probe_duration(media_path, sample_rate)
+        if not duration:
+            return 0.0
+        with self._lock:
+            self.entries[key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                                 "duration": duration}
+        return duration
+
+
+class DurationFeed:
+    """
+    在后台线程中消费文件生成器并并发探测时长
+
+    扫描和探测与处理同时进行，已探测的文件立即可取，不必等待整棵目录树遍历完。
+    已发现但尚未派发的文件不超过lookahead个，调用方每派发一个文件调用一次release。
+    """
+
+    def __init__(self, files: Iterable[Path], cache: DurationCache, sample_rate: int = 16000,
+                 lookahead: int = 32, max_workers: int = None):
+        """
+        Args:
+            files: 文件列表或生成器
+            cache: 时长缓存
+            sample_rate: 裸PCM的采样率
+            lookahead: 预读窗口大小（已发现但尚未派发的文件数上限）
+            max_workers: 并发探测的线程数（探测在ffmpeg子进程中进行）
+        """
+        self.cache = cache
+        self.sample_rate = sample_rate
+        self.max_workers = max_workers or min(32, available_cpus() * 4)
+        self.error: Optional[BaseException] = None
+        self._files = files
+        self._results: queue.Queue = queue.Queue()
+        self._slots = threading.Semaphore(max(1, lookahead))
+        self._stopped = threading.Event()
+        self._finished = False
+        self._thread = threading.Thread(target=self._run, name='duration-feed', daemon=True)
+
+    def start(self) -> 'DurationFeed':
+        self._thread.start()
+        return self
+
+    def _probe(self, path: Path):
+        self._results.put((path, self.cache.get_duration(path, self.sample_rate)))
+
+    def _run(self):
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                for path in self._files:
+                    self._slots.acquire()
+                    if self._stopped.is_set():
+                        break
+                    executor.submit(self._probe, path)
+        except BaseException as e:
+            self.error = e
+        finally:
+            # 结束标记
+            self._results.put(None)
+
+    def take(self, block: bool = False) -> List[Tuple[Path, float]]:
+        """
+        取出已探测的文件
+
+        Args:
+            block: 没有可取的文件时是否等待，直到至少取到一个或全部结束
+
+        Returns:
+            [(文件, 时长)]
+        """
+        items = []
+        while not self._finished:
+            try:
+                item = self._results.get(block=block and not items)
+            except queue.Empty:
+                break
+            if item is None:
+                self._finished = True
+                if self.error is not None:
+                    raise self.error
+            else:
+                items.append(item)
+        return items
+
+    def release(self):
+        """派发了一个文件，允许再预读一个"""
+        self._slots.release()
+
+    @property
+    def finished(self) -> bool:
+        """所有文件都已取出"""
+        return self._finished
+
+    def close(self):
+        """停止扫描（中断时调用）"""
+        self._stopped.set()
+        self._slots.release()
+
+
+def plan_split(media_path: Path, duration: float, total_duration: float, workers: int,
+               min_part_seconds: float = MIN_PART_SECONDS) -> int:
+    """
+    决定文件切分为几段
+
+    单个文件长于平均每个进程的工作量（已知总时长 / 进程数）时，它会单独决定完工时间，
+    按该工作量切分为若干段，每段不短于min_part_seconds，段数不超过进程数。
+
+    Returns:
+        段数，1为不切分
+    """
+    if workers <= 1 or Path(media_path).suffix.lower() in RAW_PCM_EXTENSIONS:
+        return 1
+    share = total_duration / workers
+    if share <= 0 or duration <= share:
+        return 1
+    return max(1, min(workers, math.ceil(duration / share), int(duration // min_part_seconds)))
+
+
+def predict_makespan(costs: Iterable[float], workers: int) -> float:
+    """
+    按给定顺序把任务依次分给最先空闲的进程，返回最后一个进程的完成时间
+
+    Args:
+        costs: 按派发顺序排列的任务工作量
+        workers: 进程数
+    """
+    loads = [0.0] * max(1, workers)
+    for cost in costs:
+        heapq.heapreplace(loads, loads[0] + cost)
+    return max(loads)
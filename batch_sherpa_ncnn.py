@@ -6,58 +6,531 @@
 import os
 import sys
 import time
+import signal
 import argparse
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 from pathlib import Path
-from typing import List, Optional
-from sherpa_ncnn_video_to_text import VideoToTextSherpaNcnn
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from sherpa_ncnn_video_to_text import VideoToTextSherpaNcnn, PACING_MODES
+from transcript_writer import get_writer, write_transcript, OUTPUT_FORMATS
 from config_manager import ConfigManager
+from audio_source import available_cpus, detect_input_type, INPUT_PCM
+from media_scanner import iter_media_files
+from folder_watcher import FolderWatcher
+from batch_manifest import BatchManifest, decoding_signature
+from batch_scheduler import DurationCache, DurationFeed, plan_split, predict_makespan
+from parallel_recognition import decode_range, plan_segments
+
+
+# 批量任务的派发顺序：longest按时长最长优先，scan按扫描顺序边扫描边处理
+SCHEDULE_MODES = ('longest', 'scan')
+
+
+# 工作进程内的转换器，每个进程只加载一次识别器
+_worker_converter = None
+
+
+def plan_batch_workers(workers: int, num_files: int = None, cores: int = None) -> Tuple[int, int]:
+    """
+    分配批量处理的进程数和每个进程的识别线程数
+
+    进程数不超过文件数（未知时不限）和CPU核数，线程数按 进程数 × 线程数 ≈ CPU核数 分配。
+
+    Returns:
+        (进程数, 每个进程的识别线程数)
+    """
+    cores = cores or available_cpus()
+    workers = max(1, min(workers, cores, num_files or workers))
+    return workers, max(1, cores // workers)
+
+
+def _worker_mp_context():
+    """
+    工作进程的启动方式
+
+    主进程中有扫描和探测线程在运行，fork出的子进程可能继承被这些线程持有的锁
+    （如import锁）而永远等待，因此不使用fork：优先forkserver，不支持时（Windows）用spawn。
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+def _init_batch_worker(config_file: str, model_id: Optional[str], num_threads: int):
+    """工作进程初始化：加载配置和识别器"""
+    global _worker_converter
+    _worker_converter = VideoToTextSherpaNcnn(config_file, model_id, num_threads)
+    # 文件之间已经并行，单个文件的提取不再分段并行
+    _worker_converter.audio_config = dict(_worker_converter.audio_config, extract_ranges=1)
+
+
+def _process_in_worker(video_path: str, output_path: str, chunk_size: Optional[float],
+                       pacing: Optional[str], output_format: Optional[str]) -> Tuple[bool, float, Optional[str]]:
+    """
+    在工作进程中处理一个文件
+
+    Returns:
+        (是否成功, 耗时（秒）, 异常信息)
+    """
+    start = time.time()
+    try:
+        # 多个进程同时输出，不显示进度条；单文件内不再切分并行
+        success = _worker_converter.process_video(
+            video_path, output_path, chunk_size, show_progress=False, pacing=pacing,
+            parallel_workers=0, output_format=output_format
+        )
+        return success, time.time() - start, None
+    except Exception as e:
+        return False, time.time() - start, str(e)
+
+
+def _prepare_in_worker(video_path: str, num_parts: int) -> Tuple[Optional[str], bool, List[int], int, float, Optional[str]]:
+    """
+    在工作进程中为切分处理准备音频：提取为WAV（或直接使用PCM WAV）并在静音处规划切分点
+
+    Returns:
+        (WAV路径, 是否为需要删除的临时文件, 切分点采样偏移列表, 采样率, 耗时（秒）, 异常信息)
+    """
+    start = time.time()
+    try:
+        converter = _worker_converter
+        if detect_input_type(video_path) == INPUT_PCM and Path(video_path).suffix.lower() == '.wav':
+            audio_path, temporary = video_path, False
+        else:
+            audio_path = converter.extract_audio(video_path)
+            if not audio_path:
+                return None, False, [], 0, time.time() - start, "音频提取失败"
+            temporary = not (converter.audio_cache is not None and converter.audio_cache.owns(audio_path))
+        boundaries, sample_rate = plan_segments(audio_path, num_parts)
+        return audio_path, temporary, boundaries, sample_rate, time.time() - start, None
+    except Exception as e:
+        return None, False, [], 0, time.time() - start, str(e)
+
+
+def _decode_part_in_worker(audio_path: str, start_sample: int, end_sample: int,
+                           chunk_frames: int) -> Tuple[List[Dict[str, Any]], float, Optional[str]]:
+    """
+    在工作进程中解码WAV的一段，使用进程内已加载的识别器
+
+    Returns:
+        (语句列表, 耗时（秒）, 异常信息)
+    """
+    start = time.time()
+    try:
+        endpoint_enabled = _worker_converter.recognition_config.get('enable_endpoint_detection', False)
+        segments = decode_range(_worker_converter.recognizer.recognizer, audio_path,
+                                start_sample, end_sample, chunk_frames, endpoint_enabled)
+        return segments, time.time() - start, None
+    except Exception as e:
+        return [], time.time() - start, str(e)
 
 
 class BatchVideoToText:
     """批量视频转文本工具"""
     
-    def __init__(self, config_file: str = "config.json", model_id: str = None):
+    def __init__(self, config_file: str = "config.json", model_id: str = None, workers: int = None):
         """
         初始化批量处理工具
         
         Args:
             config_file: 配置文件路径
             model_id: 模型ID
+            workers: 并行处理的进程数，为None时使用配置（performance.parallel_threads），
+                1为串行，0为按CPU核数和识别线程数自动确定
         """
         self.config_manager = ConfigManager(config_file)
-        self.converter = VideoToTextSherpaNcnn(config_file, model_id)
+        self.model_id = model_id or self.config_manager.get_default_model()
+        if not self.model_id:
+            raise ValueError("没有可用的模型")
+        self._converter = None
         self.processed_files = []
         self.failed_files = []
+        self.skipped_files = []
+        # 当前批次的已处理清单和解码配置签名（process_batch中设置）
+        self.manifest = None
+        self.decoding = None
         self.config_file = config_file
+        if workers is None:
+            workers = int(self.config_manager.get_performance_config().get('parallel_threads', 1))
+        if workers <= 0:
+            # 自动：按配置的识别线程数划分CPU核
+            threads = int(self.config_manager.get_recognition_config().get('num_threads', 4))
+            workers = available_cpus() // max(1, threads)
+        self.workers = max(1, workers)
     
-    def find_video_files(self, directory: str, extensions: List[str] = None) -> List[Path]:
+    @property
+    def converter(self) -> VideoToTextSherpaNcnn:
+        """主进程中的转换器，首次使用时才加载识别器（多进程模式下由工作进程各自加载）"""
+        if self._converter is None:
+            self._converter = VideoToTextSherpaNcnn(self.config_file, self.model_id)
+        return self._converter
+    
+    def iter_video_files(self, directory: str, extensions: List[str] = None,
+                         recursive: bool = True, include: List[str] = None,
+                         exclude: List[str] = None, max_depth: int = None) -> Iterator[Path]:
         """
-        查找目录中的视频文件
+        边遍历边产出目录中的视频和音频文件（单次scandir遍历，扩展名不区分大小写）
+        
+        同一目录下同名的视频和音频（如提取出的WAV）输出路径相同，只产出视频。
         
         Args:
             directory: 搜索目录
-            extensions: 视频文件扩展名列表
+            extensions: 文件扩展名列表，默认为支持的视频、音频和裸PCM扩展名
+            recursive: 是否包含子目录
+            include: 包含模式（如 "*.mp4"、"2024/*"），指定时只处理匹配的文件
+            exclude: 排除模式，匹配的文件和目录都跳过
+            max_depth: 最大子目录深度，None为不限（recursive为False时为0）
             
-        Returns:
-            视频文件路径列表
+        Yields:
+            文件路径
         """
-        if extensions is None:
-            extensions = ['.mp4', '.avi', '.mov', '.wmv', '.flv', '.mkv', '.webm']
-        
         directory = Path(directory)
         if not directory.exists():
             print(f"目录不存在: {directory}")
-            return []
+            return
+        
+        yield from iter_media_files(directory, extensions, include, exclude,
+                                    max_depth if recursive else 0)
+    
+    def find_video_files(self, directory: str, extensions: List[str] = None,
+                         recursive: bool = True, include: List[str] = None,
+                         exclude: List[str] = None, max_depth: int = None) -> List[Path]:
+        """
+        查找目录中的视频和音频文件，参数同iter_video_files
+        
+        Returns:
+            文件路径列表
+        """
+        return list(self.iter_video_files(directory, extensions, recursive, include, exclude, max_depth))
+    
+    def output_path_for(self, video_path: Path, output_dir: Path = None,
+                        output_format: str = None) -> Path:
+        """文件对应的输出路径（输出目录为空时放在源文件旁边）"""
+        if output_dir is None:
+            output_dir = video_path.parent
+        if output_format is None:
+            output_format = self.config_manager.get_output_config().get('format', 'txt')
+        return Path(output_dir) / f"{video_path.stem}{get_writer(output_format).extension}"
+    
+    def process_files_parallel(self, video_files: Iterable[Path], output_dir: Path,
+                               chunk_size: float = None, pacing: str = None,
+                               output_format: str = None, workers: int = 2, num_threads: int = 1):
+        """
+        多进程处理文件
+        
+        每个工作进程加载一次自己的识别器，从进程池的任务队列中依次领取文件。
+        video_files可以是边扫描边产出的生成器：同时排队的任务不超过进程数的两倍，
+        扫描和处理交替进行。
+        
+        Args:
+            video_files: 文件列表或生成器
+            output_dir: 输出目录
+            chunk_size: 流式处理块大小
+            pacing: 解码节奏（max/realtime），为None时使用配置
+            output_format: 输出格式（txt/srt/vtt/jsonl），为None时使用配置
+            workers: 进程数
+            num_threads: 每个进程的识别线程数
+        """
+        print(f"多进程处理: {workers} 个进程 × {num_threads} 个识别线程")
+        
+        files = iter(video_files)
+        pending = {}
+        done = 0
+        with ProcessPoolExecutor(max_workers=workers, mp_context=_worker_mp_context(),
+                                 initializer=_init_batch_worker,
+                                 initargs=(self.config_file, self.model_id, num_threads)) as executor:
+            try:
+                while True:
+                    # 补充任务到队列上限
+                    for video_file in files:
+                        future = executor.submit(
+                            _process_in_worker, str(video_file),
+                            str(self.output_path_for(video_file, output_dir, output_format)),
+                            chunk_size, pacing, output_format
+                        )
+                        pending[future] = video_file
+                        if len(pending) >= workers * 2:
+                            break
+                    if not pending:
+                        break
+                    
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        video_file = pending.pop(future)
+                        done += 1
+                        try:
+                            success, elapsed, error = future.result()
+                        except Exception as e:
+                            # 工作进程异常退出
+                            success, elapsed, error = False, 0.0, str(e)
+                        
+                        self._record_result(done, video_file, output_dir, output_format,
+                                            success, elapsed, error)
+            except KeyboardInterrupt:
+                # 未开始的文件不再处理，正在处理的文件留下断点
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+    
+    def process_files_scheduled(self, video_files: Iterable[Path], output_dir: Path,
+                                chunk_size: float = None, pacing: str = None,
+                                output_format: str = None, workers: int = 2, num_threads: int = 1,
+                                split_long: bool = True, lookahead: int = None):
+        """
+        按时长最长优先的顺序多进程处理文件
+        
+        后台线程边扫描边探测时长（缓存在输出目录的.batch_durations.json中，未变化的文件不再探测），
+        有进程空闲时从已探测但尚未派发的文件（预读窗口，最多lookahead个）中取最长的派发，
+        扫描未结束也不等待。比平均每个进程的工作量（按已发现的总时长计算）还长的文件在静音处
+        切分为多段，由多个进程各自用已加载的识别器解码后按顺序合并。
+        结束后按实测实时率对比预测与实际的完工时间。
+        
+        Args:
+            video_files: 文件列表或生成器
+            output_dir: 输出目录
+            chunk_size: 流式处理块大小
+            pacing: 解码节奏（max/realtime），为None时使用配置；realtime时不切分
+            output_format: 输出格式（txt/srt/vtt/jsonl），为None时使用配置
+            workers: 进程数
+            num_threads: 每个进程的识别线程数
+            split_long: 是否切分超长文件
+            lookahead: 预读窗口大小，为None时为进程数的8倍
+        """
+        recognition_config = self.config_manager.get_recognition_config()
+        if chunk_size is None:
+            chunk_size = recognition_config.get('chunk_size', 0.1)
+        if (pacing or recognition_config.get('pacing', 'max')) != 'max':
+            split_long = False
+        if lookahead is None:
+            lookahead = workers * 8
+        
+        cache = DurationCache(output_dir)
+        cache.load()
+        feed = DurationFeed(video_files, cache,
+                            self.config_manager.get_audio_config().get('sample_rate', 16000),
+                            lookahead).start()
+        print(f"多进程处理: {workers} 个进程 × {num_threads} 个识别线程，"
+              f"在 {lookahead} 个文件的预读窗口内按时长最长优先")
+        
+        # 已探测、尚未派发的文件 -> 时长
+        window: Dict[Path, float] = {}
+        durations: Dict[Path, float] = {}
+        total_audio = 0.0
+        # 按扫描顺序和实际派发顺序排列的任务工作量，用于事后对比完工时间
+        scan_costs = []
+        dispatched_costs = []
+        # 任务: ('file', 文件) 整个文件；('prepare', 文件, 段数) 提取并规划切分点；('part', 文件, 段序号) 解码一段
+        tasks = deque()
+        jobs = {}
+        pending = {}
+        done = 0
+        busy_time = 0.0
+        finished_audio = 0.0
+        start_time = time.time()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=_worker_mp_context(),
+                                 initializer=_init_batch_worker,
+                                 initargs=(self.config_file, self.model_id, num_threads)) as executor:
+            try:
+                while True:
+                    # 取出已探测的文件；无事可做时等待扫描
+                    for path, duration in feed.take(block=not (tasks or pending or window)):
+                        window[path] = duration
+                        durations[path] = duration
+                        total_audio += duration
+                        scan_costs.append(duration)
+                    if not (tasks or pending or window) and feed.finished:
+                        break
+                    
+                    # 只保持每个进程一个任务，派发顺序尽量晚地决定
+                    while len(pending) < workers and (tasks or window):
+                        if not tasks:
+                            path = max(window, key=lambda item: (window[item], str(item)))
+                            duration = window.pop(path)
+                            feed.release()
+                            parts = plan_split(path, duration, total_audio, workers) if split_long else 1
+                            dispatched_costs.extend([duration / parts] * parts)
+                            tasks.append(('prepare', path, parts) if parts > 1 else ('file', path))
+                        task = tasks.popleft()
+                        kind, path = task[0], task[1]
+                        if kind == 'file':
+                            future = executor.submit(
+                                _process_in_worker, str(path),
+                                str(self.output_path_for(path, output_dir, output_format)),
+                                chunk_size, pacing, output_format
+                            )
+                        elif kind == 'prepare':
+                            future = executor.submit(_prepare_in_worker, str(path), task[2])
+                        else:
+                            job = jobs[path]
+                            boundaries = job["boundaries"]
+                            future = executor.submit(_decode_part_in_worker, job["audio_path"],
+                                                     boundaries[task[2]], boundaries[task[2] + 1],
+                                                     job["chunk_frames"])
+                        pending[future] = task
+                    if not pending:
+                        continue
+                    
+                    # 有空闲进程而扫描未结束时定期醒来领取新探测到的文件
+                    idle = len(pending) < workers and not feed.finished
+                    finished, _ = wait(pending, timeout=0.2 if idle else None,
+                                       return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        task = pending.pop(future)
+                        kind, path = task[0], task[1]
+                        
+                        if kind == 'file':
+                            try:
+                                success, elapsed, error = future.result()
+                            except Exception as e:
+                                # 工作进程异常退出
+                                success, elapsed, error = False, 0.0, str(e)
+                            busy_time += elapsed
+                            finished_audio += durations[path]
+                            done += 1
+                            self._record_result(done, path, output_dir, output_format,
+                                                success, elapsed, error)
+                        
+                        elif kind == 'prepare':
+                            try:
+                                audio_path, temporary, boundaries, sample_rate, elapsed, error = future.result()
+                            except Exception as e:
+                                audio_path, temporary, boundaries, sample_rate, elapsed, error = (
+                                    None, False, [], 0, 0.0, str(e))
+                            busy_time += elapsed
+                            if error:
+                                finished_audio += durations[path]
+                                done += 1
+                                self._record_result(done, path, output_dir, output_format,
+                                                    False, elapsed, error)
+                                continue
+                            num_parts = len(boundaries) - 1
+                            jobs[path] = {
+                                "audio_path": audio_path,
+                                "temporary": temporary,
+                                "boundaries": boundaries,
+                                "chunk_frames": max(1, int(chunk_size * sample_rate)),
+                                "results": [None] * num_parts,
+                                "remaining": num_parts,
+                                "started": time.time() - elapsed,
+                                "error": None,
+                            }
+                            print(f"切分处理: {path} -> {num_parts} 段")
+                            # 各段排在队首，尽快由空闲的进程领取
+                            tasks.extendleft(('part', path, i) for i in reversed(range(num_parts)))
+                        
+                        else:
+                            try:
+                                segments, elapsed, error = future.result()
+                            except Exception as e:
+                                segments, elapsed, error = [], 0.0, str(e)
+                            busy_time += elapsed
+                            job = jobs[path]
+                            job["results"][task[2]] = segments
+                            job["error"] = job["error"] or error
+                            job["remaining"] -= 1
+                            if job["remaining"]:
+                                continue
+                            del jobs[path]
+                            success, error = self._finish_split_file(path, job, output_dir, output_format)
+                            finished_audio += durations[path]
+                            done += 1
+                            self._record_result(done, path, output_dir, output_format,
+                                                success, time.time() - job["started"], error)
+            except KeyboardInterrupt:
+                # 未开始的文件不再处理，正在处理的文件留下断点
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+            finally:
+                feed.close()
+                cache.save()
+                # 中断时清理未合并完的切分文件的临时音频
+                for job in jobs.values():
+                    self._remove_temporary_audio(job)
         
-        video_files = []
-        for ext in extensions:
-            video_files.extend(directory.rglob(f"*{ext}"))
-            video_files.extend(directory.rglob(f"*{ext.upper()}"))
+        actual = time.time() - start_time
+        if finished_audio > 0 and busy_time > 0:
+            # 单个进程每秒音频的处理用时
+            rtf = busy_time / finished_audio
+            print(f"共 {len(durations)} 个文件，{total_audio / 60:.1f} 分钟音频")
+            print(f"完工时间: 实际 {actual:.1f}秒，按实际派发顺序预测 "
+                  f"{predict_makespan(dispatched_costs, workers) * rtf:.1f}秒，按扫描顺序预测 "
+                  f"{predict_makespan(scan_costs, workers) * rtf:.1f}秒（实测实时率 {rtf:.3f}）")
+    
+    def _finish_split_file(self, video_path: Path, job: Dict[str, Any], output_dir: Path,
+                           output_format: str) -> Tuple[bool, Optional[str]]:
+        """
+        合并切分文件各段的语句并写出结果，清理临时音频
         
-        return sorted(video_files)
+        Returns:
+            (是否成功, 异常信息)
+        """
+        try:
+            if job["error"]:
+                return False, job["error"]
+            segments = [segment for part in job["results"] for segment in part]
+            if not segments:
+                return False, "识别结果为空"
+            for index, segment in enumerate(segments):
+                segment['index'] = index
+            
+            # 先写临时文件再原子重命名，不留下不完整的输出
+            output_config = self.config_manager.get_output_config()
+            output_path = self.output_path_for(video_path, output_dir, output_format)
+            tmp_path = output_path.with_name(output_path.name + '.tmp')
+            write_transcript(segments, tmp_path, output_format or output_config.get('format', 'txt'),
+                             output_config.get('encoding', 'utf-8'),
+                             output_config.get('save_timestamps', False))
+            os.replace(tmp_path, output_path)
+            return True, None
+        except Exception as e:
+            return False, str(e)
+        finally:
+            self._remove_temporary_audio(job)
+    
+    @staticmethod
+    def _remove_temporary_audio(job: Dict[str, Any]):
+        """删除切分处理时提取的临时音频（缓存中的音频保留）"""
+        if job["temporary"] and Path(job["audio_path"]).exists():
+            try:
+                Path(job["audio_path"]).unlink()
+            except OSError as e:
+                print(f"清理临时文件失败: {e}")
+    
+    def _record_result(self, done: int, video_path: Path, output_dir: Path, output_format: str,
+                       success: bool, elapsed: float, error: Optional[str]):
+        """记录多进程处理的一个文件的结果"""
+        self._update_manifest(video_path, output_dir, output_format, success)
+        if success:
+            self.processed_files.append(video_path)
+            print(f"[{done}] ✓ 处理成功: {video_path} ({elapsed:.1f}秒)")
+        else:
+            self.failed_files.append(video_path)
+            detail = f" - {error}" if error else ""
+            print(f"[{done}] ✗ 处理失败: {video_path}{detail}")
+    
+    def _skip_unchanged(self, video_files: Iterable[Path], output_dir: Path,
+                        output_format: str) -> Iterator[Path]:
+        """过滤掉清单中记录为已处理且未变化的文件（逐个判断，不等待扫描结束）"""
+        for video_file in video_files:
+            output_path = self.output_path_for(video_file, output_dir, output_format)
+            if self.manifest.is_current(video_file, output_path, self.model_id, self.decoding):
+                self.skipped_files.append(video_file)
+            else:
+                yield video_file
+    
+    def _update_manifest(self, video_path: Path, output_dir: Path, output_format: str, success: bool):
+        """处理成功时记入清单，失败时删除旧条目"""
+        if self.manifest is None:
+            return
+        if success:
+            self.manifest.record(video_path, self.output_path_for(video_path, output_dir, output_format),
+                                 self.model_id, self.decoding)
+        else:
+            self.manifest.remove(video_path)
     
     def process_single_file(self, video_path: Path, output_dir: Path = None, 
-                          chunk_size: float = 0.1) -> bool:
+                          chunk_size: float = 0.1, pacing: str = None,
+                          output_format: str = None) -> bool:
         """
         处理单个视频文件
         
@@ -65,22 +538,23 @@ class BatchVideoToText:
             video_path: 视频文件路径
             output_dir: 输出目录
             chunk_size: 流式处理块大小
+            pacing: 解码节奏（max/realtime），为None时使用配置
+            output_format: 输出格式（txt/srt/vtt/jsonl），为None时使用配置
             
         Returns:
             处理是否成功
         """
-        if output_dir is None:
-            output_dir = video_path.parent
-        
-        output_path = output_dir / f"{video_path.stem}.txt"
+        output_path = self.output_path_for(video_path, output_dir, output_format)
         
         print(f"\n处理文件: {video_path}")
         print(f"输出文件: {output_path}")
         
         try:
             success = self.converter.process_video(
-                str(video_path), str(output_path), chunk_size
+                str(video_path), str(output_path), chunk_size, pacing=pacing,
+                output_format=output_format
             )
+            self._update_manifest(video_path, output_dir, output_format, success)
             
             if success:
                 self.processed_files.append(video_path)
@@ -97,15 +571,30 @@ class BatchVideoToText:
             return False
     
     def process_batch(self, input_path: str, output_dir: str = None,
-                     chunk_size: float = 0.1, recursive: bool = False) -> bool:
+                     chunk_size: float = 0.1, recursive: bool = False,
+                     pacing: str = None, output_format: str = None,
+                     force: bool = False, include: List[str] = None,
+                     exclude: List[str] = None, max_depth: int = None,
+                     schedule: str = None, split_long: bool = None) -> bool:
         """
         批量处理视频文件
         
+        输出目录中的清单（.batch_manifest.json）记录已处理的文件，源文件、模型和解码配置
+        都未变化且输出仍存在的文件直接跳过。
+        
         Args:
             input_path: 输入路径（文件或目录）
             output_dir: 输出目录
             chunk_size: 流式处理块大小
             recursive: 是否递归搜索子目录
+            pacing: 解码节奏（max/realtime），为None时使用配置
+            output_format: 输出格式（txt/srt/vtt/jsonl），为None时使用配置
+            force: 忽略清单，重新处理所有文件
+            include: 包含模式（fnmatch），指定时只处理匹配的文件
+            exclude: 排除模式，匹配的文件和目录都跳过
+            max_depth: 递归搜索的最大子目录深度，None为不限
+            schedule: 多进程时的派发顺序（longest/scan），为None时使用配置（performance.batch_schedule）
+            split_long: 是否把超长文件切分到多个进程，为None时使用配置（performance.batch_split_long_files）
             
         Returns:
             是否所有文件都处理成功
@@ -127,32 +616,51 @@ class BatchVideoToText:
         
         start_time = time.time()
         
+        output_format = self._open_manifest(output_dir, chunk_size, output_format, force)
+        
         if input_path.is_file():
-            # 处理单个文件
-            print(f"处理单个文件: {input_path}")
-            success = self.process_single_file(input_path, output_dir, chunk_size)
-            
+            video_files = [input_path]
         else:
-            # 处理目录中的文件
+            # 处理目录中的文件：边扫描边处理，不等待整棵目录树遍历完
             print(f"处理目录: {input_path}")
-            if recursive:
-                video_files = self.find_video_files(input_path)
+            video_files = self.iter_video_files(input_path, recursive=recursive, include=include,
+                                                exclude=exclude, max_depth=max_depth)
+        
+        # 源文件、模型和解码配置都未变化的文件直接跳过
+        if not force:
+            video_files = self._skip_unchanged(video_files, output_dir, output_format)
+        
+        try:
+            if input_path.is_file():
+                for video_file in video_files:
+                    # 处理单个文件
+                    print(f"处理单个文件: {video_file}")
+                    self.process_single_file(video_file, output_dir, chunk_size, pacing, output_format)
             else:
-                video_files = []
-                for ext in ['.mp4', '.avi', '.mov', '.wmv', '.flv', '.mkv', '.webm']:
-                    video_files.extend(input_path.glob(f"*{ext}"))
-                    video_files.extend(input_path.glob(f"*{ext.upper()}"))
-            
-            if not video_files:
-                print("未找到视频文件")
-                return False
-            
-            print(f"找到 {len(video_files)} 个视频文件")
-            
-            # 批量处理
-            for i, video_file in enumerate(video_files, 1):
-                print(f"\n[{i}/{len(video_files)}] 处理文件: {video_file}")
-                self.process_single_file(video_file, output_dir, chunk_size)
+                performance_config = self.config_manager.get_performance_config()
+                if schedule is None:
+                    schedule = performance_config.get('batch_schedule', 'longest')
+                if split_long is None:
+                    split_long = bool(performance_config.get('batch_split_long_files', True))
+                workers, num_threads = plan_batch_workers(self.workers)
+                if workers > 1 and schedule == 'longest':
+                    self.process_files_scheduled(video_files, output_dir, chunk_size, pacing,
+                                                 output_format, workers, num_threads, split_long)
+                elif workers > 1:
+                    self.process_files_parallel(video_files, output_dir, chunk_size, pacing,
+                                                output_format, workers, num_threads)
+                else:
+                    # 批量处理
+                    for i, video_file in enumerate(video_files, 1):
+                        print(f"\n[{i}] 处理文件: {video_file}")
+                        self.process_single_file(video_file, output_dir, chunk_size, pacing, output_format)
+        finally:
+            self.manifest.save()
+        
+        found = len(self.processed_files) + len(self.failed_files) + len(self.skipped_files)
+        if not found:
+            print("未找到视频或音频文件")
+            return False
         
         # 统计结果
         end_time = time.time()
@@ -164,6 +672,7 @@ class BatchVideoToText:
         print(f"总用时: {total_time:.2f}秒")
         print(f"成功处理: {len(self.processed_files)} 个文件")
         print(f"处理失败: {len(self.failed_files)} 个文件")
+        print(f"跳过未变化: {len(self.skipped_files)} 个文件")
         
         if self.processed_files:
             print(f"\n成功处理的文件:")
@@ -177,6 +686,122 @@ class BatchVideoToText:
         
         return len(self.failed_files) == 0
     
+    def _open_manifest(self, output_dir: Path, chunk_size: Optional[float],
+                       output_format: Optional[str], force: bool = False) -> str:
+        """
+        载入输出目录中的已处理清单并生成本次的解码配置签名
+        
+        Returns:
+            实际使用的输出格式
+        """
+        # 清单按实际生效的块大小和输出格式比较
+        recognition_config = self.config_manager.get_recognition_config()
+        output_config = self.config_manager.get_output_config()
+        if output_format is None:
+            output_format = output_config.get('format', 'txt')
+        self.decoding = decoding_signature(
+            recognition_config, output_config,
+            chunk_size if chunk_size is not None else recognition_config.get('chunk_size', 0.1),
+            output_format
+        )
+        self.manifest = BatchManifest(output_dir)
+        if force:
+            print("忽略已处理清单，重新处理所有文件")
+        elif self.manifest.load():
+            print(f"已处理清单: {len(self.manifest.entries)} 条记录")
+        return output_format
+    
+    def watch(self, directory: str, output_dir: str = None, chunk_size: float = None,
+              recursive: bool = False, pacing: str = None, output_format: str = None,
+              include: List[str] = None, exclude: List[str] = None, max_depth: int = None,
+              poll_interval: float = 5.0, stable_seconds: float = 5.0) -> bool:
+        """
+        常驻监视目录，依次处理新出现且已写完的文件
+        
+        识别器在开始监视前加载一次，之后所有文件都在这个已加载的识别器上处理，
+        不再为每批文件重复启动解释器、扫描模型和加载模型。与批量模式共用输出目录中的
+        已处理清单，重启后已处理且未变化的文件不会重复处理。
+        收到SIGTERM或SIGINT后处理完当前文件再退出；再次收到则中断当前文件（留下断点）。
+        
+        Args:
+            directory: 监视目录
+            output_dir: 输出目录，默认为监视目录下的output
+            chunk_size: 流式处理块大小
+            recursive: 是否包含子目录
+            pacing: 解码节奏（max/realtime），为None时使用配置
+            output_format: 输出格式（txt/srt/vtt/jsonl），为None时使用配置
+            include: 包含模式（fnmatch），指定时只处理匹配的文件
+            exclude: 排除模式，匹配的文件和目录都跳过
+            max_depth: 递归监视的最大子目录深度，None为不限
+            poll_interval: inotify不可用时的扫描间隔（秒）
+            stable_seconds: 文件大小和修改时间保持不变多久后视为写完（秒）
+            
+        Returns:
+            退出前处理的文件是否都成功
+        """
+        directory = Path(directory)
+        if not directory.is_dir():
+            print(f"监视目录不存在: {directory}")
+            return False
+        
+        output_dir = Path(output_dir) if output_dir else directory / "output"
+        output_dir.mkdir(parents=True, exist_ok=True)
+        
+        # 作为服务运行时标准输出通常不是终端，按行刷新以便及时看到日志
+        if hasattr(sys.stdout, 'reconfigure'):
+            sys.stdout.reconfigure(line_buffering=True)
+        
+        output_format = self._open_manifest(output_dir, chunk_size, output_format)
+        
+        stop_requested = False
+        
+        def request_stop(signum, frame):
+            nonlocal stop_requested
+            if stop_requested:
+                raise KeyboardInterrupt
+            stop_requested = True
+            print(f"\n收到{signal.Signals(signum).name}，处理完当前文件后退出（再次发送则立即中断）")
+        
+        previous_handlers = {sig: signal.signal(sig, request_stop)
+                             for sig in (signal.SIGTERM, signal.SIGINT)}
+        
+        watcher = None
+        try:
+            # 开始监视前加载识别器，之后的文件不再等待模型加载
+            print("加载识别器...")
+            self.converter.recognizer
+            
+            watcher = FolderWatcher(directory, recursive=recursive, include=include, exclude=exclude,
+                                    max_depth=max_depth, poll_interval=poll_interval,
+                                    stable_seconds=stable_seconds)
+            watcher.start()
+            print(f"监视目录: {directory}（{watcher.mode}），输出目录: {output_dir}")
+            print(f"文件 {stable_seconds:.0f} 秒内不再变化后开始处理，SIGTERM/Ctrl+C 退出")
+            
+            while not stop_requested:
+                for video_file in watcher.wait(1.0):
+                    if stop_requested:
+                        # 未处理的文件下次启动时重新发现
+                        break
+                    output_path = self.output_path_for(video_file, output_dir, output_format)
+                    if self.manifest.is_current(video_file, output_path, self.model_id, self.decoding):
+                        self.skipped_files.append(video_file)
+                        continue
+                    self.process_single_file(video_file, output_dir, chunk_size, pacing, output_format)
+                    self.manifest.save()
+        except KeyboardInterrupt:
+            print("\n已中断")
+        finally:
+            if watcher is not None:
+                watcher.close()
+            self.manifest.save()
+            for sig, handler in previous_handlers.items():
+                signal.signal(sig, handler)
+        
+        print(f"\n停止监视: 成功 {len(self.processed_files)} 个，失败 {len(self.failed_files)} 个，"
+              f"跳过已处理 {len(self.skipped_files)} 个")
+        return len(self.failed_files) == 0
+    
     def generate_report(self, output_path: str = None):
         """
         生成处理报告
@@ -195,6 +820,7 @@ class BatchVideoToText:
             f.write(f"生成时间: {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
             f.write(f"成功处理: {len(self.processed_files)} 个文件\n")
             f.write(f"处理失败: {len(self.failed_files)} 个文件\n")
+            f.write(f"跳过未变化: {len(self.skipped_files)} 个文件\n")
             f.write("\n")
             
             if self.processed_files:
@@ -214,13 +840,39 @@ class BatchVideoToText:
 
 def main():
     parser = argparse.ArgumentParser(description='基于sherpa-ncnn的批量视频转文本工具')
-    parser.add_argument('input_path', help='输入路径（视频文件或目录）')
+    parser.add_argument('input_path', nargs='?', help='输入路径（视频/音频文件或目录）')
     parser.add_argument('-o', '--output', help='输出目录')
     parser.add_argument('-c', '--config', default='config.json', help='配置文件路径')
     parser.add_argument('-m', '--model', help='模型ID')
     parser.add_argument('--chunk_size', type=float, help='流式处理块大小（秒）')
+    parser.add_argument('--pacing', choices=PACING_MODES,
+                       help='解码节奏：max全速解码，realtime按实时速度送入（默认使用配置）')
+    parser.add_argument('--format', choices=OUTPUT_FORMATS,
+                       help='输出格式：txt/srt/vtt/jsonl（默认使用配置）')
     parser.add_argument('-r', '--recursive', action='store_true',
                        help='递归搜索子目录')
+    parser.add_argument('-j', '--workers', type=int,
+                       help='并行处理的进程数（默认使用performance.parallel_threads，1为串行，0为自动）；'
+                            '每个进程的识别线程数按CPU核数自动分配')
+    parser.add_argument('--include', action='append', metavar='PATTERN',
+                       help='只处理匹配的文件（如 "*.mp4"、"2024/*"），可多次指定')
+    parser.add_argument('--exclude', action='append', metavar='PATTERN',
+                       help='跳过匹配的文件或目录（如 "output"、"*.tmp.wav"），可多次指定')
+    parser.add_argument('--max-depth', type=int,
+                       help='递归搜索的最大子目录深度（默认不限）')
+    parser.add_argument('--schedule', choices=SCHEDULE_MODES,
+                       help='多进程时的派发顺序：longest先探测时长、最长的文件先处理，'
+                            'scan按扫描顺序边扫描边处理（默认使用配置）')
+    parser.add_argument('--no-split', action='store_true',
+                       help='不把超长文件切分到多个进程并行解码')
+    parser.add_argument('--force', action='store_true',
+                       help='忽略输出目录中的已处理清单，重新处理所有文件')
+    parser.add_argument('--watch', metavar='DIR',
+                       help='常驻监视目录，识别器只加载一次，新文件写完后立即处理；SIGTERM后处理完当前文件退出')
+    parser.add_argument('--stable-seconds', type=float, default=5.0,
+                       help='监视模式下文件大小保持不变多久后视为写完（秒），默认5秒')
+    parser.add_argument('--poll-interval', type=float, default=5.0,
+                       help='监视模式下inotify不可用时的扫描间隔（秒），默认5秒')
     parser.add_argument('--report', help='生成处理报告文件路径')
     parser.add_argument('--list-models', action='store_true', help='列出可用模型')
     parser.add_argument('--status', action='store_true', help='显示配置状态')
@@ -235,19 +887,36 @@ def main():
             return
         
         # 初始化批量处理器
-        batch_processor = BatchVideoToText(args.config, args.model)
+        batch_processor = BatchVideoToText(args.config, args.model, args.workers)
         
         # 列出可用模型
         if args.list_models:
             print("可用模型:")
-            for model in batch_processor.converter.get_available_models():
+            for model in batch_processor.config_manager.list_models():
                 status_text = "可用" if model["available"] else "不可用"
                 print(f"  {model['id']}: {model['name']} ({model['language']}) - {status_text}")
             return
         
+        # 监视模式：常驻运行直到收到SIGTERM
+        if args.watch:
+            success = batch_processor.watch(
+                args.watch, args.output, args.chunk_size, args.recursive, args.pacing, args.format,
+                args.include, args.exclude, args.max_depth, args.poll_interval, args.stable_seconds
+            )
+            if args.report:
+                batch_processor.generate_report(args.report)
+            if not success:
+                sys.exit(1)
+            return
+        
+        if not args.input_path:
+            parser.error("需要指定输入路径或 --watch DIR")
+        
         # 批量处理
         success = batch_processor.process_batch(
-            args.input_path, args.output, args.chunk_size, args.recursive
+            args.input_path, args.output, args.chunk_size, args.recursive,
+            args.pacing, args.format, args.force, args.include, args.exclude, args.max_depth,
+            args.schedule, False if args.no_split else None
         )
         
         if args.report:
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+转写断点模块
+记录已提交的采样位置，重试或崩溃后重新运行时从最后一个端点继续识别
+"""
+
+import os
+import json
+from pathlib import Path
+from typing import Dict, Any
+
+
+class TranscriptionCheckpoint:
+    """
+    转写断点（输出文件旁的 .ckpt.json）
+
+    已定稿的语句保存在输出的.part文件中，断点记录其对应的文件长度、语句数
+    和最后提交的采样偏移，二者同时刷新，恢复时截断.part到记录长度即可保持一致。
+    """
+
+    def __init__(self, output_path: str, source_path: str, model_id: str,
+                 output_format: str, save_timestamps: bool = False):
+        """
+        Args:
+            output_path: 输出文件路径
+            source_path: 源视频/音频文件路径
+            model_id: 模型ID
+            output_format: 输出格式
+            save_timestamps: 是否保存时间戳
+        """
+        self.path = Path(str(output_path) + '.ckpt.json')
+        source = Path(source_path)
+        stat = source.stat()
+        # 源文件、模型或输出格式任一变化时断点失效
+        self.identity = {
+            "source": str(source.resolve()),
+            "source_size": stat.st_size,
+            "source_mtime_ns": stat.st_mtime_ns,
+            "model_id": model_id,
+            "output_format": output_format,
+            "save_timestamps": bool(save_timestamps),
+        }
+        self.audio_path = None
+        self.sample_rate = None
+        self.committed_sample = 0
+        self.segment_count = 0
+        self.text_length = 0
+        self.preview = ''
+        self.part_size = 0
+
+    @property
+    def has_progress(self) -> bool:
+        """是否已有提交的语句"""
+        return self.segment_count > 0
+
+    def load(self) -> bool:
+        """
+        读取断点
+
+        Returns:
+            断点存在且与当前任务匹配时返回True
+        """
+        if not self.path.exists():
+            return False
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"断点文件读取失败，忽略: {e}")
+            return False
+
+        if data.get("identity") != self.identity:
+            print("断点与当前源文件或配置不匹配，重新开始")
+            return False
+
+        self.audio_path = data.get("audio_path")
+        self.sample_rate = data.get("sample_rate")
+        self.committed_sample = data.get("committed_sample", 0)
+        self.segment_count = data.get("segment_count", 0)
+        self.text_length = data.get("text_length", 0)
+        self.preview = data.get("preview", '')
+        self.part_size = data.get("part_size", 0)
+        return True
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可序列化的字典"""
+        return {
+            "identity": self.identity,
+            "audio_path": self.audio_path,
+            "sample_rate": self.sample_rate,
+            "committed_sample": self.committed_sample,
+            "segment_count": self.segment_count,
+            "text_length": self.text_length,
+            "preview": self.preview,
+            "part_size": self.part_size,
+        }
+
+    def save(self):
+        """原子写入断点文件"""
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def commit(self, committed_sample: int, sink):
+        """
+        记录已刷新到磁盘的进度
+
+        Args:
+            committed_sample: 最后一条已写出语句的结束采样
+            sink: 已完成刷新的TranscriptSink
+        """
+        self.committed_sample = committed_sample
+        self.segment_count = sink.count
+        self.text_length = sink.text_length
+        self.preview = sink.preview
+        self.part_size = sink.part_size()
+        self.save()
+
+    def remove(self):
+        """删除断点文件"""
+        if self.path.exists():
+            self.path.unlink()
+
+    def reset(self):
+        """丢弃断点进度，从头开始"""
+        self.remove()
+        self.committed_sample = 0
+        self.segment_count = 0
+        self.text_length = 0
+        self.preview = ''
+        self.part_size = 0
+
@@ -7,6 +7,8 @@ import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import json
 import sys
+import queue
+import threading
 from pathlib import Path
 from config_manager import ConfigManager
 
@@ -60,6 +62,11 @@ class ConfigGUI:
         notebook.add(output_frame, text="输出配置")
         self.setup_output_tab(output_frame)
         
+        # 转写选项卡
+        transcribe_frame = ttk.Frame(notebook)
+        notebook.add(transcribe_frame, text="转写")
+        self.setup_transcribe_tab(transcribe_frame)
+        
         # 按钮
         button_frame = ttk.Frame(main_frame)
         button_frame.grid(row=1, column=0, columnspan=3, pady=10)
@@ -175,6 +182,8 @@ class ConfigGUI:
             ("解码方法", "decoding_method", "combobox", ["greedy_search", "modified_beam_search"]),
             ("启用端点检测", "enable_endpoint_detection", "checkbutton", None),
             ("块大小(秒)", "chunk_size", "entry", None),
+            ("解码节奏", "pacing", "combobox", ["max", "realtime"]),
+            ("并行进程数", "parallel_workers", "spinbox", (0, 32)),
             ("热词文件", "hotwords_file", "file", None),
             ("热词分数", "hotwords_score", "entry", None),
         ]
@@ -215,6 +224,11 @@ class ConfigGUI:
             ("声道数", "channels", "spinbox", (1, 2)),
             ("采样宽度", "sample_width", "spinbox", (1, 4)),
             ("编码格式", "codec", "combobox", ["pcm_s16le", "pcm_s16be", "pcm_f32le"]),
+            ("流式解码", "streaming", "checkbutton", None),
+            ("音频缓存上限(MB)", "cache_max_mb", "spinbox", (0, 102400)),
+            ("内存临时文件上限(MB)", "scratch_ram_max_mb", "spinbox", (0, 16384)),
+            ("临时空间配额(MB)", "scratch_quota_mb", "spinbox", (0, 1048576)),
+            ("长音频分段提取数", "extract_ranges", "spinbox", (1, 64)),
         ]
         
         self.audio_vars = {}
@@ -230,11 +244,15 @@ class ConfigGUI:
                 var = tk.StringVar()
                 self.audio_vars[key] = var
                 ttk.Spinbox(parent, from_=options[0], to=options[1], textvariable=var, width=18).grid(row=i, column=1, sticky=tk.W, pady=5, padx=5)
+            elif widget_type == "checkbutton":
+                var = tk.BooleanVar()
+                self.audio_vars[key] = var
+                ttk.Checkbutton(parent, variable=var).grid(row=i, column=1, sticky=tk.W, pady=5, padx=5)
     
     def setup_output_tab(self, parent):
         """设置输出配置选项卡"""
         config_items = [
-            ("输出格式", "format", "combobox", ["txt", "srt", "vtt"]),
+            ("输出格式", "format", "combobox", ["txt", "srt", "vtt", "jsonl"]),
             ("文件编码", "encoding", "combobox", ["utf-8", "gbk", "ascii"]),
             ("保存时间戳", "save_timestamps", "checkbutton", None),
             ("保存置信度", "save_confidence", "checkbutton", None),
@@ -254,6 +272,98 @@ class ConfigGUI:
                 self.output_vars[key] = var
                 ttk.Checkbutton(parent, variable=var).grid(row=i, column=1, sticky=tk.W, pady=5, padx=5)
     
+    def setup_transcribe_tab(self, parent):
+        """设置转写选项卡：后台线程识别，主线程轮询进度队列更新界面"""
+        parent.columnconfigure(1, weight=1)
+        
+        ttk.Label(parent, text="视频文件:").grid(row=0, column=0, sticky=tk.W, pady=5, padx=5)
+        self.transcribe_path_var = tk.StringVar()
+        ttk.Entry(parent, textvariable=self.transcribe_path_var).grid(row=0, column=1, sticky=(tk.W, tk.E), pady=5, padx=5)
+        ttk.Button(parent, text="浏览", command=self.browse_transcribe_file).grid(row=0, column=2, pady=5, padx=5)
+        
+        self.transcribe_button = ttk.Button(parent, text="开始转写", command=self.start_transcribe)
+        self.transcribe_button.grid(row=1, column=0, columnspan=3, pady=5)
+        
+        self.transcribe_progress = ttk.Progressbar(parent, maximum=100)
+        self.transcribe_progress.grid(row=2, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=5, padx=5)
+        
+        self.transcribe_info_var = tk.StringVar()
+        ttk.Label(parent, textvariable=self.transcribe_info_var).grid(row=3, column=0, columnspan=3, sticky=tk.W, pady=5, padx=5)
+        
+        self.transcribe_text_var = tk.StringVar()
+        ttk.Label(parent, textvariable=self.transcribe_text_var, wraplength=700).grid(row=4, column=0, columnspan=3, sticky=tk.W, pady=5, padx=5)
+        
+        self.transcribe_queue = queue.Queue(maxsize=100)
+        self.transcribe_thread = None
+    
+    def browse_transcribe_file(self):
+        """选择要转写的文件"""
+        path = filedialog.askopenfilename()
+        if path:
+            self.transcribe_path_var.set(path)
+    
+    def start_transcribe(self):
+        """在后台线程中转写选中的文件"""
+        video_path = self.transcribe_path_var.get()
+        if not video_path:
+            messagebox.showerror("错误", "请选择视频文件")
+            return
+        if self.transcribe_thread is not None and self.transcribe_thread.is_alive():
+            return
+        
+        self.transcribe_button.config(state=tk.DISABLED)
+        self.transcribe_progress['value'] = 0
+        self.transcribe_info_var.set("正在加载模型...")
+        self.transcribe_text_var.set("")
+        
+        self.transcribe_thread = threading.Thread(
+            target=self._run_transcribe, args=(video_path,), daemon=True
+        )
+        self.transcribe_thread.start()
+        self.root.after(200, self.poll_transcribe_progress)
+    
+    def _run_transcribe(self, video_path):
+        """后台线程：运行识别，进度和结果都通过队列交给主线程"""
+        try:
+            # 识别依赖较重，只在需要时导入
+            from sherpa_ncnn_video_to_text import VideoToTextSherpaNcnn
+            from progress_reporter import QueueProgressSubscriber
+            
+            converter = VideoToTextSherpaNcnn(str(self.config_manager.config_file))
+            subscriber = QueueProgressSubscriber(self.transcribe_queue)
+            success = converter.process_video(video_path, show_progress=False,
+                                              progress_interval=1.0,
+                                              progress_callbacks=[subscriber])
+            converter.recognizer.release()
+            self.transcribe_queue.put({"done": True, "success": success})
+        except Exception as e:
+            self.transcribe_queue.put({"done": True, "success": False, "error": str(e)})
+    
+    def poll_transcribe_progress(self):
+        """主线程轮询进度队列"""
+        try:
+            while True:
+                event = self.transcribe_queue.get_nowait()
+                if event.get("done"):
+                    self.transcribe_button.config(state=tk.NORMAL)
+                    if event.get("success"):
+                        self.transcribe_progress['value'] = 100
+                        self.update_status("转写完成")
+                    else:
+                        self.update_status(f"转写失败 {event.get('error', '')}".strip())
+                    return
+                
+                self.transcribe_progress['value'] = event['percent']
+                eta = f"{event['eta'] / 60:.1f}分钟" if event['eta'] is not None else "--"
+                self.transcribe_info_var.set(
+                    f"{event['percent']:.1f}% | 已用时: {event['elapsed'] / 60:.1f}分钟"
+                    f" | 剩余: {eta} | RTF: {event['rtf']:.3f} | 语句: {event['segments']}"
+                )
+                self.transcribe_text_var.set(event['last_text'])
+        except queue.Empty:
+            pass
+        self.root.after(200, self.poll_transcribe_progress)
+    
     def load_config(self):
         """加载配置到界面"""
         # 加载模型列表
@@ -468,7 +578,9 @@ class ConfigGUI:
         
         for key, var in self.audio_vars.items():
             value = var.get()
-            if value:
+            if isinstance(value, bool):
+                self.current_config["audio"][key] = value
+            elif value:
                 try:
                     self.current_config["audio"][key] = int(value)
                 except ValueError:
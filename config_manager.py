@@ -68,6 +68,10 @@ class ConfigManager:
                 "decoding_method": "greedy_search",
                 "enable_endpoint_detection": True,
                 "chunk_size": 0.1,
+                "pacing": "max",
+                "parallel_workers": 0,
+                "error_rewind_seconds": 2.0,
+                "pipeline_queue_blocks": 64,
                 "hotwords_file": "",
                 "hotwords_score": 1.5,
                 "endpoint_rules": {
@@ -80,19 +84,34 @@ class ConfigManager:
                 "sample_rate": 16000,
                 "channels": 1,
                 "sample_width": 2,
-                "codec": "pcm_s16le"
+                "codec": "pcm_s16le",
+                "streaming": True,
+                "cache_dir": "",
+                "cache_max_mb": 0,
+                "scratch_dir": "",
+                "scratch_ram_dir": "/dev/shm",
+                "scratch_ram_max_mb": 256,
+                "scratch_quota_mb": 0,
+                "scratch_wait_seconds": 0,
+                "extract_ranges": 4,
+                "extract_range_min_seconds": 600,
+                "extract_range_verify": False
             },
             "output": {
                 "format": "txt",
                 "encoding": "utf-8",
                 "save_timestamps": False,
-                "save_confidence": False
+                "save_confidence": False,
+                "flush_interval": 5.0
             },
             "performance": {
                 "max_file_size_mb": 500,
                 "max_duration_minutes": 60,
                 "batch_processing": True,
-                "parallel_threads": 2
+                "parallel_threads": 2,
+                "batch_schedule": "longest",
+                "batch_split_long_files": True,
+                "recognizer_pool_max_mb": 1024
             }
         }
         
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+目录监视模块
+发现目录中新出现且已写完的媒体文件：Linux上使用inotify，其他平台定期扫描，
+文件大小和修改时间稳定一段时间后才产出
+"""
+
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from audio_source import MEDIA_EXTENSIONS, VIDEO_EXTENSIONS
+from media_scanner import iter_media_files, matches_patterns
+
+
+# inotify事件掩码（linux/inotify.h）
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+_EVENT_HEADER = struct.Struct('iIII')
+# 不监视IN_MODIFY：大文件写入期间每次write都会产生事件
+_WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_MOVED_FROM
+
+
+class _Inotify:
+    """通过ctypes调用libc的inotify接口（不依赖第三方包）"""
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library('c') or 'libc.so.6'
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1失败")
+        self.watches: Dict[int, Path] = {}
+
+    def add_watch(self, directory: Path) -> bool:
+        """监视一个目录，达到系统监视数上限等失败时返回False"""
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(str(directory)), _WATCH_MASK)
+        if wd < 0:
+            print(f"无法监视目录: {directory} ({os.strerror(ctypes.get_errno())})")
+            return False
+        self.watches[wd] = Path(directory)
+        return True
+
+    def read_events(self, timeout: float) -> List[tuple]:
+        """
+        等待并读取事件
+
+        Returns:
+            [(目录, 文件名, 掩码)]，队列溢出时为[(None, '', IN_Q_OVERFLOW)]
+        """
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        events = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                events.append((None, '', mask))
+            elif mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+            elif wd in self.watches:
+                events.append((self.watches[wd], name, mask))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FolderWatcher:
+    """
+    监视目录中新出现的媒体文件
+
+    文件只有在大小和修改时间连续stable_seconds秒不变后才视为写完；inotify可用时，
+    通过inotify发现创建的文件还要等到写入方关闭文件（或文件被移入目录）后才开始计时。
+    已产出的文件只有在大小或修改时间变化后才会再次产出。
+    inotify不可用（非Linux或初始化失败）时每poll_interval秒重新扫描一次目录。
+    """
+
+    def __init__(self, directory: str, extensions: Iterable[str] = None,
+                 recursive: bool = False, include: List[str] = None,
+                 exclude: List[str] = None, max_depth: Optional[int] = None,
+                 poll_interval: float = 5.0, stable_seconds: float = 5.0,
+                 use_inotify: bool = True):
+        """
+        Args:
+            directory: 监视目录
+            extensions: 扩展名集合，默认为支持的视频、音频和裸PCM扩展名
+            recursive: 是否包含子目录（包括之后新建的子目录）
+            include: 包含模式（fnmatch，不区分大小写），同iter_media_files
+            exclude: 排除模式，匹配的文件和目录都跳过
+            max_depth: 最大子目录深度，None为不限（recursive为False时为0）
+            poll_interval: 轮询模式的扫描间隔（秒）
+            stable_seconds: 文件大小和修改时间需要保持不变的时长（秒）
+            use_inotify: 是否尝试使用inotify
+        """
+        self.directory = Path(directory)
+        self.extensions = {ext.lower() for ext in (extensions or MEDIA_EXTENSIONS)}
+        self.include = include
+        self.exclude = exclude
+        self.max_depth = max_depth if recursive else 0
+        self.poll_interval = poll_interval
+        self.stable_seconds = stable_seconds
+
+        # 候选文件 -> [大小, 修改时间, 开始稳定的时刻, 是否仍在写入]
+        self._candidates: Dict[Path, list] = {}
+        # 已产出的文件 -> (大小, 修改时间)
+        self._emitted: Dict[Path, tuple] = {}
+        self._next_scan = 0.0
+
+        self._inotify = None
+        if use_inotify and sys.platform.startswith('linux'):
+            try:
+                self._inotify = _Inotify()
+            except (OSError, AttributeError) as e:
+                print(f"inotify不可用，改为每 {poll_interval:.0f} 秒扫描一次: {e}")
+
+    @property
+    def mode(self) -> str:
+        return "inotify" if self._inotify is not None else "轮询"
+
+    def _depth(self, directory: Path) -> int:
+        return len(directory.relative_to(self.directory).parts)
+
+    def _relative(self, path: Path) -> str:
+        return path.relative_to(self.directory).as_posix()
+
+    def _watch_tree(self, directory: Path):
+        """监视目录及其（未排除且未超过深度的）子目录"""
+        if not self._inotify.add_watch(directory):
+            return
+        if self.max_depth is not None and self._depth(directory) >= self.max_depth:
+            return
+        exclude = [pattern.lower() for pattern in self.exclude or []]
+        try:
+            with os.scandir(directory) as it:
+                subdirs = [Path(entry.path) for entry in it if entry.is_dir(follow_symlinks=False)]
+        except OSError:
+            return
+        for subdir in subdirs:
+            if not (exclude and matches_patterns(self._relative(subdir), subdir.name, exclude)):
+                self._watch_tree(subdir)
+
+    def start(self):
+        """开始监视：建立inotify监视并登记目录中已有的文件"""
+        if self._inotify is not None:
+            self._watch_tree(self.directory)
+        self._scan()
+
+    def _scan(self):
+        """扫描整个目录，登记新出现或变化的文件，忘记已删除的文件"""
+        seen = set()
+        for path in iter_media_files(self.directory, self.extensions, self.include,
+                                     self.exclude, self.max_depth):
+            seen.add(path)
+            self._add_candidate(path, writing=False)
+        for path in [path for path in self._emitted if path not in seen]:
+            del self._emitted[path]
+        self._next_scan = time.monotonic() + self.poll_interval
+
+    def _wanted(self, path: Path) -> bool:
+        """inotify事件中的文件是否符合扩展名和包含/排除条件（与iter_media_files一致）"""
+        if path.suffix.lower() not in self.extensions:
+            return False
+        relative = self._relative(path)
+        include = [pattern.lower() for pattern in self.include or []]
+        exclude = [pattern.lower() for pattern in self.exclude or []]
+        if exclude and matches_patterns(relative, path.name, exclude):
+            return False
+        if include and not matches_patterns(relative, path.name, include):
+            return False
+        # 同名的视频和音频输出路径相同，只处理视频
+        if path.suffix.lower() not in VIDEO_EXTENSIONS:
+            return not any(path.with_suffix(ext).exists() for ext in VIDEO_EXTENSIONS)
+        return True
+
+    def _add_candidate(self, path: Path, writing: bool):
+        try:
+            stat = path.stat()
+        except OSError:
+            self._candidates.pop(path, None)
+            return
+        signature = (stat.st_size, stat.st_mtime_ns)
+        if self._emitted.get(path) == signature:
+            return
+        entry = self._candidates.get(path)
+        if entry is None:
+            self._candidates[path] = [stat.st_size, stat.st_mtime_ns, time.monotonic(), writing]
+        elif writing:
+            entry[3] = True
+
+    def _handle_event(self, directory: Optional[Path], name: str, mask: int):
+        if directory is None:
+            # 事件队列溢出，可能丢失了事件，重新扫描
+            print("inotify事件队列溢出，重新扫描目录")
+            self._scan()
+            return
+        path = directory / name
+        if mask & IN_ISDIR:
+            if mask & (IN_CREATE | IN_MOVED_TO) and self.max_depth != 0:
+                exclude = [pattern.lower() for pattern in self.exclude or []]
+                if ((self.max_depth is None or self._depth(path) <= self.max_depth)
+                        and not (exclude and matches_patterns(self._relative(path), name, exclude))):
+                    # 新子目录：建立监视后补扫其中已有的文件（监视建立前可能已写入）
+                    self._watch_tree(path)
+                    for found in iter_media_files(path, self.extensions, self.include, self.exclude,
+                                                  None if self.max_depth is None
+                                                  else self.max_depth - self._depth(path)):
+                        self._add_candidate(found, writing=False)
+            return
+        if mask & (IN_DELETE | IN_MOVED_FROM):
+            self._candidates.pop(path, None)
+            self._emitted.pop(path, None)
+            return
+        if not self._wanted(path):
+            return
+        if mask & IN_CREATE:
+            # 写入方关闭文件前不计时
+            self._add_candidate(path, writing=True)
+        elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+            self._add_candidate(path, writing=False)
+            entry = self._candidates.get(path)
+            if entry is not None:
+                entry[3] = False
+
+    def _collect_stable(self) -> List[Path]:
+        """检查候选文件，返回已稳定的文件"""
+        now = time.monotonic()
+        ready = []
+        for path, entry in list(self._candidates.items()):
+            try:
+                stat = path.stat()
+            except OSError:
+                del self._candidates[path]
+                continue
+            if (stat.st_size, stat.st_mtime_ns) != (entry[0], entry[1]):
+                entry[0], entry[1], entry[2] = stat.st_size, stat.st_mtime_ns, now
+                continue
+            if entry[3] or stat.st_size == 0 or now - entry[2] < self.stable_seconds:
+                continue
+            del self._candidates[path]
+            self._emitted[path] = (stat.st_size, stat.st_mtime_ns)
+            ready.append(path)
+        return sorted(ready)
+
+    def wait(self, timeout: float = 1.0) -> List[Path]:
+        """
+        等待最多timeout秒，返回已写完的新文件
+
+        调用方应以较短的timeout循环调用，以便及时响应退出请求。
+        """
+        if self._inotify is not None:
+            deadline = time.monotonic() + timeout
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    events = self._inotify.read_events(remaining)
+                except OSError as e:
+                    if e.errno != errno.EINTR:
+                        raise
+                    break
+                for directory, name, mask in events:
+                    self._handle_event(directory, name, mask)
+                if not events:
+                    break
+        else:
+            if time.monotonic() >= self._next_scan:
+                self._scan()
+            else:
+                time.sleep(min(timeout, max(0.0, self._next_scan - time.monotonic())))
+        return self._collect_stable()
+
+    @property
+    def pending(self) -> int:
+        """等待写完的文件数"""
+        return len(self._candidates)
+
+    def close(self):
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
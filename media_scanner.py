@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+媒体文件扫描模块
+单次os.scandir遍历目录树，边遍历边产出匹配的视频/音频文件
+"""
+
+import os
+from fnmatch import fnmatchcase
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional
+
+from audio_source import MEDIA_EXTENSIONS, VIDEO_EXTENSIONS
+
+
+def matches_patterns(relative: str, name: str, patterns: List[str]) -> bool:
+    """不含路径分隔符的模式匹配文件名，其余匹配相对路径（模式需已转为小写，不区分大小写）"""
+    relative, name = relative.lower(), name.lower()
+    return any(fnmatchcase(name if '/' not in pattern else relative, pattern) for pattern in patterns)
+
+
+def iter_media_files(directory: str, extensions: Iterable[str] = None,
+                     include: List[str] = None, exclude: List[str] = None,
+                     max_depth: Optional[int] = None,
+                     prefer_video: bool = True) -> Iterator[Path]:
+    """
+    遍历目录，按扩展名（不区分大小写）产出媒体文件
+
+    整棵树只遍历一次，每个目录只调用一次scandir，目录项类型直接取自scandir结果，
+    不逐个stat。找到的文件立即产出，调用方不必等待遍历结束。
+    同一目录内按文件名排序；不进入指向目录的符号链接。
+
+    Args:
+        directory: 根目录
+        extensions: 扩展名集合，默认为支持的视频、音频和裸PCM扩展名
+        include: 包含模式（fnmatch，不区分大小写），指定时只产出匹配的文件；
+            不含"/"的模式匹配文件名，否则匹配相对于根目录的路径
+        exclude: 排除模式（同上），匹配的文件和目录（连同其子目录）都跳过
+        max_depth: 最大深度，0为只看根目录，None为不限
+        prefer_video: 同一目录下同名的视频和音频（如提取出的WAV）只产出视频，
+            二者的输出路径相同
+
+    Yields:
+        文件路径
+    """
+    extensions = {ext.lower() for ext in (extensions or MEDIA_EXTENSIONS)}
+    include = [pattern.lower() for pattern in include or []]
+    exclude = [pattern.lower() for pattern in exclude or []]
+    root = Path(directory)
+
+    # (目录路径, 相对路径, 深度)
+    stack = [(root, '', 0)]
+    while stack:
+        path, relative_dir, depth = stack.pop()
+        try:
+            with os.scandir(path) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except OSError as e:
+            print(f"无法读取目录，跳过: {path} ({e})")
+            continue
+
+        files = []
+        subdirs = []
+        for entry in entries:
+            relative = f"{relative_dir}{entry.name}"
+            if exclude and matches_patterns(relative, entry.name, exclude):
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if max_depth is None or depth < max_depth:
+                        subdirs.append((Path(entry.path), relative + '/', depth + 1))
+                    continue
+                if not entry.is_file():
+                    continue
+            except OSError:
+                continue
+            if os.path.splitext(entry.name)[1].lower() not in extensions:
+                continue
+            if include and not matches_patterns(relative, entry.name, include):
+                continue
+            files.append(entry)
+
+        if prefer_video:
+            videos = {os.path.splitext(entry.name)[0] for entry in files
+                      if os.path.splitext(entry.name)[1].lower() in VIDEO_EXTENSIONS}
+        for entry in files:
+            stem, suffix = os.path.splitext(entry.name)
+            if prefer_video and suffix.lower() not in VIDEO_EXTENSIONS and stem in videos:
+                continue
+            yield Path(entry.path)
+
+        # 逆序压栈，子目录按名称顺序深度优先遍历
+        stack.extend(reversed(subdirs))
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+并行识别模块
+在静音处切分长音频，用进程池并行解码各段后按顺序拼接
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from audio_source import WavPcmReader, find_silence_boundaries
+from progress_reporter import ProgressState
+from recognizer_pool import get_recognizer_pool
+from transcript_writer import make_segment
+
+
+# 每段的最短时长（秒），过短的段会让切分点附近的上下文损失占比过大
+MIN_SEGMENT_SECONDS = 60.0
+
+# 工作进程内的识别器及其是否启用端点检测
+_worker_recognizer = None
+_worker_endpoint_enabled = False
+
+
+def _init_worker(model_id: str, model_config: Dict[str, Any], recognition_config: Dict[str, Any]):
+    """工作进程初始化：每个进程加载一次自己的识别器"""
+    global _worker_recognizer, _worker_endpoint_enabled
+    _worker_recognizer = get_recognizer_pool().acquire(model_id, model_config, recognition_config)
+    _worker_endpoint_enabled = recognition_config.get('enable_endpoint_detection', False)
+
+
+def _decode_segment(index: int, audio_path: str, start: int, end: int,
+                    chunk_frames: int) -> Tuple[int, List[Dict[str, Any]]]:
+    """
+    工作进程中解码一段音频
+
+    Args:
+        index: 段序号
+        audio_path: WAV文件路径（各进程各自映射同一文件）
+        start: 起始采样
+        end: 结束采样
+        chunk_frames: 每次送入识别器的帧数
+
+    Returns:
+        (段序号, 语句列表)
+    """
+    return index, decode_range(_worker_recognizer, audio_path, start, end, chunk_frames,
+                               _worker_endpoint_enabled)
+
+
+def decode_range(recognizer, audio_path: str, start: int, end: int, chunk_frames: int,
+                 endpoint_enabled: bool = False) -> List[Dict[str, Any]]:
+    """
+    用已加载的识别器解码WAV中的一段，启用端点检测时在段内继续按端点切分语句
+
+    Args:
+        recognizer: 识别器（来自识别器池，解码结束后换上新的解码流）
+        audio_path: WAV文件路径
+        start: 起始采样
+        end: 结束采样
+        chunk_frames: 每次送入识别器的帧数
+        endpoint_enabled: 是否按端点切分语句
+
+    Returns:
+        语句列表，语句的采样偏移为整个文件内的绝对位置
+    """
+    segments = []
+    utterance_start = start
+
+    try:
+        with WavPcmReader(audio_path) as reader:
+            sample_rate = reader.sample_rate
+            for chunk_start, samples in reader.iter_chunks(chunk_frames, start):
+                if chunk_start >= end:
+                    break
+                samples = samples[:end - chunk_start]
+                recognizer.accept_waveform(sample_rate, samples)
+
+                if endpoint_enabled and recognizer.is_endpoint:
+                    chunk_end = chunk_start + len(samples)
+                    if recognizer.text.strip():
+                        segments.append(make_segment(len(segments), utterance_start, chunk_end,
+                                                     sample_rate, recognizer.text))
+                    recognizer.reset()
+                    utterance_start = chunk_end
+
+        tail_paddings = np.zeros(int(sample_rate * 0.5), dtype=np.float32)
+        recognizer.accept_waveform(sample_rate, tail_paddings)
+        recognizer.input_finished()
+        if recognizer.text.strip():
+            segments.append(make_segment(len(segments), utterance_start, end, sample_rate, recognizer.text))
+    finally:
+        # 无论成功与否都换一个干净的解码流（模型保持加载），出错时不把半途的解码状态留给下一段
+        recognizer.stream = recognizer.recognizer.create_stream()
+
+    return segments
+
+
+def plan_segments(audio_path: str, num_workers: int) -> Tuple[List[int], int]:
+    """
+    规划切分点
+
+    Args:
+        audio_path: WAV文件路径
+        num_workers: 工作进程数
+
+    Returns:
+        (切分点采样偏移列表, 采样率)
+    """
+    with WavPcmReader(audio_path) as reader:
+        max_segments = max(1, int(reader.duration // MIN_SEGMENT_SECONDS))
+        num_segments = min(num_workers, max_segments)
+        boundaries = find_silence_boundaries(reader.samples[:, 0], reader.sample_rate, num_segments,
+                                             min_gap=MIN_SEGMENT_SECONDS)
+        return boundaries, reader.sample_rate
+
+
+def recognize_parallel(audio_path: str, model_id: str, model_config: Dict[str, Any],
+                       recognition_config: Dict[str, Any], num_workers: int,
+                       chunk_size: float = 0.1,
+                       progress: Optional[ProgressState] = None) -> Iterator[Dict[str, Any]]:
+    """
+    并行识别一个音频文件
+
+    每个工作进程持有独立的识别器，线程数按 CPU核数 / 进程数 分配，
+    避免进程数 × 线程数超出核数。
+
+    Args:
+        audio_path: WAV文件路径
+        model_id: 模型ID
+        model_config: 模型配置字典
+        recognition_config: 识别配置字典
+        num_workers: 工作进程数
+        chunk_size: 流式处理的块大小（秒）
+        progress: 进度计数，每完成一段累加该段的采样数
+
+    Yields:
+        按时间顺序排列的语句字典；前面的段完成后即可产出，不必等待全部结束
+    """
+    boundaries, sample_rate = plan_segments(audio_path, num_workers)
+    segments = list(zip(boundaries[:-1], boundaries[1:]))
+    num_workers = min(num_workers, len(segments))
+
+    worker_config = dict(recognition_config)
+    worker_config['num_threads'] = max(1, (os.cpu_count() or 1) // num_workers)
+
+    print(f"并行识别: {len(segments)} 段, {num_workers} 个进程, 每进程 {worker_config['num_threads']} 线程")
+    for i, (start, end) in enumerate(segments):
+        print(f"  段 {i + 1}: {start / sample_rate:.1f}s - {end / sample_rate:.1f}s")
+
+    chunk_frames = max(1, int(chunk_size * sample_rate))
+    results = {}
+    next_index = 0
+    segment_index = 0
+
+    with ProcessPoolExecutor(max_workers=num_workers, initializer=_init_worker,
+                             initargs=(model_id, model_config, worker_config)) as executor:
+        futures = [
+            executor.submit(_decode_segment, i, audio_path, start, end, chunk_frames)
+            for i, (start, end) in enumerate(segments)
+        ]
+        for future in as_completed(futures):
+            index, utterances = future.result()
+            results[index] = utterances
+            if progress is not None:
+                start, end = segments[index]
+                progress.samples_processed += end - start
+                progress.segments += len(utterances)
+                if utterances:
+                    progress.last_text = utterances[-1]['text']
+
+            # 按顺序产出已完成的连续段
+            while next_index in results:
+                for utterance in results.pop(next_index):
+                    utterance['index'] = segment_index
+                    segment_index += 1
+                    yield utterance
+                next_index += 1
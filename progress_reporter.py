@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+识别进度报告模块
+解码循环只更新计数，由低频后台线程计算RTF和剩余时间并分发给订阅者
+"""
+
+import sys
+import json
+import time
+import queue
+import threading
+from typing import Dict, Any, Callable, List, Optional, TextIO
+
+
+class ProgressState:
+    """
+    解码循环与报告线程之间共享的进度计数
+
+    解码循环每块只做一次整数赋值，不读取识别器、不格式化字符串。
+    """
+
+    def __init__(self, total_samples: int, sample_rate: int, start_sample: int = 0):
+        """
+        Args:
+            total_samples: 音频总采样数
+            sample_rate: 采样率
+            start_sample: 起始采样（断点续传时不计入本次的处理速度）
+        """
+        self.total_samples = total_samples
+        self.sample_rate = sample_rate
+        self.start_sample = start_sample
+        self.samples_processed = start_sample
+        self.segments = 0
+        self.last_text = ''
+        self.start_time = time.time()
+
+    def snapshot(self, finished: bool = False) -> Dict[str, Any]:
+        """
+        生成进度事件
+
+        ETA按本次运行的总耗时和已处理的音频量外推，而不是按上次报告后的间隔。
+
+        Args:
+            finished: 是否为结束事件
+
+        Returns:
+            进度事件字典
+        """
+        elapsed = time.time() - self.start_time
+        processed = self.samples_processed
+        done_this_run = processed - self.start_sample
+        remaining = max(self.total_samples - processed, 0)
+        sample_rate = self.sample_rate or 1
+
+        audio_seconds = done_this_run / sample_rate
+        rtf = elapsed / audio_seconds if audio_seconds > 0 else 0.0
+        if finished:
+            eta = 0.0
+        elif done_this_run > 0:
+            eta = elapsed * remaining / done_this_run
+        else:
+            eta = None
+
+        return {
+            "samples_processed": processed,
+            "total_samples": self.total_samples,
+            "sample_rate": self.sample_rate,
+            "audio_seconds": processed / sample_rate,
+            "total_seconds": self.total_samples / sample_rate,
+            "percent": 100.0 if finished else (processed / self.total_samples * 100 if self.total_samples else 0.0),
+            "elapsed": elapsed,
+            "rtf": rtf,
+            "eta": eta,
+            "segments": self.segments,
+            "last_text": self.last_text,
+            "finished": finished,
+        }
+
+
+class ProgressReporter:
+    """后台进度报告线程：按固定间隔把进度事件推送给所有订阅者"""
+
+    def __init__(self, state: ProgressState, subscribers: List[Callable[[Dict[str, Any]], None]],
+                 interval: float = 5.0):
+        """
+        Args:
+            state: 共享进度计数
+            subscribers: 订阅者列表，每个订阅者是接收进度事件字典的可调用对象
+            interval: 报告间隔（秒）
+        """
+        self.state = state
+        self.subscribers = list(subscribers)
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """启动报告线程"""
+        if self.subscribers:
+            self._thread = threading.Thread(target=self._run, name="progress-reporter", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, finished: bool = True):
+        """
+        停止报告线程并发送最后一次事件
+
+        Args:
+            finished: 识别是否正常完成
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+            self._publish(self.state.snapshot(finished=finished))
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self._publish(self.state.snapshot())
+
+    def _publish(self, event: Dict[str, Any]):
+        for subscriber in list(self.subscribers):
+            try:
+                subscriber(event)
+            except Exception as e:
+                # 出错的订阅者不再接收事件，不影响识别
+                print(f"\n进度订阅者出错，已移除: {e}")
+                self.subscribers.remove(subscriber)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop(finished=exc_type is None)
+
+
+def create_progress_bar(progress: float, width: int = 50) -> str:
+    """
+    创建ASCII进度条（避免编码问题）
+
+    Args:
+        progress: 进度百分比 (0-100)
+        width: 进度条宽度
+
+    Returns:
+        进度条字符串
+    """
+    filled = int(width * min(max(progress, 0.0), 100.0) / 100)
+    bar = '=' * filled + ' ' * (width - filled)
+    return f"[{bar}]"
+
+
+class ConsoleProgressBar:
+    """命令行进度条订阅者"""
+
+    def __init__(self, width: int = 50, text_chars: int = 80):
+        """
+        Args:
+            width: 进度条宽度
+            text_chars: 显示的最近识别文本长度上限
+        """
+        self.width = width
+        self.text_chars = text_chars
+
+    def __call__(self, event: Dict[str, Any]):
+        progress_bar = create_progress_bar(event['percent'], self.width)
+
+        if event['finished']:
+            print(f"\r进度: {progress_bar} 100.0% | 用时: {event['elapsed'] / 60:.1f}分钟"
+                  f" | RTF: {event['rtf']:.3f} | 识别完成！{' ' * 20}")
+            return
+
+        eta = f"{event['eta'] / 60:.1f}分钟" if event['eta'] is not None else "--"
+        progress_info = f"\r进度: {progress_bar} {event['percent']:.1f}%"
+        progress_info += f" | 已用时: {event['elapsed'] / 60:.1f}分钟"
+        progress_info += f" | 剩余: {eta}"
+        progress_info += f" | RTF: {event['rtf']:.3f}"
+
+        text = event['last_text']
+        if text:
+            display_text = text[:self.text_chars] + "..." if len(text) > self.text_chars else text
+            progress_info += f" | 识别: {display_text}"
+
+        print(progress_info, end='', flush=True)
+
+
+class JsonLinesProgressEmitter:
+    """JSON Lines进度订阅者：每个事件写一行JSON，便于其他程序解析"""
+
+    def __init__(self, stream: Optional[TextIO] = None):
+        """
+        Args:
+            stream: 输出流，默认为标准错误
+        """
+        self.stream = stream or sys.stderr
+
+    def __call__(self, event: Dict[str, Any]):
+        self.stream.write(json.dumps(event, ensure_ascii=False) + '\n')
+        self.stream.flush()
+
+
+class QueueProgressSubscriber:
+    """队列订阅者：把事件放入队列，供GUI主线程轮询（tkinter不能跨线程更新界面）"""
+
+    def __init__(self, event_queue: queue.Queue = None):
+        """
+        Args:
+            event_queue: 事件队列，默认新建一个有界队列
+        """
+        self.queue = event_queue if event_queue is not None else queue.Queue(maxsize=100)
+
+    def __call__(self, event: Dict[str, Any]):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            # 消费方跟不上时丢弃旧事件，只保留最新进度
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                pass
+            self.queue.put_nowait(event)
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+识别器池模块
+在进程内缓存已加载的sherpa-ncnn识别器，切换模型和重试时无需重新解析模型文件
+"""
+
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+
+import sherpa_ncnn
+
+
+class RecognizerPool:
+    """
+    进程级识别器池
+
+    以(模型ID, 解码方法, 线程数, 热词, 端点规则)为键缓存已初始化的识别器。
+    获取和归还时只重建解码流，不重新加载模型；空闲条目按最近最少使用顺序
+    在超出内存上限时淘汰。
+    """
+
+    def __init__(self, max_memory_mb: float = 1024):
+        """
+        初始化识别器池
+
+        Args:
+            max_memory_mb: 缓存识别器的估算内存上限（MB）
+        """
+        self.max_memory_mb = max_memory_mb
+        self._lock = threading.Lock()
+        # 键 -> 空闲识别器列表，按最近使用顺序排列（末尾为最新）
+        self._idle = OrderedDict()
+        # id(识别器) -> (键, 识别器)
+        self._in_use = {}
+        # 键 -> 单个识别器的估算内存（MB）
+        self._memory = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(model_id: str, model_config: Dict[str, Any],
+                 recognition_config: Dict[str, Any]) -> Tuple:
+        """生成识别器缓存键"""
+        rules = recognition_config.get('endpoint_rules', {})
+        return (
+            model_id or model_config.get('model_dir', ''),
+            recognition_config.get('decoding_method', 'greedy_search'),
+            int(recognition_config.get('num_threads', 4)),
+            recognition_config.get('hotwords_file', ''),
+            float(recognition_config.get('hotwords_score', 1.5)),
+            bool(recognition_config.get('enable_endpoint_detection', False)),
+            tuple(sorted(rules.items())),
+        )
+
+    @staticmethod
+    def estimate_memory_mb(model_config: Dict[str, Any]) -> float:
+        """按模型文件大小估算单个识别器的内存占用（MB）"""
+        total = 0
+        for file_path in model_config.get('files', {}).values():
+            try:
+                total += Path(file_path).stat().st_size
+            except OSError:
+                pass
+        return total / (1024 * 1024)
+
+    @staticmethod
+    def _create(model_config: Dict[str, Any], recognition_config: Dict[str, Any]):
+        """从磁盘加载模型并创建识别器"""
+        files = model_config.get('files', {})
+        rules = recognition_config.get('endpoint_rules', {})
+        return sherpa_ncnn.Recognizer(
+            tokens=files.get('tokens', ''),
+            encoder_param=files.get('encoder_param', ''),
+            encoder_bin=files.get('encoder_bin', ''),
+            decoder_param=files.get('decoder_param', ''),
+            decoder_bin=files.get('decoder_bin', ''),
+            joiner_param=files.get('joiner_param', ''),
+            joiner_bin=files.get('joiner_bin', ''),
+            num_threads=recognition_config.get('num_threads', 4),
+            decoding_method=recognition_config.get('decoding_method', 'greedy_search'),
+            enable_endpoint_detection=recognition_config.get('enable_endpoint_detection', False),
+            rule1_min_trailing_silence=rules.get('rule1_min_trailing_silence', 2.4),
+            rule2_min_trailing_silence=rules.get('rule2_min_trailing_silence', 1.2),
+            rule3_min_utterance_length=rules.get('rule3_min_utterance_length', 20),
+            model_sample_rate=model_config.get('sample_rate', 16000),
+            hotwords_file=recognition_config.get('hotwords_file', ''),
+            hotwords_score=recognition_config.get('hotwords_score', 1.5),
+        )
+
+    @staticmethod
+    def _reset_stream(recognizer):
+        """丢弃旧的解码流并在已加载的模型上新建一个"""
+        recognizer.stream = recognizer.recognizer.create_stream()
+
+    def acquire(self, model_id: str, model_config: Dict[str, Any],
+                recognition_config: Dict[str, Any]):
+        """
+        获取识别器，命中缓存时只重建解码流
+
+        Args:
+            model_id: 模型ID
+            model_config: 模型配置字典
+            recognition_config: 识别配置字典
+
+        Returns:
+            sherpa_ncnn.Recognizer实例，使用完毕后需调用release归还
+        """
+        key = self.make_key(model_id, model_config, recognition_config)
+
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                recognizer = idle.pop()
+                if not idle:
+                    del self._idle[key]
+                else:
+                    self._idle.move_to_end(key)
+                self._in_use[id(recognizer)] = (key, recognizer)
+                self.hits += 1
+                return recognizer
+
+        # 加载模型耗时较长，不持有锁
+        recognizer = self._create(model_config, recognition_config)
+
+        with self._lock:
+            self._memory[key] = self.estimate_memory_mb(model_config)
+            self._in_use[id(recognizer)] = (key, recognizer)
+            self.misses += 1
+            self._evict()
+        return recognizer
+
+    def release(self, recognizer) -> bool:
+        """
+        归还识别器，重建其解码流后放回空闲列表
+
+        Args:
+            recognizer: 通过acquire获取的识别器
+
+        Returns:
+            是否成功归还（不属于本池的识别器返回False）
+        """
+        with self._lock:
+            entry = self._in_use.pop(id(recognizer), None)
+            if entry is None:
+                return False
+
+            key, recognizer = entry
+            try:
+                self._reset_stream(recognizer)
+            except Exception as e:
+                # 流无法重建说明识别器已损坏，直接丢弃
+                print(f"识别器归还失败，已丢弃: {e}")
+                return False
+
+            self._idle.setdefault(key, []).append(recognizer)
+            self._idle.move_to_end(key)
+            self._evict()
+            return True
+
+    def discard(self, recognizer):
+        """丢弃一个已获取的识别器（不再放回池中）"""
+        with self._lock:
+            self._in_use.pop(id(recognizer), None)
+
+    def memory_usage_mb(self) -> float:
+        """当前池中全部识别器（含使用中）的估算内存（MB）"""
+        total = sum(self._memory.get(key, 0) * len(items) for key, items in self._idle.items())
+        total += sum(self._memory.get(key, 0) for key, _ in self._in_use.values())
+        return total
+
+    def _evict(self):
+        """按LRU顺序淘汰空闲识别器直到不超过内存上限（调用方持有锁）"""
+        while self._idle and self.memory_usage_mb() > self.max_memory_mb:
+            key, idle = next(iter(self._idle.items()))
+            idle.pop(0)
+            if not idle:
+                del self._idle[key]
+            print(f"识别器池超出内存上限 {self.max_memory_mb}MB，淘汰模型 {key[0]} 的空闲识别器")
+
+    def clear(self):
+        """清空所有空闲识别器"""
+        with self._lock:
+            self._idle.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取池统计信息"""
+        with self._lock:
+            return {
+                "idle": sum(len(items) for items in self._idle.values()),
+                "in_use": len(self._in_use),
+                "memory_mb": self.memory_usage_mb(),
+                "max_memory_mb": self.max_memory_mb,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+_default_pool: Optional[RecognizerPool] = None
+_default_pool_lock = threading.Lock()
+
+
+def get_recognizer_pool(max_memory_mb: float = None) -> RecognizerPool:
+    """
+    获取进程级默认识别器池
+
+    Args:
+        max_memory_mb: 若指定则更新内存上限
+
+    Returns:
+        RecognizerPool实例
+    """
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = RecognizerPool(max_memory_mb if max_memory_mb is not None else 1024)
+        elif max_memory_mb is not None:
+            _default_pool.max_memory_mb = max_memory_mb
+        return _default_pool
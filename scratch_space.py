@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+临时文件空间模块
+为提取的中间音频分配唯一的临时路径，小文件优先放在内存文件系统（tmpfs）中
+"""
+
+import os
+import json
+import time
+import uuid
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:
+    # Windows上没有fcntl，配额只在本进程内协调
+    fcntl = None
+
+
+# 配额账本文件名（位于临时目录中，多个进程共享）
+QUOTA_LEDGER = '.scratch_quota.json'
+QUOTA_LOCK = '.scratch_quota.lock'
+
+
+class ScratchQuotaError(RuntimeError):
+    """单个任务预计占用的空间超过配额，排队也无法满足"""
+
+
+def _pid_alive(pid: int) -> bool:
+    """进程是否仍在运行"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class ScratchQuota:
+    """
+    临时空间准入控制
+
+    每个任务在写中间文件之前按预计大小预留空间，预留记录在临时目录的账本文件中，
+    由文件锁在多个进程之间协调。设置了配额时已预留总量加上新任务不超过配额；
+    同时要求磁盘剩余空间扣除其他任务尚未写入的部分后仍然足够。条件不满足时排队等待，
+    而不是写到一半时磁盘写满。
+
+    预留关联到文件路径时，文件被删除后预留自动失效；所属进程退出后预留同样失效。
+    长期保留在临时空间中的文件（如音频缓存）通过add_persistent计入配额，
+    空间不足时先让其腾出空间再排队。
+    """
+
+    def __init__(self, ledger_dir: str, quota_mb: float = 0, min_free_mb: float = 64,
+                 poll_interval: float = 1.0):
+        """
+        Args:
+            ledger_dir: 账本所在目录（通常为临时目录）
+            quota_mb: 中间文件总量配额（MB），0为只按磁盘剩余空间判断
+            min_free_mb: 准入后磁盘至少保留的剩余空间（MB）
+            poll_interval: 排队时重新检查的间隔（秒）
+        """
+        self.ledger_dir = Path(ledger_dir)
+        self.quota_bytes = int(quota_mb * 1024 * 1024)
+        self.min_free_bytes = int(min_free_mb * 1024 * 1024)
+        self.poll_interval = poll_interval
+        self._thread_lock = threading.Lock()
+        # [(当前占用字节数的函数, 腾出指定字节数并返回实际腾出量的函数)]
+        self._persistent: List[Tuple[Callable[[], int], Optional[Callable[[int], int]]]] = []
+
+    def __getstate__(self):
+        # 传给工作进程时不复制线程锁
+        state = self.__dict__.copy()
+        del state['_thread_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._thread_lock = threading.Lock()
+
+    def add_persistent(self, usage: Callable[[], int], reclaim: Callable[[int], int] = None):
+        """
+        把长期保留的文件计入配额
+
+        Args:
+            usage: 返回当前占用字节数
+            reclaim: 配额不足时调用，尝试腾出指定字节数，返回实际腾出的字节数
+        """
+        self._persistent.append((usage, reclaim))
+
+    @contextmanager
+    def _locked_ledger(self):
+        """加锁读取账本，退出时写回"""
+        self.ledger_dir.mkdir(parents=True, exist_ok=True)
+        with self._thread_lock, open(self.ledger_dir / QUOTA_LOCK, 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                ledger_path = self.ledger_dir / QUOTA_LEDGER
+                try:
+                    with open(ledger_path, 'r', encoding='utf-8') as f:
+                        entries = json.load(f)
+                except (OSError, ValueError):
+                    entries = {}
+                # 清理失效的预留：进程已退出，或关联的文件已删除
+                entries = {key: entry for key, entry in entries.items()
+                           if _pid_alive(entry["pid"])
+                           and (not entry.get("path") or Path(entry["path"]).exists())}
+                yield entries
+                tmp_path = ledger_path.with_suffix('.tmp')
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(entries, f)
+                os.replace(tmp_path, ledger_path)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _pending_bytes(entry: Dict[str, Any]) -> int:
+        """预留中尚未写入磁盘的部分"""
+        written = 0
+        if entry.get("path"):
+            try:
+                written = Path(entry["path"]).stat().st_size
+            except OSError:
+                pass
+        return max(entry["bytes"] - written, 0)
+
+    def _over_quota(self, entries: Dict[str, Dict[str, Any]], nbytes: int) -> int:
+        """超出配额的字节数（已预留 + 长期保留的文件 + 新任务），未设置配额时为0"""
+        if not self.quota_bytes:
+            return 0
+        used = sum(entry["bytes"] for entry in entries.values())
+        used += sum(usage() for usage, _ in self._persistent)
+        return max(used + nbytes - self.quota_bytes, 0)
+
+    def _admissible(self, entries: Dict[str, Dict[str, Any]], nbytes: int, directory: Path) -> bool:
+        """按配额和磁盘剩余空间判断能否准入，超出配额时先让长期保留的文件腾出空间"""
+        excess = self._over_quota(entries, nbytes)
+        for _, reclaim in self._persistent:
+            if excess <= 0:
+                break
+            if reclaim is not None:
+                excess -= reclaim(excess)
+        if excess > 0:
+            return False
+        pending = sum(self._pending_bytes(entry) for entry in entries.values()
+                      if entry.get("directory") == str(directory))
+        return shutil.disk_usage(directory).free - pending - nbytes >= self.min_free_bytes
+
+    def acquire(self, nbytes: int, directory: str, create=None, timeout: float = None):
+        """
+        预留空间，不足时排队等待
+
+        Args:
+            nbytes: 预计写入的字节数
+            directory: 写入的目录（按该目录所在磁盘的剩余空间判断）
+            create: 准入后在锁内调用的函数，返回要关联的文件路径（文件删除即释放预留）
+            timeout: 最长等待时间（秒），None为一直等待
+
+        Returns:
+            (预留ID, create的返回值)
+
+        Raises:
+            ScratchQuotaError: 预计大小超过配额
+            TimeoutError: 等待超时
+        """
+        if self.quota_bytes and nbytes > self.quota_bytes:
+            raise ScratchQuotaError(f"预计中间文件 {nbytes / (1024 * 1024):.1f}MB "
+                                    f"超过临时空间配额 {self.quota_bytes / (1024 * 1024):.1f}MB")
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        waiting = False
+        while True:
+            with self._locked_ledger() as entries:
+                if self._admissible(entries, nbytes, directory):
+                    path = create() if create is not None else None
+                    key = uuid.uuid4().hex
+                    entries[key] = {"pid": os.getpid(), "bytes": nbytes,
+                                    "directory": str(directory),
+                                    "path": str(path) if path is not None else None}
+                    if waiting:
+                        print("临时空间已就绪，继续处理")
+                    return key, path
+                reserved = sum(entry["bytes"] for entry in entries.values())
+            if not waiting:
+                print(f"等待临时空间: 需要 {nbytes / (1024 * 1024):.1f}MB，"
+                      f"其他任务已预留 {reserved / (1024 * 1024):.1f}MB")
+                waiting = True
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"等待临时空间超时: {directory}")
+            time.sleep(self.poll_interval)
+
+    def release(self, key: str):
+        """释放预留"""
+        with self._locked_ledger() as entries:
+            entries.pop(key, None)
+
+    @contextmanager
+    def reserve(self, nbytes: int, directory: str, timeout: float = None):
+        """在with块内预留空间（块结束时释放）"""
+        key, _ = self.acquire(nbytes, directory, timeout=timeout)
+        try:
+            yield key
+        finally:
+            self.release(key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """当前预留统计"""
+        with self._locked_ledger() as entries:
+            return {
+                "reservations": len(entries),
+                "reserved_mb": sum(entry["bytes"] for entry in entries.values()) / (1024 * 1024),
+                "quota_mb": self.quota_bytes / (1024 * 1024),
+            }
+
+
+class ScratchSpace:
+    """
+    中间文件的存放位置
+
+    中间文件不再写在源文件旁边（源文件可能在较慢的网络共享上），而是写入scratch_dir；
+    预计大小不超过ram_max_mb且内存文件系统剩余空间足够时写入ram_dir。
+    每个文件名都由mkstemp生成，同一源文件的多个任务并发运行也不会冲突。
+    写入scratch_dir的文件先通过ScratchQuota预留空间，空间不足时排队。
+    """
+
+    def __init__(self, scratch_dir: str = None, ram_dir: str = '/dev/shm', ram_max_mb: float = 256,
+                 quota_mb: float = 0, wait_timeout: float = None):
+        """
+        Args:
+            scratch_dir: 临时目录，为空时使用系统临时目录
+            ram_dir: 内存文件系统目录（不存在时不使用）
+            ram_max_mb: 写入内存文件系统的文件大小上限（MB），0为不使用
+            quota_mb: 临时目录中中间文件的总量配额（MB），0为只按磁盘剩余空间判断
+            wait_timeout: 排队等待空间的最长时间（秒），None为一直等待
+        """
+        self.scratch_dir = Path(scratch_dir) if scratch_dir else Path(tempfile.gettempdir())
+        self.ram_dir = Path(ram_dir) if ram_dir else None
+        self.ram_max_bytes = int(ram_max_mb * 1024 * 1024)
+        self.quota = ScratchQuota(self.scratch_dir, quota_mb)
+        self.wait_timeout = wait_timeout
+
+    @classmethod
+    def from_config(cls, audio_config: Dict[str, Any]) -> 'ScratchSpace':
+        """
+        按音频配置创建
+
+        Args:
+            audio_config: 音频配置字典（scratch_dir、scratch_ram_dir、scratch_ram_max_mb、
+                scratch_quota_mb、scratch_wait_seconds）
+        """
+        wait_timeout = float(audio_config.get('scratch_wait_seconds', 0))
+        return cls(audio_config.get('scratch_dir') or None,
+                   audio_config.get('scratch_ram_dir', '/dev/shm'),
+                   float(audio_config.get('scratch_ram_max_mb', 256)),
+                   float(audio_config.get('scratch_quota_mb', 0)),
+                   wait_timeout if wait_timeout > 0 else None)
+
+    def fits_in_ram(self, expected_bytes: Optional[int]) -> bool:
+        """预计大小已知且不超过上限，并且内存文件系统剩余空间足够时使用内存"""
+        if not expected_bytes or expected_bytes > self.ram_max_bytes or self.ram_dir is None:
+            return False
+        if not self.ram_dir.is_dir() or not os.access(self.ram_dir, os.W_OK):
+            return False
+        # 留出一倍余量，避免把内存文件系统写满
+        return shutil.disk_usage(self.ram_dir).free > expected_bytes * 2
+
+    def new_path(self, stem: str, suffix: str = '.wav', expected_bytes: int = None) -> Path:
+        """
+        分配一个唯一的临时文件路径（文件已创建为空文件）
+
+        Args:
+            stem: 文件名前缀（通常为源文件名）
+            suffix: 扩展名
+            expected_bytes: 预计文件大小，用于决定是否放在内存文件系统中
+
+        Returns:
+            临时文件路径，调用方负责删除（删除后空间预留随之释放）
+
+        Raises:
+            ScratchQuotaError: 预计大小超过配额
+            TimeoutError: 等待空间超时
+        """
+        def create() -> Path:
+            directory.mkdir(parents=True, exist_ok=True)
+            fd, path = tempfile.mkstemp(prefix=f"{stem}.", suffix=suffix, dir=directory)
+            os.close(fd)
+            return Path(path)
+
+        if self.fits_in_ram(expected_bytes):
+            directory = self.ram_dir
+            return create()
+
+        directory = self.scratch_dir
+        if not expected_bytes:
+            return create()
+        # 在账本锁内创建文件，准入判断和登记之间不会有其他进程插入
+        _, path = self.quota.acquire(expected_bytes, directory, create, self.wait_timeout)
+        return path
+
+    def reserve(self, expected_bytes: int, directory: str = None):
+        """
+        为不经new_path分配的写入（例如音频缓存的临时文件）预留空间
+
+        Returns:
+            上下文管理器，with块结束时释放；expected_bytes为0时不预留
+        """
+        if not expected_bytes:
+            return nullcontext()
+        return self.quota.reserve(expected_bytes, directory or self.scratch_dir, self.wait_timeout)
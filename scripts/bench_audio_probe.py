@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+音频打开路径基准测试
+对比VideoFileClip与只探测容器头+只解码音频流两种方式的首个采样延迟和峰值内存（RSS）
+"""
+
+import sys
+import json
+import time
+import resource
+import argparse
+import subprocess
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+
+def first_sample_moviepy(media_path: str, sample_rate: int) -> float:
+    """VideoFileClip打开后读取第一块音频"""
+    from moviepy import VideoFileClip
+
+    start = time.perf_counter()
+    video = VideoFileClip(media_path)
+    try:
+        next(video.audio.iter_chunks(chunksize=sample_rate // 10, fps=sample_rate, quantize=True))
+        return time.perf_counter() - start
+    finally:
+        video.close()
+
+
+def first_sample_audio_only(media_path: str, sample_rate: int) -> float:
+    """探测容器头后只解码音频流，读取第一块"""
+    from audio_source import probe_media, FfmpegPcmStream
+
+    start = time.perf_counter()
+    if not probe_media(media_path)["audio_streams"]:
+        raise RuntimeError("没有音频轨道")
+    stream = FfmpegPcmStream(media_path, sample_rate)
+    chunks = stream.iter_chunks(sample_rate // 10)
+    try:
+        next(chunks)
+        return time.perf_counter() - start
+    finally:
+        chunks.close()
+
+
+METHODS = {
+    'moviepy': first_sample_moviepy,
+    'audio_only': first_sample_audio_only,
+}
+
+
+def run_child(method: str, media_path: str, sample_rate: int):
+    """在独立进程中测量，避免两种方式的内存互相影响"""
+    latency = METHODS[method](media_path, sample_rate)
+    # Linux下ru_maxrss单位为KB；子进程（ffmpeg）需已回收才计入
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    print(json.dumps({"latency": latency, "rss_mb": own, "child_rss_mb": children}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='音频打开路径基准测试')
+    parser.add_argument('media_path', help='视频文件路径（建议大体积1080p文件）')
+    parser.add_argument('--repeats', type=int, default=3, help='每种方式的重复次数')
+    parser.add_argument('--sample-rate', type=int, default=16000, help='解码采样率')
+    parser.add_argument('--child', choices=list(METHODS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.media_path, args.sample_rate)
+        return
+
+    size_mb = Path(args.media_path).stat().st_size / (1024 * 1024)
+    print(f"文件: {args.media_path} ({size_mb:.1f} MB)")
+
+    print(f"\n{'方式':<12}{'首个采样延迟(秒)':>18}{'Python RSS(MB)':>16}{'ffmpeg RSS(MB)':>16}")
+    for method in METHODS:
+        runs = []
+        for _ in range(args.repeats):
+            output = subprocess.run(
+                [sys.executable, __file__, args.media_path, '--child', method,
+                 '--sample-rate', str(args.sample_rate)],
+                capture_output=True, text=True, check=True
+            ).stdout
+            runs.append(json.loads(output.strip().splitlines()[-1]))
+        latency = min(run["latency"] for run in runs)
+        rss = max(run["rss_mb"] for run in runs)
+        child_rss = max(run["child_rss_mb"] for run in runs)
+        print(f"{method:<12}{latency:>18.3f}{rss:>16.1f}{child_rss:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+单文件并行解码基准测试
+对比串行recognize_file与静音切分并行解码的耗时和加速比
+"""
+
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from audio_source import WavPcmReader
+from sherpa_ncnn_video_to_text import VideoToTextSherpaNcnn
+
+
+def main():
+    parser = argparse.ArgumentParser(description='单文件并行解码基准测试')
+    parser.add_argument('audio_path', help='16位PCM WAV文件路径（建议30分钟以上）')
+    parser.add_argument('-c', '--config', default='config.json', help='配置文件路径')
+    parser.add_argument('-m', '--model', help='模型ID')
+    parser.add_argument('--workers', type=int, nargs='+', default=[2, 4, 8],
+                        help='要测试的并行进程数')
+    parser.add_argument('--chunk_size', type=float, default=0.1, help='块大小（秒）')
+    args = parser.parse_args()
+
+    with WavPcmReader(args.audio_path) as reader:
+        duration = reader.duration
+
+    converter = VideoToTextSherpaNcnn(args.config, args.model)
+    recognizer = converter.recognizer
+
+    print(f"CPU核数: {os.cpu_count()}, 音频时长: {duration / 60:.1f}分钟")
+
+    results = []
+    start = time.perf_counter()
+    serial_text = recognizer.recognize_file(args.audio_path, args.chunk_size, show_progress=False)
+    serial_time = time.perf_counter() - start
+    results.append(("串行", serial_time, len(serial_text)))
+
+    for workers in args.workers:
+        start = time.perf_counter()
+        text = recognizer.recognize_file(args.audio_path, args.chunk_size, show_progress=False,
+                                         parallel_workers=workers)
+        results.append((f"并行x{workers}", time.perf_counter() - start, len(text)))
+
+    print(f"\n{'模式':<10}{'耗时(秒)':>12}{'RTF':>10}{'加速比':>10}{'文本长度':>10}")
+    for name, seconds, length in results:
+        print(f"{name:<10}{seconds:>12.1f}{seconds / duration:>10.3f}"
+              f"{serial_time / seconds:>10.2f}{length:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+PCM读取基准测试
+对比recognize_file原有的逐块seek读取与WavPcmReader顺序内存映射读取
+"""
+
+import sys
+import time
+import wave
+import argparse
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from audio_source import WavPcmReader
+
+
+def create_test_wav(path: Path, minutes: float, sample_rate: int = 16000):
+    """生成指定时长的16位单声道测试音频"""
+    rng = np.random.default_rng(0)
+    block = sample_rate * 60
+    with wave.open(str(path), 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        remaining = int(minutes * block)
+        while remaining > 0:
+            n = min(block, remaining)
+            wf.writeframes(rng.integers(-8000, 8000, n, dtype=np.int16).tobytes())
+            remaining -= n
+
+
+def legacy_loop(audio_path: str, chunk_size: float, on_chunk=None) -> dict:
+    """原有实现：逐块setpos/readframes并新建int16和float32数组"""
+    checksum = 0.0
+    with wave.open(audio_path, 'rb') as wf:
+        sample_rate = wf.getframerate()
+        num_samples = wf.getnframes()
+        chunk_samples = int(chunk_size * sample_rate)
+        total_chunks = (num_samples + chunk_samples - 1) // chunk_samples
+
+        for chunk_idx in range(total_chunks):
+            start_sample = chunk_idx * chunk_samples
+            end_sample = min(start_sample + chunk_samples, num_samples)
+            wf.setpos(start_sample)
+            chunk_frames = wf.readframes(end_sample - start_sample)
+            samples_int16 = np.frombuffer(chunk_frames, dtype=np.int16)
+            samples_float32 = samples_int16.astype(np.float32) / 32768.0
+            checksum += float(samples_float32[0])
+            if on_chunk is not None:
+                on_chunk()
+    return {"chunks": total_chunks, "checksum": checksum}
+
+
+def mmap_loop(audio_path: str, chunk_size: float, on_chunk=None) -> dict:
+    """新实现：内存映射 + 复用float32缓冲区"""
+    checksum = 0.0
+    chunks = 0
+    with WavPcmReader(audio_path) as reader:
+        chunk_samples = int(chunk_size * reader.sample_rate)
+        for _, samples_float32 in reader.iter_chunks(chunk_samples):
+            chunks += 1
+            checksum += float(samples_float32[0])
+            if on_chunk is not None:
+                on_chunk()
+    return {"chunks": chunks, "checksum": checksum}
+
+
+def measure_chunk_allocations(func, audio_path: str, chunk_size: float) -> float:
+    """
+    用tracemalloc测量每块处理期间新分配的内存
+
+    每块结束时读取峰值并重置，峰值减去该块开始时的占用即为该块的临时分配；
+    返回所有块（第一块之后，排除打开文件和预分配）的最大值（字节）。
+    """
+    worst = 0
+    baseline = None
+
+    def on_chunk():
+        nonlocal worst, baseline
+        current, peak = tracemalloc.get_traced_memory()
+        if baseline is not None:
+            worst = max(worst, peak - baseline)
+        tracemalloc.reset_peak()
+        baseline = current
+
+    tracemalloc.start()
+    try:
+        func(audio_path, chunk_size, on_chunk)
+    finally:
+        tracemalloc.stop()
+    return worst
+
+
+def run(name: str, func, audio_path: str, chunk_size: float, repeat: int) -> dict:
+    """多次运行取最短时间，并用tracemalloc记录峰值内存"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(audio_path, chunk_size)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    func(audio_path, chunk_size)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    with wave.open(audio_path, 'rb') as wf:
+        chunk_bytes = int(chunk_size * wf.getframerate()) * np.dtype(np.float32).itemsize
+    chunk_alloc = measure_chunk_allocations(func, audio_path, chunk_size)
+    result.update({"name": name, "seconds": best, "peak_kb": peak / 1024,
+                   "chunk_alloc": chunk_alloc, "chunk_arrays": chunk_alloc / chunk_bytes})
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='PCM读取基准测试')
+    parser.add_argument('--audio', help='WAV文件路径，不指定则生成测试音频')
+    parser.add_argument('--minutes', type=float, default=60.0, help='生成测试音频的时长（分钟）')
+    parser.add_argument('--chunk_size', type=float, default=0.1, help='块大小（秒）')
+    parser.add_argument('--repeat', type=int, default=3, help='重复次数')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        audio_path = args.audio
+        if audio_path is None:
+            audio_path = str(Path(tmp_dir) / "bench.wav")
+            print(f"生成 {args.minutes:.0f} 分钟测试音频...")
+            create_test_wav(Path(audio_path), args.minutes)
+
+        results = [
+            run("wave.setpos/readframes", legacy_loop, audio_path, args.chunk_size, args.repeat),
+            run("WavPcmReader(mmap)", mmap_loop, audio_path, args.chunk_size, args.repeat),
+        ]
+
+    if results[0]["checksum"] != results[1]["checksum"]:
+        print("警告: 两种实现的输出不一致")
+
+    # 每块新分配按一个块大小的float32数组折算，即每块分配的块大小数组个数
+    print(f"\n{'实现':<26}{'块数':>8}{'每块新分配(字节)':>18}{'折合块数组数':>14}{'耗时(秒)':>12}"
+          f"{'峰值内存(KB)':>16}")
+    for r in results:
+        print(f"{r['name']:<26}{r['chunks']:>8}{r['chunk_alloc']:>18}{r['chunk_arrays']:>14.2f}"
+              f"{r['seconds']:>12.3f}{r['peak_kb']:>16.1f}")
+
+    speedup = results[0]["seconds"] / results[1]["seconds"] if results[1]["seconds"] else 0
+    print(f"\n加速比: {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+分段并行提取基准测试
+对比单个ffmpeg进程提取与按时间范围分段并行提取的耗时，并检查段边界处与单次解码是否一致
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from audio_source import (WavPcmReader, probe_media, extract_audio_stream, extract_audio_ranges,
+                          check_range_drift, report_range_drift)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='分段并行提取基准测试')
+    parser.add_argument('media_path', help='音视频文件路径（建议1小时以上）')
+    parser.add_argument('--ranges', type=int, nargs='+', default=[2, 4, 8], help='要测试的分段数')
+    parser.add_argument('--sample-rate', type=int, default=16000, help='提取采样率')
+    parser.add_argument('--no-verify', action='store_true', help='不做段边界检查')
+    args = parser.parse_args()
+
+    info = probe_media(args.media_path)
+    duration = info["duration"]
+    size_mb = Path(args.media_path).stat().st_size / (1024 * 1024)
+    print(f"文件: {args.media_path} ({size_mb:.1f} MB, {duration:.1f}秒)")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        reference = Path(tmp_dir) / 'single.wav'
+        start = time.perf_counter()
+        extract_audio_stream(args.media_path, reference, args.sample_rate)
+        single_time = time.perf_counter() - start
+
+        rows = [("单进程", single_time, None)]
+        for num_ranges in args.ranges:
+            output = Path(tmp_dir) / f'ranges{num_ranges}.wav'
+            start = time.perf_counter()
+            boundaries = extract_audio_ranges(args.media_path, output, num_ranges,
+                                              args.sample_rate, 1, duration)
+            elapsed = time.perf_counter() - start
+
+            # 与单进程提取的完整结果逐采样对比
+            with WavPcmReader(reference) as a, WavPcmReader(output) as b:
+                frames = min(a.num_frames, b.num_frames)
+                mismatched = int(np.count_nonzero(a.samples[:frames] != b.samples[:frames]))
+                note = f"帧数 {b.num_frames}/{a.num_frames}，不一致采样 {mismatched}"
+            rows.append((f"{num_ranges}段", elapsed, note))
+
+            if not args.no_verify:
+                print(f"\n{num_ranges}段边界检查（对比顺序解码）:")
+                report_range_drift(check_range_drift(args.media_path, output, boundaries,
+                                                     args.sample_rate))
+            os.remove(output)
+
+    print(f"\n{'方式':<10}{'耗时(秒)':>10}{'加速比':>8}{'音频秒/秒':>12}  对比单进程")
+    for name, elapsed, note in rows:
+        print(f"{name:<10}{elapsed:>10.2f}{single_time / elapsed:>8.2f}{duration / elapsed:>12.0f}  "
+              f"{note or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+重采样与混音基准测试
+对比44.1kHz立体声输入的两种送入方式：
+  原方式：只取第一个声道，按文件采样率送入，由识别器逐块内部重采样
+  新方式：数据源层平均混音并用多相滤波器重采样，送入模型采样率的单声道
+"""
+
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from audio_source import WavPcmReader, ResamplingSource, INT16_SCALE
+
+
+def write_test_wav(path: Path, seconds: float, sample_rate: int = 44100):
+    """生成立体声测试WAV（两个声道内容不同）"""
+    import wave
+
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    left = 0.3 * np.sin(2 * np.pi * 440 * t)
+    right = 0.3 * np.sin(2 * np.pi * 660 * t)
+    samples = (np.stack([left, right], axis=1) * 32767).astype('<i2')
+    with wave.open(str(path), 'wb') as wf:
+        wf.setnchannels(2)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(samples.tobytes())
+
+
+def iter_legacy(reader: WavPcmReader, chunk_seconds: float):
+    """原方式：第一个声道，文件采样率"""
+    chunk_frames = int(chunk_seconds * reader.sample_rate)
+    buffer = np.empty(chunk_frames, dtype=np.float32)
+    channel = reader.samples[:, 0]
+    for start in range(0, reader.num_frames, chunk_frames):
+        end = min(start + chunk_frames, reader.num_frames)
+        out = buffer[:end - start]
+        np.multiply(channel[start:end], INT16_SCALE, out=out)
+        yield reader.sample_rate, out
+
+
+def iter_resampled(reader: WavPcmReader, chunk_seconds: float, model_rate: int):
+    """新方式：平均混音 + 多相重采样到模型采样率"""
+    source = ResamplingSource(reader, model_rate)
+    for _, out in source.iter_chunks(int(chunk_seconds * model_rate)):
+        yield model_rate, out
+
+
+def measure(chunks, recognizer=None) -> float:
+    """遍历数据源（可选送入识别器），返回耗时"""
+    start = time.perf_counter()
+    for sample_rate, samples in chunks:
+        if recognizer is not None:
+            recognizer.accept_waveform(sample_rate, samples)
+    if recognizer is not None:
+        recognizer.input_finished()
+        _ = recognizer.text
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='重采样与混音基准测试')
+    parser.add_argument('audio_path', nargs='?', help='44.1kHz立体声16位WAV（不指定则生成测试文件）')
+    parser.add_argument('--seconds', type=float, default=600, help='生成测试文件的时长（秒）')
+    parser.add_argument('--chunk_size', type=float, default=0.1, help='块大小（秒）')
+    parser.add_argument('--model-rate', type=int, default=16000, help='模型采样率')
+    parser.add_argument('-c', '--config', help='配置文件路径；指定时同时测量送入识别器的总耗时')
+    parser.add_argument('-m', '--model', help='模型ID')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if args.audio_path:
+            audio_path = Path(args.audio_path)
+        else:
+            audio_path = Path(tmp_dir) / 'bench_resample_input.wav'
+            print(f"生成测试文件: {audio_path} ({args.seconds:.0f}秒, 44.1kHz立体声)")
+            write_test_wav(audio_path, args.seconds)
+
+        recognizer = None
+        if args.config:
+            from sherpa_ncnn_video_to_text import VideoToTextSherpaNcnn
+            converter = VideoToTextSherpaNcnn(args.config, args.model)
+            recognizer = converter.recognizer.recognizer
+            args.model_rate = recognizer.sample_rate
+
+        with WavPcmReader(audio_path) as reader:
+            duration = reader.duration
+            print(f"输入: {reader.sample_rate}Hz, {reader.num_channels}声道, {duration:.1f}秒")
+
+            results = []
+            for name, make_chunks in [
+                ("原方式(声道0)", lambda: iter_legacy(reader, args.chunk_size)),
+                ("混音+重采样", lambda: iter_resampled(reader, args.chunk_size, args.model_rate)),
+            ]:
+                source_time = measure(make_chunks())
+                total_time = None
+                if recognizer is not None:
+                    converter.recognizer._setup_recognizer()
+                    recognizer = converter.recognizer.recognizer
+                    total_time = measure(make_chunks(), recognizer)
+                results.append((name, source_time, total_time))
+
+    print(f"\n{'方式':<16}{'数据源耗时(秒)':>16}{'数据源倍速':>12}{'含识别耗时(秒)':>16}{'RTF':>10}")
+    for name, source_time, total_time in results:
+        total = f"{total_time:>16.2f}{total_time / duration:>10.3f}" if total_time is not None else f"{'-':>16}{'-':>10}"
+        print(f"{name:<16}{source_time:>16.3f}{duration / source_time:>11.0f}x{total}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+目录扫描基准测试
+对比按扩展名逐个rglob（每个扩展名大小写各一次）与单次scandir遍历的总耗时和首个文件延迟
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from audio_source import VIDEO_EXTENSIONS
+from media_scanner import iter_media_files
+
+
+def make_tree(root: Path, dirs: int, files_per_dir: int):
+    """生成测试目录树：每个目录中少量视频，其余为其他文件"""
+    for d in range(dirs):
+        directory = root / f"d{d // 100:03d}" / f"d{d:05d}"
+        directory.mkdir(parents=True, exist_ok=True)
+        for f in range(files_per_dir):
+            suffix = '.mp4' if f == 0 else ('.MKV' if f == 1 else '.jpg')
+            (directory / f"f{f:03d}{suffix}").touch()
+
+
+def scan_rglob(root: Path):
+    """原方式：每个扩展名大小写各rglob一次，最后排序"""
+    files = []
+    for ext in sorted(VIDEO_EXTENSIONS):
+        files.extend(root.rglob(f"*{ext}"))
+        files.extend(root.rglob(f"*{ext.upper()}"))
+    yield from sorted(files)
+
+
+def scan_scandir(root: Path):
+    """新方式：单次scandir遍历，边遍历边产出"""
+    yield from iter_media_files(root, VIDEO_EXTENSIONS)
+
+
+def measure(scan, root: Path):
+    """返回(首个文件延迟, 总耗时, 文件数)"""
+    start = time.perf_counter()
+    first = None
+    count = 0
+    for _ in scan(root):
+        if first is None:
+            first = time.perf_counter() - start
+        count += 1
+    return first or 0.0, time.perf_counter() - start, count
+
+
+def main():
+    parser = argparse.ArgumentParser(description='目录扫描基准测试')
+    parser.add_argument('root', nargs='?', help='要扫描的目录（不指定则生成测试目录树）')
+    parser.add_argument('--dirs', type=int, default=2000, help='生成的目录数')
+    parser.add_argument('--files-per-dir', type=int, default=20, help='每个目录的文件数')
+    args = parser.parse_args()
+
+    if args.root:
+        root = Path(args.root)
+    else:
+        root = Path('bench_scan_tree')
+        if not root.exists():
+            print(f"生成测试目录树: {root} ({args.dirs}个目录 × {args.files_per_dir}个文件)")
+            make_tree(root, args.dirs, args.files_per_dir)
+
+    print(f"\n{'方式':<12}{'首个文件(秒)':>14}{'总耗时(秒)':>12}{'文件数':>10}")
+    for name, scan in [("rglob×14", scan_rglob), ("scandir", scan_scandir)]:
+        first, total, count = measure(scan, root)
+        print(f"{name:<12}{first:>14.3f}{total:>12.3f}{count:>10}")
+
+
+if __name__ == "__main__":
+    main()
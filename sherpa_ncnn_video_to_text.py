@@ -11,7 +11,7 @@ import time
 import argparse
 import tempfile
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Callable
 
 try:
     import numpy as np
@@ -21,63 +21,94 @@ except ImportError as e:
     print("请运行: pip install sherpa-ncnn")
     sys.exit(1)
 
-try:
-    from moviepy import VideoFileClip
-except ImportError as e:
-    print(f"缺少moviepy依赖: {e}")
-    print("请运行: pip install moviepy")
-    sys.exit(1)
-
 from config_manager import ConfigManager
+from audio_source import (WavPcmReader, PrefetchingSource, open_audio_source, probe_media,
+                          extract_audio_stream, plan_extract_ranges, detect_input_type, INPUT_PCM)
+from recognizer_pool import get_recognizer_pool
+from parallel_recognition import recognize_parallel
+from transcript_writer import make_segment, join_segments, get_writer, TranscriptSink, OUTPUT_FORMATS
+from checkpoint import TranscriptionCheckpoint
+from audio_cache import AudioCache
+from scratch_space import ScratchSpace, ScratchQuotaError
+from progress_reporter import ProgressState, ProgressReporter, ConsoleProgressBar, JsonLinesProgressEmitter
+from tuner import tune_parameters
+
+
+# 解码节奏：max为尽可能快，realtime按音频时长对齐墙钟时间（模拟实时输入）
+PACING_MODES = ('max', 'realtime')
 
 
 class SherpaNcnnRecognizer:
     """sherpa-ncnn语音识别器"""
     
-    def __init__(self, model_config: Dict[str, Any], recognition_config: Dict[str, Any] = None):
+    def __init__(self, model_config: Dict[str, Any], recognition_config: Dict[str, Any] = None,
+                 model_id: str = None):
         """
         初始化sherpa-ncnn识别器
         
         Args:
             model_config: 模型配置字典
             recognition_config: 识别配置字典
+            model_id: 模型ID，用作识别器池的缓存键
         """
         self.model_config = model_config
         self.recognition_config = recognition_config or {}
+        self.model_id = model_id
         self.recognizer = None
+        # 片段级错误恢复统计（每次识别开始时清零）
+        self.recovered_chunks = 0
+        self.skipped_chunks = 0
         self._setup_recognizer()
     
     def _setup_recognizer(self):
-        """设置识别器"""
+        """设置识别器（从识别器池获取，已加载的模型只重建解码流）"""
         try:
-            # 从模型配置中获取文件路径
-            files = self.model_config.get('files', {})
+            pool = get_recognizer_pool()
             
-            # 从识别配置中获取参数
-            rec_config = self.recognition_config
+            # 先归还当前识别器，命中缓存时会拿回同一个已加载的模型
+            self.release()
             
-            self.recognizer = sherpa_ncnn.Recognizer(
-                tokens=files.get('tokens', ''),
-                encoder_param=files.get('encoder_param', ''),
-                encoder_bin=files.get('encoder_bin', ''),
-                decoder_param=files.get('decoder_param', ''),
-                decoder_bin=files.get('decoder_bin', ''),
-                joiner_param=files.get('joiner_param', ''),
-                joiner_bin=files.get('joiner_bin', ''),
-                num_threads=rec_config.get('num_threads', 4),
-                decoding_method=rec_config.get('decoding_method', 'greedy_search'),
-                enable_endpoint_detection=rec_config.get('enable_endpoint_detection', False),
-                model_sample_rate=self.model_config.get('sample_rate', 16000),
-                hotwords_file=rec_config.get('hotwords_file', ''),
-                hotwords_score=rec_config.get('hotwords_score', 1.5),
-            )
-            print(f"sherpa-ncnn识别器初始化成功，采样率: {self.recognizer.sample_rate}")
+            load_start = time.time()
+            self.recognizer = pool.acquire(self.model_id, self.model_config, self.recognition_config)
+            load_time = time.time() - load_start
+            
+            print(f"sherpa-ncnn识别器就绪，采样率: {self.recognizer.sample_rate}，耗时: {load_time:.3f}秒")
         except Exception as e:
             print(f"识别器初始化失败: {e}")
             raise
     
+    def _recover_stream(self, reader, rewind_start: int, chunk_end: int) -> bool:
+        """
+        片段出错后的轻量恢复：在已加载的模型上新建解码流，重新送入回退窗口内的音频
+        
+        Args:
+            reader: 当前音频数据源（WavPcmReader或FfmpegPcmStream）
+            rewind_start: 回退窗口起点（不早于当前语句起点）
+            chunk_end: 出错片段的结束采样
+            
+        Returns:
+            回退窗口是否重新送入成功；失败时解码流已重建，出错片段被跳过
+        """
+        self.recognizer.stream = self.recognizer.recognizer.create_stream()
+        try:
+            samples = reader.get_range(rewind_start, chunk_end)
+            self.recognizer.accept_waveform(reader.sample_rate, samples)
+            return True
+        except Exception as refeed_error:
+            print(f"重新送入回退窗口失败，跳过该片段: {refeed_error}")
+            self.recognizer.stream = self.recognizer.recognizer.create_stream()
+            return False
+    
+    def release(self):
+        """将识别器归还识别器池"""
+        if self.recognizer is not None:
+            get_recognizer_pool().release(self.recognizer)
+            self.recognizer = None
+    
     def recognize_file(self, audio_path: str, chunk_size: float = 0.1, 
-                       show_progress: bool = True, progress_interval: float = 5.0) -> str:
+                       show_progress: bool = True, progress_interval: float = 5.0,
+                       pacing: str = 'max', parallel_workers: int = 0,
+                       progress_callbacks: List[Callable] = None) -> str:
         """
         识别音频文件
         
@@ -86,131 +117,189 @@ class SherpaNcnnRecognizer:
             chunk_size: 流式处理的块大小（秒）
             show_progress: 是否显示进度条
             progress_interval: 进度更新间隔（秒）
-            
+            pacing: 解码节奏，max为全速解码不等待，realtime按音频时长实时送入
+            parallel_workers: 并行进程数，大于1时在静音处切分并行解码（仅max节奏）
+            progress_callbacks: 进度订阅者列表，每个接收一个进度事件字典
+        
         Returns:
             识别的文本
         """
+        return join_segments(list(self.iter_segments(
+            audio_path, chunk_size, show_progress, progress_interval, pacing, parallel_workers,
+            progress_callbacks=progress_callbacks
+        )))
+    
+    def iter_segments(self, audio_path: str, chunk_size: float = 0.1,
+                      show_progress: bool = True, progress_interval: float = 5.0,
+                      pacing: str = 'max', parallel_workers: int = 0,
+                      start_sample: int = 0, start_index: int = 0,
+                      progress_callbacks: List[Callable] = None):
+        """
+        识别音频文件，逐条产出语句
+        
+        启用端点检测时，每检测到一个端点就产出一条语句并重置解码流，
+        长文件的解码状态不会持续累积；未启用时整个文件为一条语句。
+        解码循环只更新进度计数，进度由后台线程按progress_interval推送给订阅者。
+        
+        Args:
+            audio_path: 音频文件路径
+            chunk_size: 流式处理的块大小（秒）
+            show_progress: 是否显示进度条
+            progress_interval: 进度更新间隔（秒）
+            pacing: 解码节奏，max为全速解码不等待，realtime按音频时长实时送入
+            parallel_workers: 并行进程数，大于1时在静音处切分并行解码（仅max节奏）
+            start_sample: 从该采样位置开始识别（断点续传时为上次提交的端点）
+            start_index: 第一条语句的序号
+            progress_callbacks: 进度订阅者列表，每个接收一个进度事件字典
+        
+        Yields:
+            语句字典（index/start_sample/end_sample/start/end/text）
+        """
         if not self.recognizer:
             raise RuntimeError("识别器未初始化")
         
+        if pacing not in PACING_MODES:
+            raise ValueError(f"不支持的解码节奏: {pacing}，可选: {', '.join(PACING_MODES)}")
+        
+        subscribers = list(progress_callbacks or [])
+        if show_progress:
+            subscribers.append(ConsoleProgressBar())
+        
+        if parallel_workers > 1 and pacing == 'max' and start_sample == 0:
+            try:
+                with WavPcmReader(audio_path) as reader:
+                    progress = ProgressState(reader.num_frames, reader.sample_rate)
+            except ValueError:
+                # 并行切分需要随机访问，非WAV输入改为串行流式识别
+                print("并行识别需要16位PCM WAV输入，改为串行识别")
+                parallel_workers = 0
+        
+        if parallel_workers > 1 and pacing == 'max' and start_sample == 0:
+            with ProgressReporter(progress, subscribers, progress_interval):
+                yield from recognize_parallel(
+                    audio_path, self.model_id, self.model_config, self.recognition_config,
+                    parallel_workers, chunk_size, progress
+                )
+            return
+        
+        endpoint_enabled = self.recognition_config.get('enable_endpoint_detection', False)
+        rewind_seconds = self.recognition_config.get('error_rewind_seconds', 2.0)
+        queue_blocks = int(self.recognition_config.get('pipeline_queue_blocks', 64))
+        self.recovered_chunks = 0
+        self.skipped_chunks = 0
+        
         try:
-            # 使用更安全的文件处理方式
-            with wave.open(audio_path, 'rb') as wf:
+            # WAV内存映射读取，其他格式由ffmpeg管道流式解码；逐块转换复用同一缓冲区。
+            # 启用流水线时解码在后台线程中提前进行，回退缓冲区需覆盖队列中尚未识别的块
+            history_seconds = rewind_seconds + chunk_size * (queue_blocks + 3)
+            source = open_audio_source(audio_path, self.recognizer.sample_rate, history_seconds)
+            if queue_blocks > 0:
+                source = PrefetchingSource(source, queue_blocks)
+            with source as reader:
                 # 检查音频格式
-                if wf.getnchannels() != 1:
-                    print(f"警告: 音频文件有{wf.getnchannels()}个声道，将使用第一个声道")
+                if reader.num_channels != 1:
+                    print(f"音频文件有{reader.num_channels}个声道，将平均混合为单声道")
                 
-                if wf.getsampwidth() != 2:
-                    print(f"警告: 音频采样宽度为{wf.getsampwidth()}字节，期望2字节")
-                
-                wave_file_sample_rate = wf.getframerate()
-                num_samples = wf.getnframes()
+                wave_file_sample_rate = reader.sample_rate
+                num_samples = reader.num_frames
                 
                 duration = num_samples / wave_file_sample_rate
                 print(f"开始识别音频文件: {audio_path}")
                 print(f"音频时长: {duration:.2f}秒")
+                if start_sample:
+                    print(f"从断点继续: {start_sample / wave_file_sample_rate:.2f}秒")
                 
-                # 分批读取音频数据，避免内存问题
-                chunk_samples = int(chunk_size * wave_file_sample_rate)
-                total_chunks = (num_samples + chunk_samples - 1) // chunk_samples
+                # 顺序分块读取，不再逐块seek
+                chunk_samples = max(1, int(chunk_size * wave_file_sample_rate))
+                total_chunks = (num_samples - start_sample + chunk_samples - 1) // chunk_samples
                 
-                # 进度显示相关变量
-                last_progress_time = time.time()
-                processed_chunks = 0
+                # 进度计数：解码循环只写整数，格式化和输出在报告线程中完成
+                progress = ProgressState(num_samples, wave_file_sample_rate, start_sample)
+                reporter = ProgressReporter(progress, subscribers, progress_interval).start()
+                finished = False
                 
-                # 分批处理音频数据
-                for chunk_idx in range(total_chunks):
-                    start_sample = chunk_idx * chunk_samples
-                    end_sample = min(start_sample + chunk_samples, num_samples)
-                    
-                    # 读取当前片段
-                    wf.setpos(start_sample)
-                    chunk_frames = wf.readframes(end_sample - start_sample)
-                    
-                    if not chunk_frames:
-                        break
-                    
-                    # 转换为numpy数组
-                    samples_int16 = np.frombuffer(chunk_frames, dtype=np.int16)
-                    if wf.getnchannels() > 1:
-                        samples_int16 = samples_int16.reshape(-1, wf.getnchannels())[:, 0]
-                    
-                    samples_float32 = samples_int16.astype(np.float32) / 32768.0
-                    
-                    # 处理音频片段
-                    try:
-                        self.recognizer.accept_waveform(wave_file_sample_rate, samples_float32)
-                    except Exception as chunk_error:
-                        print(f"处理片段 {chunk_idx + 1}/{total_chunks} 时出错: {chunk_error}")
-                        # 尝试重置识别器并继续
-                        try:
-                            self.recognizer.reset()
-                            # 重新初始化识别器
-                            self._setup_recognizer()
-                            print("识别器已重置，继续处理...")
-                        except Exception as reset_error:
-                            print(f"重置识别器失败: {reset_error}")
-                            raise
-                    
-                    processed_chunks = chunk_idx + 1
-                    
-                    # 计算和显示进度
-                    if show_progress and (time.time() - last_progress_time >= progress_interval or chunk_idx == total_chunks - 1):
-                        progress = (processed_chunks / total_chunks) * 100
-                        elapsed_time = time.time() - last_progress_time
-                        
+                # realtime节奏的墙钟起点
+                pacing_start = time.perf_counter()
+                
+                # 当前语句的起始采样和已产出的语句数
+                utterance_start = start_sample
+                segment_index = start_index
+                
+                try:
+                    # 分批处理音频数据
+                    for chunk_idx, (chunk_start, samples_float32) in enumerate(reader.iter_chunks(chunk_samples, start_sample)):
+                        # 处理音频片段
                         try:
-                            current_text = self.recognizer.text
-                        except:
-                            current_text = ""
+                            self.recognizer.accept_waveform(wave_file_sample_rate, samples_float32)
+                        except Exception as chunk_error:
+                            print(f"处理片段 {chunk_idx + 1}/{total_chunks} 时出错: {chunk_error}")
+                            # 已产出的语句不受影响；只丢弃当前语句的解码状态，
+                            # 在已加载的模型上新建解码流并回退一小段重新送入
+                            chunk_end = chunk_start + len(samples_float32)
+                            rewind_start = max(utterance_start,
+                                               chunk_start - int(rewind_seconds * wave_file_sample_rate))
+                            try:
+                                if self._recover_stream(reader, rewind_start, chunk_end):
+                                    self.recovered_chunks += 1
+                                    print(f"已恢复，回退 {(chunk_start - rewind_start) / wave_file_sample_rate:.1f}秒重新送入")
+                                else:
+                                    self.skipped_chunks += 1
+                                utterance_start = rewind_start
+                            except Exception as reset_error:
+                                print(f"重建解码流失败: {reset_error}")
+                                raise
                         
-                        # 估算剩余时间
-                        if progress > 0:
-                            total_estimated_time = elapsed_time * (100 / progress)
-                            remaining_time = total_estimated_time - elapsed_time
-                        else:
-                            remaining_time = 0
+                        chunk_end = chunk_start + len(samples_float32)
+                        progress.samples_processed = chunk_end
                         
-                        # 创建进度条（使用ASCII字符避免编码问题）
-                        progress_bar = self._create_progress_bar_ascii(progress, 50)
-                        
-                        # 限制识别文本长度，避免控制台混乱
-                        display_text = current_text[:80] + "..." if len(current_text) > 80 else current_text
-                        
-                        progress_info = f"\r进度: {progress_bar} {progress:.1f}%"
-                        progress_info += f" | 已用时: {elapsed_time/60:.1f}分钟"
-                        progress_info += f" | 剩余: {remaining_time/60:.1f}分钟"
-                        progress_info += f" | 片段: {processed_chunks}/{total_chunks}"
-                        if display_text.strip():
-                            progress_info += f" | 识别: {display_text}"
+                        # 检测到端点：产出当前语句并重置解码流
+                        if endpoint_enabled and self.recognizer.is_endpoint:
+                            text = self.recognizer.text
+                            if text.strip():
+                                segment = make_segment(segment_index, utterance_start, chunk_end,
+                                                       wave_file_sample_rate, text)
+                                progress.segments += 1
+                                progress.last_text = segment['text']
+                                yield segment
+                                segment_index += 1
+                            self.recognizer.reset()
+                            utterance_start = chunk_end
                         
-                        print(progress_info, end='', flush=True)
-                        last_progress_time = time.time()
+                        # realtime模式下等待墙钟追上已送入的音频时长；max模式不等待
+                        if pacing == 'realtime':
+                            chunk_end_time = (chunk_end - start_sample) / wave_file_sample_rate
+                            delay = pacing_start + chunk_end_time - time.perf_counter()
+                            if delay > 0:
+                                time.sleep(delay)
                     
-                    # 减少延迟，提高处理速度
-                    time.sleep(chunk_size * 0.005)  # 减少延迟
-                
-                # 添加尾部静音以完成识别
-                try:
-                    tail_paddings = np.zeros(int(wave_file_sample_rate * 0.5), dtype=np.float32)
-                    self.recognizer.accept_waveform(wave_file_sample_rate, tail_paddings)
-                    self.recognizer.input_finished()
-                except Exception as tail_error:
-                    print(f"添加尾部静音时出错: {tail_error}")
+                    # 添加尾部静音以完成识别
+                    try:
+                        tail_paddings = np.zeros(int(wave_file_sample_rate * 0.5), dtype=np.float32)
+                        self.recognizer.accept_waveform(wave_file_sample_rate, tail_paddings)
+                        self.recognizer.input_finished()
+                    except Exception as tail_error:
+                        print(f"添加尾部静音时出错: {tail_error}")
+                    
+                    # 获取最终识别结果
+                    try:
+                        final_text = self.recognizer.text
+                    except Exception as text_error:
+                        print(f"获取识别结果时出错: {text_error}")
+                        final_text = ""
+                    
+                    # 管道流读完后才知道实际长度
+                    num_samples = reader.num_frames
+                    progress.samples_processed = num_samples
+                    finished = True
+                finally:
+                    # 停止报告线程并显示最终进度
+                    reporter.stop(finished)
                 
-                # 获取最终识别结果
-                try:
-                    final_text = self.recognizer.text
-                except Exception as text_error:
-                    print(f"获取识别结果时出错: {text_error}")
-                    final_text = ""
+                if queue_blocks > 0:
+                    print(reader.format_stats())
                 
-                # 显示最终进度
-                if show_progress:
-                    progress_bar = self._create_progress_bar_ascii(100, 50)
-                    total_time = duration / 60  # 音频时长转换为分钟
-                    actual_time = (time.time() - last_progress_time + duration/60)
-                    print(f"\r进度: {progress_bar} 100.0% | 总时长: {actual_time:.1f}分钟 | 识别完成！{' ' * 20}")
+                if self.recovered_chunks or self.skipped_chunks:
+                    print(f"片段错误恢复: 已恢复 {self.recovered_chunks} 个，跳过 {self.skipped_chunks} 个")
                 
                 # 重置识别器以便下次使用
                 try:
@@ -220,7 +309,9 @@ class SherpaNcnnRecognizer:
                     # 尝试重新初始化
                     self._setup_recognizer()
                 
-                return final_text
+                if final_text.strip():
+                    yield make_segment(segment_index, utterance_start, num_samples,
+                                       wave_file_sample_rate, final_text)
                 
         except Exception as e:
             print(f"音频识别失败: {e}")
@@ -230,48 +321,20 @@ class SherpaNcnnRecognizer:
             except:
                 pass
             raise
-    
-    def _create_progress_bar(self, progress: float, width: int = 50) -> str:
-        """
-        创建进度条
-        
-        Args:
-            progress: 进度百分比 (0-100)
-            width: 进度条宽度
-            
-        Returns:
-            进度条字符串
-        """
-        filled = int(width * progress / 100)
-        bar = '█' * filled + '░' * (width - filled)
-        return f"[{bar}]"
-    
-    def _create_progress_bar_ascii(self, progress: float, width: int = 50) -> str:
-        """
-        创建ASCII进度条（避免编码问题）
-        
-        Args:
-            progress: 进度百分比 (0-100)
-            width: 进度条宽度
-            
-        Returns:
-            进度条字符串
-        """
-        filled = int(width * progress / 100)
-        bar = '=' * filled + ' ' * (width - filled)
-        return f"[{bar}]"
 
 
 class VideoToTextSherpaNcnn:
     """基于sherpa-ncnn的视频转文本工具"""
     
-    def __init__(self, config_file: str = "config.json", model_id: str = None):
+    def __init__(self, config_file: str = "config.json", model_id: str = None,
+                 num_threads: int = None):
         """
         初始化视频转文本工具
         
         Args:
             config_file: 配置文件路径
             model_id: 模型ID，如果为None则使用默认模型
+            num_threads: 识别线程数，为None时使用配置（批量多进程时按进程数分配）
         """
         self.config_manager = ConfigManager(config_file)
         self.model_id = model_id or self.config_manager.get_default_model()
@@ -281,13 +344,28 @@ class VideoToTextSherpaNcnn:
         
         self.model_config = self.config_manager.get_model_config(self.model_id)
         self.recognition_config = self.config_manager.get_recognition_config()
+        if num_threads:
+            # 只影响本实例，不写回配置
+            self.recognition_config = dict(self.recognition_config, num_threads=num_threads)
         self.audio_config = self.config_manager.get_audio_config()
         self.output_config = self.config_manager.get_output_config()
         
+        self.performance_config = self.config_manager.get_performance_config()
+        
+        # 中间音频的临时位置
+        self.scratch = ScratchSpace.from_config(self.audio_config)
+        # 提取音频缓存（默认关闭），命令行、批量处理和audio_extractor共享同一目录
+        self.audio_cache = AudioCache.from_config(self.audio_config,
+                                                  self.config_manager.config_file.resolve().parent,
+                                                  self.scratch)
+        
         print(f"使用模型: {self.model_config.get('name', self.model_id)}")
         
+        # 配置识别器池内存上限
+        get_recognizer_pool(self.performance_config.get('recognizer_pool_max_mb', 1024))
+        
         # 初始化识别器
-        self.recognizer = SherpaNcnnRecognizer(self.model_config, self.recognition_config)
+        self.recognizer = SherpaNcnnRecognizer(self.model_config, self.recognition_config, self.model_id)
     
     def get_available_models(self) -> list:
         """获取可用模型列表"""
@@ -300,9 +378,11 @@ class VideoToTextSherpaNcnn:
             return False
         
         try:
+            # 归还当前识别器，切换回来时可直接复用
+            self.recognizer.release()
             self.model_id = model_id
             self.model_config = self.config_manager.get_model_config(model_id)
-            self.recognizer = SherpaNcnnRecognizer(self.model_config, self.recognition_config)
+            self.recognizer = SherpaNcnnRecognizer(self.model_config, self.recognition_config, model_id)
             print(f"已切换到模型: {self.model_config.get('name', model_id)}")
             return True
         except Exception as e:
@@ -313,6 +393,11 @@ class VideoToTextSherpaNcnn:
         """
         从视频中提取音频
         
+        未指定输出路径时写入临时目录中唯一命名的文件（小文件放在内存文件系统中），不写到源文件旁边；
+        启用缓存时，放不进内存文件系统的提取结果保存在音频缓存中（默认位于临时目录下），
+        同一文件再次处理时直接复用，缓存条目计入临时空间配额。
+        写入前按预估大小预留临时空间（scratch_quota_mb），空间不足时排队等待。
+        
         Args:
             video_path: 视频文件路径
             output_path: 输出音频文件路径
@@ -325,45 +410,92 @@ class VideoToTextSherpaNcnn:
             print(f"视频文件不存在: {video_path}")
             return None
         
-        if output_path is None:
-            output_path = video_path.with_suffix('.wav')
+        if output_path is not None:
+            return self._extract_audio_file(video_path, output_path)
+        
+        # 按探测到的时长预估中间文件大小，临时空间不足时排队等待，而不是写到一半失败
+        wav_bytes, part_bytes = self._expected_audio_bytes(video_path)
+        try:
+            # 能放进内存文件系统的小文件重新提取很快，不占用缓存
+            if self.audio_cache is not None and not self.scratch.fits_in_ram(wav_bytes):
+                return self.audio_cache.get_or_create(
+                    video_path, *self._extract_params(),
+                    lambda cache_path: self._extract_audio_file(video_path, cache_path),
+                    wav_bytes + part_bytes
+                )
+            
+            # 文件删除后预留自动释放；分段提取的中间段只在提取期间额外预留
+            output_path = self.scratch.new_path(video_path.stem, '.wav', wav_bytes)
+            with self.scratch.reserve(part_bytes, output_path.parent):
+                result = self._extract_audio_file(video_path, output_path)
+            if not result and output_path.exists():
+                output_path.unlink()
+            return result
+        except (ScratchQuotaError, TimeoutError) as e:
+            print(f"临时空间不足: {e}")
+            return None
+    
+    def _expected_audio_bytes(self, video_path: Path) -> tuple:
+        """
+        按容器时长预估提取的WAV大小
         
+        Returns:
+            (WAV字节数, 分段提取时中间段额外占用的字节数)，时长未知时为(0, 0)
+        """
+        sample_rate, channels, codec = self._extract_params()
+        duration = probe_media(video_path)["duration"]
+        if not duration:
+            return 0, 0
+        wav_bytes = int(duration * sample_rate * channels * 2)
+        num_ranges = 1
+        if codec == 'pcm_s16le':
+            num_ranges = plan_extract_ranges(duration, int(self.audio_config.get('extract_ranges', 4)),
+                                             float(self.audio_config.get('extract_range_min_seconds', 600)))
+        return wav_bytes, wav_bytes if num_ranges > 1 else 0
+    
+    def _extract_params(self) -> tuple:
+        """配置中的提取参数（采样率, 声道数, 编码）"""
+        return (self.audio_config.get('sample_rate', 16000),
+                self.audio_config.get('channels', 1),
+                self.audio_config.get('codec', 'pcm_s16le'))
+    
+    def _extract_audio_file(self, video_path: Path, output_path: Path) -> Optional[str]:
+        """提取音频到指定路径"""
         print(f"正在提取音频: {video_path} -> {output_path}")
         
         # 确保输出目录存在
         output_path = Path(output_path)
         output_path.parent.mkdir(parents=True, exist_ok=True)
         
-        video = None
         try:
             # 验证视频文件
             video_size = video_path.stat().st_size
             print(f"视频文件大小: {video_size / (1024*1024):.2f} MB")
             
-            # 加载视频文件
-            video = VideoFileClip(str(video_path))
+            # 只读取容器头，不打开视频读取器
+            media_info = probe_media(video_path)
             
-            if video.duration == 0:
+            if not media_info["duration"]:
                 print("视频时长为0")
                 return None
             
-            print(f"视频时长: {video.duration:.2f} 秒")
-            
-            audio = video.audio
+            print(f"视频时长: {media_info['duration']:.2f} 秒")
             
-            if audio is None:
+            if not media_info["audio_streams"]:
                 print("视频中没有音频轨道")
                 return None
             
             # 使用配置中的音频参数
-            sample_rate = self.audio_config.get('sample_rate', 16000)
-            codec = self.audio_config.get('codec', 'pcm_s16le')
+            sample_rate, channels, codec = self._extract_params()
             
-            print(f"音频参数: 采样率={sample_rate}Hz, 编码={codec}")
+            print(f"音频参数: 采样率={sample_rate}Hz, 声道={channels}, 编码={codec}")
             
-            # 提取音频
-            audio.write_audiofile(str(output_path), codec=codec, fps=sample_rate, 
-                                 logger=None)  # 禁用logger避免输出冲突
+            # 只解码音频流；长视频按时间范围分段并行解码
+            extract_audio_stream(video_path, output_path, sample_rate, channels, codec,
+                                 int(self.audio_config.get('extract_ranges', 4)),
+                                 float(self.audio_config.get('extract_range_min_seconds', 600)),
+                                 media_info["duration"],
+                                 bool(self.audio_config.get('extract_range_verify', False)))
             
             # 验证提取的音频文件
             if not output_path.exists():
@@ -391,17 +523,31 @@ class VideoToTextSherpaNcnn:
             import traceback
             print(f"错误详情: {traceback.format_exc()}")
             return None
-        finally:
-            # 确保视频文件被正确关闭
-            if video is not None:
-                try:
-                    video.close()
-                except Exception as close_error:
-                    print(f"关闭视频文件时出错: {close_error}")
+    
+    def _reusable_audio(self, checkpoint: TranscriptionCheckpoint) -> Optional[str]:
+        """断点中记录的已提取音频仍然完整可读时返回其路径"""
+        if not checkpoint.has_progress or not checkpoint.audio_path:
+            return None
+        
+        try:
+            with WavPcmReader(checkpoint.audio_path) as reader:
+                # 断点按模型采样率记录，按时长比较
+                if reader.duration * (checkpoint.sample_rate or 0) >= checkpoint.committed_sample:
+                    return checkpoint.audio_path
+        except (OSError, ValueError):
+            pass
+        return None
+    
+    def _report_partial(self, sink: Optional[TranscriptSink]):
+        """提示中断前已写出的部分结果"""
+        if sink is not None and sink.count and sink.part_path.exists():
+            print(f"已保存 {sink.count} 句部分结果: {sink.part_path}")
     
     def process_video(self, video_path: str, output_path: str = None, 
                      chunk_size: float = None, show_progress: bool = True,
-                     progress_interval: float = 5.0) -> bool:
+                     progress_interval: float = 5.0, pacing: str = None,
+                     parallel_workers: int = None, output_format: str = None,
+                     resume: bool = True, progress_callbacks: List[Callable] = None) -> bool:
         """
         处理视频文件
         
@@ -411,6 +557,11 @@ class VideoToTextSherpaNcnn:
             chunk_size: 流式处理块大小（秒）
             show_progress: 是否显示进度条
             progress_interval: 进度更新间隔（秒）
+            pacing: 解码节奏（max/realtime），为None时使用配置
+            parallel_workers: 单文件并行解码进程数，为None时使用配置
+            output_format: 输出格式（txt/srt/vtt/jsonl），为None时使用配置
+            resume: 存在匹配的断点时是否从断点继续
+            progress_callbacks: 进度订阅者列表，每个接收一个进度事件字典
             
         Returns:
             处理是否成功
@@ -420,13 +571,23 @@ class VideoToTextSherpaNcnn:
             print(f"视频文件不存在: {video_path}")
             return False
         
+        if output_format is None:
+            output_format = self.output_config.get('format', 'txt')
+        writer = get_writer(output_format)
+        
         if output_path is None:
-            output_path = video_path.with_suffix('.txt')
+            output_path = video_path.with_suffix(writer.extension)
         
         # 使用配置中的块大小
         if chunk_size is None:
             chunk_size = self.recognition_config.get('chunk_size', 0.1)
         
+        if pacing is None:
+            pacing = self.recognition_config.get('pacing', 'max')
+        
+        if parallel_workers is None:
+            parallel_workers = int(self.recognition_config.get('parallel_workers', 0))
+        
         print(f"开始处理视频: {video_path}")
         print(f"使用模型: {self.model_config.get('name', self.model_id)}")
         print(f"语言: {self.model_config.get('language', 'unknown')}")
@@ -438,44 +599,110 @@ class VideoToTextSherpaNcnn:
         output_path.parent.mkdir(parents=True, exist_ok=True)
         
         audio_path = None
+        extracted_audio = None
+        sink = None
         start_time = time.time()
         
+        # 使用配置中的输出设置
+        encoding = self.output_config.get('encoding', 'utf-8')
+        save_timestamps = self.output_config.get('save_timestamps', False)
+        flush_interval = self.output_config.get('flush_interval', 5.0)
+        
+        # 载入断点：源文件、模型和输出格式都一致时才有效
+        checkpoint = TranscriptionCheckpoint(output_path, video_path, self.model_id,
+                                             output_format, save_timestamps)
+        if resume and checkpoint.load() and checkpoint.has_progress:
+            print(f"发现断点: 已完成 {checkpoint.segment_count} 句，"
+                  f"位置 {checkpoint.committed_sample / (checkpoint.sample_rate or 1):.1f}秒")
+        else:
+            checkpoint.reset()
+        
+        # 并行识别需要随机访问完整的WAV，其他情况由ffmpeg管道直接解码，不写临时文件
+        streaming = (self.audio_config.get('streaming', True)
+                     and not (parallel_workers > 1 and pacing == 'max'))
+        
+        # 可直接读取的PCM输入不提取、不缓存；其他音频和视频只解码音频流
+        input_type = detect_input_type(video_path)
+        
         try:
-            # 提取音频
-            print("正在提取音频...")
-            audio_path = self.extract_audio(video_path)
-            if not audio_path:
-                print("音频提取失败")
-                return False
+            # 断点中的音频或缓存中的音频可用时直接复用（缓存命中时也不再流式解码）
+            if input_type == INPUT_PCM:
+                print(f"输入为PCM音频，直接读取: {video_path}")
+            elif self._reusable_audio(checkpoint):
+                extracted_audio = checkpoint.audio_path
+                print(f"复用已提取的音频: {extracted_audio}")
+            elif self.audio_cache is not None:
+                extracted_audio = self.audio_cache.lookup(video_path, *self._extract_params())
+                if extracted_audio:
+                    print(f"音频缓存命中: {extracted_audio}")
+                elif streaming and not self.scratch.fits_in_ram(self._expected_audio_bytes(video_path)[0]):
+                    # 启用缓存时放不进内存文件系统的文件先提取到缓存，再次处理时直接复用
+                    streaming = False
             
-            # 验证音频文件
-            if not Path(audio_path).exists():
-                print("音频文件不存在")
-                return False
+            if not extracted_audio and not streaming and input_type != INPUT_PCM:
+                print("正在提取音频...")
+                extracted_audio = self.extract_audio(video_path)
+                if not extracted_audio:
+                    print("音频提取失败")
+                    return False
+            
+            # 数据源统一输出模型采样率，断点按模型采样率记录
+            audio_sample_rate = self.recognizer.recognizer.sample_rate
+            if extracted_audio:
+                audio_path = extracted_audio
+                audio_size = Path(audio_path).stat().st_size
+                print(f"音频文件大小: {audio_size / (1024*1024):.2f} MB")
+            else:
+                # PCM直接读取，其他格式流式解码到模型采样率
+                audio_path = str(video_path)
+                if input_type != INPUT_PCM:
+                    print(f"流式解码音频: {audio_path} ({audio_sample_rate}Hz)")
             
-            audio_size = Path(audio_path).stat().st_size
-            print(f"音频文件大小: {audio_size / (1024*1024):.2f} MB")
+            # 断点的采样偏移只对相同采样率的音频有效
+            if checkpoint.has_progress and checkpoint.sample_rate != audio_sample_rate:
+                print("音频采样率与断点不一致，从头开始识别")
+                checkpoint.reset()
+            checkpoint.audio_path = str(extracted_audio) if extracted_audio else None
+            checkpoint.sample_rate = audio_sample_rate
             
             # 语音识别
             print("开始语音识别...")
-            text = self.recognizer.recognize_file(
-                audio_path, chunk_size, show_progress, progress_interval
-            )
+            
+            # 语句识别完成即写入临时文件，结束后原子重命名为输出文件
+            print(f"识别结果将实时写入: {output_path}")
+            sink = TranscriptSink(output_path, output_format, encoding, save_timestamps, flush_interval)
+            if checkpoint.has_progress:
+                try:
+                    sink.resume(checkpoint.part_size, checkpoint.segment_count,
+                                checkpoint.text_length, checkpoint.preview)
+                except ValueError as resume_error:
+                    print(f"无法从断点继续，从头开始识别: {resume_error}")
+                    checkpoint.reset()
+            
+            with sink:
+                last_end_sample = None
+                try:
+                    for segment in self.recognizer.iter_segments(
+                        audio_path, chunk_size, show_progress, progress_interval, pacing,
+                        parallel_workers, checkpoint.committed_sample, checkpoint.segment_count,
+                        progress_callbacks
+                    ):
+                        # 每次刷新到磁盘后同步更新断点
+                        if sink.add(segment):
+                            checkpoint.commit(int(round(segment['end'] * audio_sample_rate)), sink)
+                        last_end_sample = int(round(segment['end'] * audio_sample_rate))
+                except BaseException:
+                    # 出错前已定稿的语句全部落盘并记入断点，下次从最后一个端点继续
+                    if last_end_sample is not None and sink.count > checkpoint.segment_count:
+                        sink.flush()
+                        checkpoint.commit(last_end_sample, sink)
+                    raise
+            
+            # 完成后断点不再需要
+            checkpoint.remove()
             
             # 验证识别结果
-            if text and text.strip():
-                # 清理文本
-                text = text.strip()
-                text = ' '.join(text.split())  # 规范化空格
-                
-                # 使用配置中的输出设置
-                encoding = self.output_config.get('encoding', 'utf-8')
-                
-                # 保存结果
-                print(f"正在保存结果到: {output_path}")
-                with open(output_path, 'w', encoding=encoding) as f:
-                    f.write(text)
-                
+            if sink.count:
                 # 计算处理时间
                 total_time = time.time() - start_time
                 
@@ -483,14 +710,17 @@ class VideoToTextSherpaNcnn:
                 print(f"转换完成！")
                 print(f"{'='*50}")
                 print(f"输出文件: {output_path}")
-                print(f"识别文本长度: {len(text)} 字符")
+                print(f"识别文本长度: {sink.text_length} 字符，共 {sink.count} 句")
                 print(f"总处理时间: {total_time:.1f} 秒")
-                print(f"处理速度: {len(text)/total_time:.1f} 字符/秒")
+                print(f"处理速度: {sink.text_length/total_time:.1f} 字符/秒")
+                if self.recognizer.recovered_chunks or self.recognizer.skipped_chunks:
+                    print(f"出错片段: 已恢复 {self.recognizer.recovered_chunks} 个，"
+                          f"跳过 {self.recognizer.skipped_chunks} 个")
                 
-                if len(text) > 200:
-                    print(f"识别结果预览: {text[:200]}...")
+                if sink.text_length > len(sink.preview):
+                    print(f"识别结果预览: {sink.preview}...")
                 else:
-                    print(f"识别结果: {text}")
+                    print(f"识别结果: {sink.preview}")
                 
                 return True
             else:
@@ -499,19 +729,24 @@ class VideoToTextSherpaNcnn:
                 
         except KeyboardInterrupt:
             print("\n用户中断处理")
+            self._report_partial(sink)
             return False
         except Exception as e:
             print(f"处理过程中发生错误: {e}")
             # 打印详细错误信息
             import traceback
             print(f"错误详情: {traceback.format_exc()}")
+            self._report_partial(sink)
             return False
         finally:
-            # 清理临时音频文件
-            if audio_path and Path(audio_path).exists():
+            # 清理临时音频文件（存在断点时保留，供重试时复用）
+            if checkpoint.path.exists():
+                print(f"已保存断点，重新运行可从断点继续: {checkpoint.path}")
+            elif (extracted_audio and Path(extracted_audio).exists()
+                  and not (self.audio_cache is not None and self.audio_cache.owns(extracted_audio))):
                 try:
-                    Path(audio_path).unlink()
-                    print(f"已清理临时音频文件: {audio_path}")
+                    Path(extracted_audio).unlink()
+                    print(f"已清理临时音频文件: {extracted_audio}")
                 except Exception as cleanup_error:
                     print(f"清理临时文件失败: {cleanup_error}")
 
@@ -523,16 +758,36 @@ def main():
     parser.add_argument('-c', '--config', default='config.json', help='配置文件路径')
     parser.add_argument('-m', '--model', help='模型ID')
     parser.add_argument('--chunk_size', type=float, help='流式处理块大小（秒）')
+    parser.add_argument('--pacing', choices=PACING_MODES,
+                       help='解码节奏：max全速解码，realtime按实时速度送入（默认使用配置）')
+    parser.add_argument('--parallel-workers', type=int,
+                       help='单文件并行解码进程数，在静音处切分（默认使用配置，0为串行）')
+    parser.add_argument('--format', choices=OUTPUT_FORMATS,
+                       help='输出格式：txt/srt/vtt/jsonl（默认使用配置）')
     parser.add_argument('--progress-interval', type=float, default=5.0, 
                        help='进度更新间隔（秒），默认5秒')
     parser.add_argument('--no-progress', action='store_true', 
                        help='禁用进度条显示')
+    parser.add_argument('--progress-json', metavar='FILE',
+                       help='以JSON Lines格式输出进度事件到文件（- 表示标准错误）')
     parser.add_argument('--recovery-mode', action='store_true',
                        help='启用恢复模式（处理失败时自动尝试恢复）')
     parser.add_argument('--max-retries', type=int, default=3,
                        help='最大重试次数，默认3次')
+    parser.add_argument('--no-resume', action='store_true',
+                       help='忽略已有断点，从头开始识别')
     parser.add_argument('--list-models', action='store_true', help='列出可用模型')
     parser.add_argument('--status', action='store_true', help='显示配置状态')
+    parser.add_argument('--tune', metavar='REFERENCE',
+                       help='在参考音频/视频上调优chunk_size和num_threads，并写回配置')
+    parser.add_argument('--tune-chunk-sizes', type=float, nargs='+',
+                       help='调优时测试的块大小（秒）')
+    parser.add_argument('--tune-threads', type=int, nargs='+',
+                       help='调优时测试的线程数')
+    parser.add_argument('--tune-repeats', type=int, default=1,
+                       help='每个组合的重复次数，取最短耗时，默认1次')
+    parser.add_argument('--tune-report', default='tune_report.json',
+                       help='调优结果表保存路径，默认tune_report.json')
     
     args = parser.parse_args()
     
@@ -554,6 +809,12 @@ def main():
                 print(f"  {model['id']}: {model['name']} ({model['language']}) - {status_text}")
             return
         
+        # 参数调优
+        if args.tune:
+            report = tune_parameters(converter, args.tune, args.tune_chunk_sizes, args.tune_threads,
+                                     args.tune_repeats, args.tune_report)
+            sys.exit(0 if report else 1)
+        
         # 处理视频
         if not args.video_path:
             parser.print_help()
@@ -561,6 +822,14 @@ def main():
         
         show_progress = not args.no_progress
         
+        # JSON Lines进度输出，供其他程序解析
+        progress_callbacks = []
+        progress_stream = None
+        if args.progress_json:
+            if args.progress_json != '-':
+                progress_stream = open(args.progress_json, 'a', encoding='utf-8')
+            progress_callbacks.append(JsonLinesProgressEmitter(progress_stream))
+        
         if args.recovery_mode:
             print(f"启用恢复模式，最大重试次数: {args.max_retries}")
             
@@ -577,7 +846,13 @@ def main():
                         args.output, 
                         args.chunk_size,
                         show_progress,
-                        args.progress_interval
+                        args.progress_interval,
+                        args.pacing,
+                        args.parallel_workers,
+                        args.format,
+                        # 重试总是从上一次尝试留下的断点继续
+                        not args.no_resume or attempt > 0,
+                        progress_callbacks
                     )
                     
                     if success:
@@ -595,9 +870,10 @@ def main():
                     print(f"等待 {wait_time} 秒后重试...")
                     time.sleep(wait_time)
                     
-                    # 重新初始化转换器
+                    # 重新初始化转换器（模型从识别器池复用，不重新加载）
                     try:
                         print("重新初始化转换器...")
+                        converter.recognizer.release()
                         converter = VideoToTextSherpaNcnn(args.config, args.model)
                     except Exception as init_error:
                         print(f"重新初始化失败: {init_error}")
@@ -609,9 +885,17 @@ def main():
                 args.output, 
                 args.chunk_size,
                 show_progress,
-                args.progress_interval
+                args.progress_interval,
+                args.pacing,
+                args.parallel_workers,
+                args.format,
+                not args.no_resume,
+                progress_callbacks
             )
         
+        if progress_stream is not None:
+            progress_stream.close()
+        
         if not success:
             print("\n处理失败！")
             if args.recovery_mode:
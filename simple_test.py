@@ -10,8 +10,8 @@ import numpy as np
 import sherpa_ncnn
 from pathlib import Path
 
-def recognize_audio_simple(audio_path: str) -> str:
-    """简单的音频识别函数"""
+def recognize_audio_simple(audio_path: str, pacing: str = 'max') -> str:
+    """简单的音频识别函数（pacing为realtime时按实时速度送入音频）"""
     try:
         # 初始化识别器
         recognizer = sherpa_ncnn.Recognizer(
@@ -48,6 +48,7 @@ def recognize_audio_simple(audio_path: str) -> str:
             chunk_size = 0.1  # 100ms chunks
             chunk_samples = int(chunk_size * wave_file_sample_rate)
             start = 0
+            pacing_start = time.perf_counter()
             
             while start < samples_float32.shape[0]:
                 end = start + chunk_samples
@@ -63,8 +64,11 @@ def recognize_audio_simple(audio_path: str) -> str:
                 
                 start = end
                 
-                # 减少延迟以便更快完成
-                time.sleep(chunk_size * 0.01)
+                # realtime模式下等待墙钟追上已送入的音频时长
+                if pacing == 'realtime':
+                    delay = pacing_start + end / wave_file_sample_rate - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
             
             # 添加尾部静音以完成识别
             tail_paddings = np.zeros(int(wave_file_sample_rate * 0.5), dtype=np.float32)
@@ -82,17 +86,22 @@ def recognize_audio_simple(audio_path: str) -> str:
 
 def main():
     if len(sys.argv) < 2:
-        print("使用方法: python simple_test.py <音频文件路径>")
+        print("使用方法: python simple_test.py <音频文件路径> [max|realtime]")
         sys.exit(1)
     
     audio_path = sys.argv[1]
+    pacing = sys.argv[2] if len(sys.argv) > 2 else 'max'
+    
+    if pacing not in ('max', 'realtime'):
+        print(f"不支持的解码节奏: {pacing}，可选: max, realtime")
+        sys.exit(1)
     
     if not Path(audio_path).exists():
         print(f"音频文件不存在: {audio_path}")
         sys.exit(1)
     
     # 识别音频
-    text = recognize_audio_simple(audio_path)
+    text = recognize_audio_simple(audio_path, pacing)
     
     if text:
         # 保存结果
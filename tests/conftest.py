@@ -0,0 +1,8 @@
+"""
+测试公共设置：把项目根目录加入Python路径（项目模块位于根目录）
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
@@ -0,0 +1,88 @@
+"""
+音频数据源测试
+"""
+
+import wave
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from audio_source import WavPcmReader, INT16_SCALE
+
+
+def write_wav(path: Path, samples: np.ndarray, sample_rate: int = 16000):
+    """写入16位WAV，samples为(帧数, 声道数)的int16数组"""
+    with wave.open(str(path), 'wb') as wf:
+        wf.setnchannels(samples.shape[1])
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(samples.astype('<i2').tobytes())
+
+
+def chunk_allocation(reader: WavPcmReader, chunk_frames: int) -> int:
+    """顺序读取时每块新分配内存的最大值（字节），不计第一块"""
+    worst = 0
+    baseline = None
+    tracemalloc.start()
+    try:
+        for _ in reader.iter_chunks(chunk_frames):
+            current, peak = tracemalloc.get_traced_memory()
+            if baseline is not None:
+                worst = max(worst, peak - baseline)
+            tracemalloc.reset_peak()
+            baseline = current
+    finally:
+        tracemalloc.stop()
+    return worst
+
+
+@pytest.mark.parametrize('channels', [1, 2])
+def test_iter_chunks_allocation_does_not_grow_with_chunk_size(tmp_path, channels):
+    rng = np.random.default_rng(0)
+    path = tmp_path / "input.wav"
+    write_wav(path, rng.integers(-8000, 8000, (16000 * 60, channels), dtype=np.int16))
+
+    with WavPcmReader(path) as reader:
+        small = chunk_allocation(reader, 1600)
+        large = chunk_allocation(reader, 16000)
+
+    # 稳定状态下每块只有生成器和视图对象的少量分配，与块大小无关
+    assert large <= small + 256
+    assert large < 1600 * np.dtype(np.float32).itemsize
+
+
+def test_iter_chunks_averages_channels(tmp_path):
+    rng = np.random.default_rng(1)
+    samples = rng.integers(-8000, 8000, (5000, 3), dtype=np.int16)
+    path = tmp_path / "input.wav"
+    write_wav(path, samples)
+
+    with WavPcmReader(path) as reader:
+        chunks = np.concatenate([chunk.copy() for _, chunk in reader.iter_chunks(1600)])
+        expected = samples.astype(np.float32).sum(axis=1) * np.float32(INT16_SCALE / 3)
+        np.testing.assert_allclose(chunks, expected, rtol=1e-6, atol=1e-7)
+        np.testing.assert_allclose(reader.get_range(100, 200), expected[100:200], rtol=1e-6, atol=1e-7)
+
+
+def test_silence_boundaries_keep_minimum_segment_length(tmp_path):
+    pytest.importorskip('sherpa_ncnn')
+    from parallel_recognition import MIN_SEGMENT_SECONDS, plan_segments
+
+    sample_rate = 16000
+    rng = np.random.default_rng(2)
+    samples = rng.integers(-8000, 8000, sample_rate * 240, dtype=np.int16)
+    # 静音集中在第一个等分点（60秒）和第二个等分点（120秒）的搜索范围交界附近
+    for second in (88.0, 92.0):
+        samples[int(second * sample_rate):int((second + 1) * sample_rate)] = 0
+    path = tmp_path / "input.wav"
+    write_wav(path, samples[:, None], sample_rate)
+
+    boundaries, _ = plan_segments(str(path), 4)
+
+    lengths = np.diff(boundaries) / sample_rate
+    assert len(boundaries) >= 3
+    assert lengths.min() >= MIN_SEGMENT_SECONDS - 0.1
+    # 第一个切分点仍落在静音中
+    assert 88.0 <= boundaries[1] / sample_rate <= 89.0
@@ -0,0 +1,94 @@
+"""
+批量调度测试：最长优先调度在混合WAV和视频输入、多个进程时不会卡住
+"""
+
+import sys
+import wave
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+pytest.importorskip('sherpa_ncnn')
+
+from audio_source import get_ffmpeg_exe, probe_media
+from batch_scheduler import DurationCache, DurationFeed
+from batch_sherpa_ncnn import _worker_mp_context
+from config_manager import ConfigManager
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+
+def write_wav(path: Path, seconds: float, sample_rate: int = 16000):
+    """生成带静音间隔的16位单声道WAV（每10秒中有1秒静音）"""
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    samples = 0.3 * np.sin(2 * np.pi * 440 * t)
+    samples[(t % 10) >= 9] = 0
+    with wave.open(str(path), 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes((samples * 32767).astype('<i2').tobytes())
+
+
+def write_encoded(path: Path, seconds: float, video: bool):
+    """用ffmpeg生成MP4（含视频流）或M4A"""
+    cmd = [get_ffmpeg_exe(), '-hide_banner', '-loglevel', 'error', '-y',
+           '-f', 'lavfi', '-i', f'sine=frequency=440:duration={seconds}']
+    if video:
+        cmd += ['-f', 'lavfi', '-i', f'color=size=64x64:duration={seconds}',
+                '-c:v', 'mpeg4', '-shortest']
+    subprocess.run(cmd + ['-c:a', 'aac', str(path)], check=True)
+
+
+@pytest.fixture
+def mixed_inputs(tmp_path):
+    """短WAV、会被切分的200秒WAV、MP4和M4A"""
+    try:
+        get_ffmpeg_exe()
+    except RuntimeError:
+        pytest.skip("未找到ffmpeg")
+    input_dir = tmp_path / "input"
+    input_dir.mkdir()
+    write_wav(input_dir / "short.wav", 5)
+    write_wav(input_dir / "long.wav", 200)
+    write_encoded(input_dir / "video.mp4", 5, video=True)
+    write_encoded(input_dir / "audio.m4a", 5, video=False)
+    return input_dir
+
+
+def test_worker_processes_are_not_forked():
+    # 主进程中有探测线程，fork出的工作进程可能继承被占用的锁
+    assert _worker_mp_context().get_start_method() != 'fork'
+
+
+def test_workers_probe_while_feed_is_probing(mixed_inputs, tmp_path):
+    files = sorted(mixed_inputs.iterdir()) * 8
+    feed = DurationFeed(files, DurationCache(tmp_path), lookahead=len(files)).start()
+    try:
+        with ProcessPoolExecutor(max_workers=3, mp_context=_worker_mp_context()) as executor:
+            futures = [executor.submit(probe_media, str(mixed_inputs / name))
+                       for name in ("video.mp4", "audio.m4a")]
+            results = [future.result(timeout=60) for future in futures]
+    finally:
+        feed.close()
+    assert all(result["duration"] for result in results)
+
+
+def test_scheduled_batch_with_mixed_inputs(mixed_inputs, tmp_path):
+    config_manager = ConfigManager(str(PROJECT_ROOT / "config.json"))
+    model = config_manager.get_model_config(config_manager.get_recognition_config()['default_model'])
+    if not all((PROJECT_ROOT / path).exists() for path in model['files'].values()):
+        pytest.skip("模型文件不存在")
+
+    output_dir = tmp_path / "output"
+    result = subprocess.run(
+        [sys.executable, str(PROJECT_ROOT / "batch_sherpa_ncnn.py"), str(mixed_inputs),
+         '-o', str(output_dir), '-j', '3', '--schedule', 'longest'],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, timeout=900,
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
+    for name in ("short", "long", "video", "audio"):
+        assert (output_dir / f"{name}.txt").exists()
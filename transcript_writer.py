@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+识别结果输出模块
+将按端点切分的语句写出为TXT、SRT、VTT或JSONL格式，支持边识别边写出
+"""
+
+import os
+import json
+import time
+from pathlib import Path
+from typing import Dict, Any, Iterable, List
+
+
+def format_timestamp(seconds: float, decimal_marker: str = '.') -> str:
+    """
+    格式化时间戳为 HH:MM:SS.mmm
+
+    Args:
+        seconds: 秒数
+        decimal_marker: 毫秒分隔符（SRT为逗号，VTT为点）
+
+    Returns:
+        时间戳字符串
+    """
+    millis = int(round(max(seconds, 0.0) * 1000))
+    hours, millis = divmod(millis, 3600000)
+    minutes, millis = divmod(millis, 60000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{decimal_marker}{millis:03d}"
+
+
+def make_segment(index: int, start_sample: int, end_sample: int, sample_rate: int,
+                 text: str) -> Dict[str, Any]:
+    """
+    构造语句字典
+
+    Args:
+        index: 语句序号（从0开始）
+        start_sample: 起始采样偏移
+        end_sample: 结束采样偏移
+        sample_rate: 采样率
+        text: 识别文本
+
+    Returns:
+        语句字典
+    """
+    return {
+        "index": index,
+        "start_sample": start_sample,
+        "end_sample": end_sample,
+        "start": start_sample / sample_rate,
+        "end": end_sample / sample_rate,
+        "text": ' '.join(text.split()),
+    }
+
+
+class TranscriptWriter:
+    """输出格式基类：header() + 逐条format_segment()，便于流式写出"""
+
+    extension = '.txt'
+
+    def __init__(self, save_timestamps: bool = False):
+        """
+        Args:
+            save_timestamps: 是否保存时间戳（仅对TXT格式有影响）
+        """
+        self.save_timestamps = save_timestamps
+
+    def header(self) -> str:
+        """文件头"""
+        return ''
+
+    def format_segment(self, segment: Dict[str, Any], position: int) -> str:
+        """
+        格式化一条语句
+
+        Args:
+            segment: 语句字典
+            position: 该语句在输出文件中的序号（从0开始）
+
+        Returns:
+            要写出的文本
+        """
+        raise NotImplementedError
+
+    def footer(self) -> str:
+        """文件尾"""
+        return ''
+
+
+class TxtWriter(TranscriptWriter):
+    """纯文本：默认整段以空格连接，保存时间戳时每句一行"""
+
+    extension = '.txt'
+
+    def format_segment(self, segment: Dict[str, Any], position: int) -> str:
+        if self.save_timestamps:
+            return (f"[{format_timestamp(segment['start'])} --> "
+                    f"{format_timestamp(segment['end'])}] {segment['text']}\n")
+        return segment['text'] if position == 0 else ' ' + segment['text']
+
+
+class SrtWriter(TranscriptWriter):
+    """SRT字幕"""
+
+    extension = '.srt'
+
+    def format_segment(self, segment: Dict[str, Any], position: int) -> str:
+        return (f"{position + 1}\n"
+                f"{format_timestamp(segment['start'], ',')} --> {format_timestamp(segment['end'], ',')}\n"
+                f"{segment['text']}\n\n")
+
+
+class VttWriter(TranscriptWriter):
+    """WebVTT字幕"""
+
+    extension = '.vtt'
+
+    def header(self) -> str:
+        return "WEBVTT\n\n"
+
+    def format_segment(self, segment: Dict[str, Any], position: int) -> str:
+        return (f"{format_timestamp(segment['start'])} --> {format_timestamp(segment['end'])}\n"
+                f"{segment['text']}\n\n")
+
+
+class JsonlWriter(TranscriptWriter):
+    """JSON Lines：每行一条语句"""
+
+    extension = '.jsonl'
+
+    def format_segment(self, segment: Dict[str, Any], position: int) -> str:
+        record = {
+            "index": position,
+            "start": round(segment['start'], 3),
+            "end": round(segment['end'], 3),
+            "start_sample": segment['start_sample'],
+            "end_sample": segment['end_sample'],
+            "text": segment['text'],
+        }
+        return json.dumps(record, ensure_ascii=False) + '\n'
+
+
+WRITERS = {
+    'txt': TxtWriter,
+    'srt': SrtWriter,
+    'vtt': VttWriter,
+    'jsonl': JsonlWriter,
+}
+
+OUTPUT_FORMATS = tuple(WRITERS)
+
+
+def get_writer(output_format: str = 'txt', save_timestamps: bool = False) -> TranscriptWriter:
+    """
+    获取输出格式对应的写出器
+
+    Args:
+        output_format: 输出格式（txt/srt/vtt/jsonl）
+        save_timestamps: 是否保存时间戳
+
+    Returns:
+        TranscriptWriter实例
+    """
+    if output_format not in WRITERS:
+        raise ValueError(f"不支持的输出格式: {output_format}，可选: {', '.join(OUTPUT_FORMATS)}")
+    return WRITERS[output_format](save_timestamps)
+
+
+def write_transcript(segments: Iterable[Dict[str, Any]], output_path: str,
+                     output_format: str = 'txt', encoding: str = 'utf-8',
+                     save_timestamps: bool = False) -> int:
+    """
+    写出识别结果
+
+    Args:
+        segments: 语句字典序列
+        output_path: 输出文件路径
+        output_format: 输出格式
+        encoding: 文件编码
+        save_timestamps: 是否保存时间戳
+
+    Returns:
+        写出的语句数
+    """
+    writer = get_writer(output_format, save_timestamps)
+    count = 0
+    with open(Path(output_path), 'w', encoding=encoding) as f:
+        f.write(writer.header())
+        for segment in segments:
+            if not segment['text']:
+                continue
+            f.write(writer.format_segment(segment, count))
+            count += 1
+        f.write(writer.footer())
+    return count
+
+
+class TranscriptSink:
+    """
+    增量写出识别结果
+
+    语句产生后立即写入同目录下的临时文件（.part），按时间间隔刷新到磁盘，
+    完成后原子重命名为最终文件。内存中只保留统计信息，不持有全文；
+    中途崩溃时已刷新的语句保留在.part文件中。
+    """
+
+    def __init__(self, output_path: str, output_format: str = 'txt', encoding: str = 'utf-8',
+                 save_timestamps: bool = False, flush_interval: float = 5.0,
+                 preview_chars: int = 200):
+        """
+        Args:
+            output_path: 最终输出文件路径
+            output_format: 输出格式
+            encoding: 文件编码
+            save_timestamps: 是否保存时间戳
+            flush_interval: 刷新到磁盘的间隔（秒）
+            preview_chars: 保留用于预览的开头字符数
+        """
+        self.output_path = Path(output_path)
+        self.part_path = self.output_path.with_name(self.output_path.name + '.part')
+        self.writer = get_writer(output_format, save_timestamps)
+        self.encoding = encoding
+        self.flush_interval = flush_interval
+        self.preview_chars = preview_chars
+
+        self.count = 0
+        self.text_length = 0
+        self.preview = ''
+        self._file = None
+        self._last_flush = 0.0
+
+    def open(self):
+        """打开临时文件并写入文件头"""
+        self.output_path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.part_path, 'w', encoding=self.encoding)
+        self._file.write(self.writer.header())
+        self._last_flush = time.time()
+        return self
+
+    def resume(self, part_size: int, count: int, text_length: int, preview: str):
+        """
+        在断点处继续写出：把.part截断到断点记录的长度后追加
+
+        Args:
+            part_size: 断点记录的.part文件字节数
+            count: 已写出的语句数
+            text_length: 已写出的文本长度
+            preview: 已写出文本的开头
+        """
+        if not self.part_path.exists() or self.part_path.stat().st_size < part_size:
+            raise ValueError(f"部分结果文件缺失或不完整: {self.part_path}")
+
+        self._file = open(self.part_path, 'r+', encoding=self.encoding)
+        self._file.truncate(part_size)
+        self._file.seek(part_size)
+        self.count = count
+        self.text_length = text_length
+        self.preview = preview
+        self._last_flush = time.time()
+        return self
+
+    def part_size(self) -> int:
+        """.part文件当前在磁盘上的字节数"""
+        return os.fstat(self._file.fileno()).st_size
+
+    def add(self, segment: Dict[str, Any]) -> bool:
+        """
+        写入一条语句
+
+        Returns:
+            本次写入后是否刷新到了磁盘
+        """
+        if not segment['text']:
+            return False
+        self._file.write(self.writer.format_segment(segment, self.count))
+        self.count += 1
+        if self.text_length:
+            self.text_length += 1
+        self.text_length += len(segment['text'])
+        if len(self.preview) < self.preview_chars:
+            self.preview = (self.preview + ' ' + segment['text']).strip()[:self.preview_chars]
+
+        if time.time() - self._last_flush >= self.flush_interval:
+            self.flush()
+            return True
+        return False
+
+    def flush(self):
+        """刷新到磁盘"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._last_flush = time.time()
+
+    def commit(self):
+        """写入文件尾，刷新并原子重命名为最终文件"""
+        self._file.write(self.writer.footer())
+        self.flush()
+        self._file.close()
+        self._file = None
+        os.replace(self.part_path, self.output_path)
+
+    def abort(self, keep_partial: bool = True):
+        """
+        放弃写出
+
+        Args:
+            keep_partial: 是否保留已写出的.part文件
+        """
+        if self._file is not None:
+            try:
+                self.flush()
+            except OSError:
+                pass
+            self._file.close()
+            self._file = None
+        if not keep_partial and self.part_path.exists():
+            self.part_path.unlink()
+
+    def __enter__(self):
+        if self._file is None:
+            self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self._file is None:
+            return
+        if exc_type is None and self.count > 0:
+            self.commit()
+        else:
+            # 出错时保留部分结果，空结果则不留下文件
+            self.abort(keep_partial=self.count > 0)
+
+
+def join_segments(segments: List[Dict[str, Any]]) -> str:
+    """拼接各语句文本"""
+    return ' '.join(segment['text'] for segment in segments if segment['text'])
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+参数自动调优模块
+在参考音频上遍历chunk_size和num_threads组合，按实时率（RTF）选出最快的组合写回配置
+"""
+
+import os
+import json
+import time
+import platform
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from audio_source import WavPcmReader
+from recognizer_pool import get_recognizer_pool
+
+
+# 默认的调优网格
+DEFAULT_CHUNK_SIZES = [0.05, 0.1, 0.2, 0.4, 0.8]
+DEFAULT_THREAD_COUNTS = sorted({1, 2, 4, os.cpu_count() or 1})
+
+
+def tune_parameters(converter, reference_path: str, chunk_sizes: List[float] = None,
+                    thread_counts: List[int] = None, repeats: int = 1,
+                    report_path: str = 'tune_report.json', apply: bool = True) -> Optional[Dict[str, Any]]:
+    """
+    在参考音频上测量各参数组合的RTF，并把最快的组合写回配置
+
+    每个线程数单独创建一个识别器（模型加载不计入耗时），同一识别器上依次测量各块大小；
+    重复多次时取最短耗时，减少系统抖动的影响。
+
+    Args:
+        converter: VideoToTextSherpaNcnn实例
+        reference_path: 参考音频（WAV）或视频文件路径，建议1-3分钟的典型素材
+        chunk_sizes: 要测试的块大小（秒）
+        thread_counts: 要测试的线程数
+        repeats: 每个组合的重复次数
+        report_path: 结果表保存路径（JSON），留作审计
+        apply: 是否通过ConfigManager.update_config写回最快的组合
+
+    Returns:
+        调优报告字典，失败返回None
+    """
+    # 延迟导入，避免与主模块循环依赖
+    from sherpa_ncnn_video_to_text import SherpaNcnnRecognizer
+
+    chunk_sizes = chunk_sizes or DEFAULT_CHUNK_SIZES
+    thread_counts = thread_counts or DEFAULT_THREAD_COUNTS
+    repeats = max(1, repeats)
+
+    reference_path = Path(reference_path)
+    if not reference_path.exists():
+        print(f"参考文件不存在: {reference_path}")
+        return None
+
+    # 视频和非16位PCM的WAV先提取音频（进入缓存或临时目录），临时文件在调优结束后删除
+    extracted = None
+    audio_path = None
+    if reference_path.suffix.lower() == '.wav':
+        try:
+            WavPcmReader(reference_path).close()
+            audio_path = str(reference_path)
+        except ValueError as e:
+            print(f"参考音频不是16位PCM WAV（{e}），先转换格式")
+    if audio_path is None:
+        audio_path = converter.extract_audio(str(reference_path))
+        if not audio_path:
+            return None
+        if converter.audio_cache is None or not converter.audio_cache.owns(audio_path):
+            extracted = audio_path
+
+    # 调优期间不占用转换器自己的识别器
+    converter.recognizer.release()
+    pool = get_recognizer_pool()
+
+    try:
+        with WavPcmReader(audio_path) as reader:
+            duration = reader.duration
+
+        print(f"参考音频: {audio_path}，时长: {duration:.1f}秒")
+        print(f"块大小: {chunk_sizes}，线程数: {thread_counts}，重复: {repeats}次")
+
+        results = []
+        for num_threads in thread_counts:
+            recognition_config = dict(converter.recognition_config)
+            recognition_config['num_threads'] = num_threads
+            recognizer = SherpaNcnnRecognizer(converter.model_config, recognition_config,
+                                              converter.model_id)
+            try:
+                for chunk_size in chunk_sizes:
+                    times = []
+                    text_length = 0
+                    for _ in range(repeats):
+                        start = time.perf_counter()
+                        text = recognizer.recognize_file(audio_path, chunk_size, show_progress=False)
+                        times.append(time.perf_counter() - start)
+                        text_length = len(text)
+                    elapsed = min(times)
+                    results.append({
+                        "chunk_size": chunk_size,
+                        "num_threads": num_threads,
+                        "seconds": round(elapsed, 3),
+                        "rtf": round(elapsed / duration, 4),
+                        "text_length": text_length,
+                    })
+                    print(f"  chunk_size={chunk_size:<6} num_threads={num_threads:<3} "
+                          f"RTF={elapsed / duration:.4f}")
+            finally:
+                if num_threads == converter.recognition_config.get('num_threads'):
+                    # 配置的线程数：归还池中，转换器之后直接复用已加载的模型
+                    recognizer.release()
+                else:
+                    # 非默认线程数的识别器不留在池中
+                    pool.discard(recognizer.recognizer)
+                    recognizer.recognizer = None
+
+        best = min(results, key=lambda row: row["rtf"])
+
+        print(f"\n{'chunk_size':>12}{'num_threads':>14}{'耗时(秒)':>12}{'RTF':>10}{'文本长度':>10}")
+        for row in sorted(results, key=lambda row: row["rtf"]):
+            marker = ' *' if row is best else ''
+            print(f"{row['chunk_size']:>12}{row['num_threads']:>14}{row['seconds']:>12.2f}"
+                  f"{row['rtf']:>10.4f}{row['text_length']:>10}{marker}")
+        print(f"\n最快组合: chunk_size={best['chunk_size']}, num_threads={best['num_threads']}, "
+              f"RTF={best['rtf']:.4f}")
+
+        report = {
+            "timestamp": time.strftime('%Y-%m-%d %H:%M:%S'),
+            "host": {
+                "platform": platform.platform(),
+                "processor": platform.processor(),
+                "cpu_count": os.cpu_count(),
+            },
+            "model_id": converter.model_id,
+            "reference": str(reference_path),
+            "duration": round(duration, 3),
+            "repeats": repeats,
+            "results": results,
+            "best": best,
+            "applied": apply,
+        }
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"调优结果已保存: {report_path}")
+
+        if apply:
+            config_manager = converter.config_manager
+            config_manager.update_config("recognition", "chunk_size", best["chunk_size"])
+            config_manager.update_config("recognition", "num_threads", best["num_threads"])
+
+        return report
+
+    finally:
+        if extracted and Path(extracted).exists():
+            Path(extracted).unlink()